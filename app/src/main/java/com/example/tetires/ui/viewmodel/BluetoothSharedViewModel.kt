@@ -279,11 +279,12 @@ class BluetoothSharedViewModel(application: Application) : AndroidViewModel(appl
                 val totalData = scanBuffer.size
                 Log.d(TAG, "Proses data: $totalData lines")
 
-                val javaList = java.util.ArrayList(scanBuffer.toList())
-                val pyList = com.chaquo.python.PyObject.fromJava(javaList)
+                // Satu String (transfer bulk) alih-alih ArrayList yang dibaca per elemen
+                val lines = scanBuffer.toList()
+                val rawText = lines.joinToString("\n")
 
-                addToTerminal("Calling Python with ${javaList.size} lines...")
-                val resultJson = processingModule.callAttr("process_single_sensor", pyList).toString()
+                addToTerminal("Calling Python with ${lines.size} lines...")
+                val resultJson = processingModule.callAttr("process_single_sensor", rawText).toString()
                 addToTerminal("Python response received")
                 addToTerminal(resultJson.take(300) + if (resultJson.length > 300) "..." else "")
 
@@ -59,8 +59,9 @@ class TerminalViewModel(private val context: Context) : ViewModel() {
 
         addLog("PYTHON: Memulai pemrosesan batch... (ini mungkin butuh beberapa detik)")
 
-        // Salin buffer agar aman dari perubahan saat proses dan bersihkan buffer lama
-        val dataToProcess = ArrayList(lineBuffer)
+        // Salin buffer agar aman dari perubahan saat proses dan bersihkan buffer lama.
+        // Dikirim sebagai satu String (transfer bulk), bukan ArrayList per elemen.
+        val dataToProcess = lineBuffer.joinToString("\n")
         lineBuffer.clear()
 
         viewModelScope.launch(Dispatchers.Default) { // Jalankan di thread background
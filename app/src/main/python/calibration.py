@@ -0,0 +1,146 @@
+import json
+import numpy as np
+
+import fleet_eval
+import scan_archive
+import tire_depth
+
+# ============================================================================
+# TRAINER KALIBRASI ON-DEVICE
+# ============================================================================
+# Menghasilkan ulang MODEL_DALAM / MODEL_DANGKAL dari scan berlabel
+# (kedalaman alur hasil ukur manual) tanpa notebook Colab.
+#
+# Langkah sama dengan notebook: valley per sensor -> MinMaxScaler (min/max
+# valley training) -> regresi linear kedalaman vs valley terskala.
+# Valley diambil lewat pipeline batch fleet_eval (filter Butterworth yang
+# sama dengan tire_depth), lalu least squares diselesaikan dalam bentuk
+# tertutup untuk semua sampel sekaligus.
+#
+# Scan yang memenuhi kondisi tegangan tinggi sensor 1 & 6 (ban AUS /
+# alur dangkal) dipakai untuk MODEL_DANGKAL, sisanya untuk MODEL_DALAM.
+
+MIN_SAMPLES = 2
+
+
+def fit_model(valleys, depths):
+    """
+    Fit satu model dari pasangan valley (mV) dan kedalaman (mm).
+    NaN/None diabaikan. Return (model dict, metrics dict).
+    """
+    v = np.asarray(valleys, dtype=float).ravel()
+    d = np.asarray(depths, dtype=float).ravel()
+    keep = np.isfinite(v) & np.isfinite(d)
+    v = v[keep]
+    d = d[keep]
+    if len(v) < MIN_SAMPLES:
+        raise ValueError("Need at least {} labeled valleys, got {}".format(MIN_SAMPLES, len(v)))
+
+    mn = float(v.min())
+    mx = float(v.max())
+    x = (v - mn) / (mx - mn) if mx > mn else np.zeros_like(v)
+
+    x_mean = x.mean()
+    d_mean = d.mean()
+    dx = x - x_mean
+    sxx = float(np.dot(dx, dx))
+    slope = float(np.dot(dx, d - d_mean) / sxx) if sxx > 0 else 0.0
+    intercept = float(d_mean - slope * x_mean)
+
+    residual = d - (slope * x + intercept)
+    sst = float(np.dot(d - d_mean, d - d_mean))
+    sse = float(np.dot(residual, residual))
+    metrics = {
+        "samples": int(len(v)),
+        "rmse_mm": float(np.sqrt(sse / len(v))),
+        "r2": 1.0 - sse / sst if sst > 0 else None,
+    }
+    model = {"min": mn, "max": mx, "slope": slope, "intercept": intercept}
+    return model, metrics
+
+
+def _as_depth_matrix(depths):
+    rows = [[np.nan if v is None else float(v) for v in list(row)[:6]] for row in depths]
+    matrix = np.full((len(rows), 6), np.nan)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def scan_features(scans, pixel_counts=None):
+    """
+    scans: list log mentah, atau array frame (N, 6, window) hasil
+    repair_gaps (NaN di luar pixel diterima). pixel_counts (N, 6) = pixel
+    yang benar-benar diterima (otomatis untuk log mentah).
+    Return (valleys (N, 6), aus (N,)) lewat fleet_eval, dievaluasi atas
+    span pixel diterima seperti process_file.
+    """
+    if isinstance(scans, np.ndarray):
+        frames = scans
+    else:
+        counts_out = []
+        frames = fleet_eval.stack_frames(scans, counts_out)
+        pixel_counts = counts_out[0]
+    valleys, _, high_counts = fleet_eval.valleys_from_raw(frames, pixel_counts=pixel_counts)
+    return valleys, fleet_eval.aus_mask(high_counts)
+
+
+def train(scans=None, depths=None, valleys=None, aus=None, pixel_counts=None):
+    """
+    Latih MODEL_DALAM dan MODEL_DANGKAL.
+
+    Input bisa scans (diproses ke valley, pixel_counts lihat scan_features)
+    atau langsung valleys (N, 6) beserta aus (N,). depths (N, 6) mm,
+    None/NaN = alur tidak diukur. Model bernilai None jika sampel
+    kelompoknya kurang dari MIN_SAMPLES.
+    """
+    if valleys is None:
+        valleys, aus = scan_features(scans, pixel_counts)
+    valleys = np.atleast_2d(np.asarray(valleys, dtype=float))
+    aus = np.zeros(len(valleys), dtype=bool) if aus is None else np.asarray(aus, dtype=bool)
+    depths = _as_depth_matrix(depths)
+
+    result = {"model_dalam": None, "model_dangkal": None, "metrics": {}}
+    for key, rows in (("model_dalam", ~aus), ("model_dangkal", aus)):
+        try:
+            model, metrics = fit_model(valleys[rows], depths[rows])
+        except ValueError as e:
+            result["metrics"][key] = {"samples": 0, "message": str(e)}
+            continue
+        result[key] = model
+        result["metrics"][key] = metrics
+    return result
+
+
+def apply_models(result):
+    """Pasang model hasil training ke tire_depth (seperti argumen predict_file)"""
+    if result.get("model_dalam"):
+        tire_depth.MODEL_DALAM = result["model_dalam"]
+    if result.get("model_dangkal"):
+        tire_depth.MODEL_DANGKAL = result["model_dangkal"]
+
+
+# ============================================================================
+# ENTRYPOINT UNTUK KOTLIN
+# ============================================================================
+
+def train_from_archive(archive_path, labels_json):
+    """
+    Latih ulang dari scan di arsip biner.
+    labels_json: [{"record": i, "depths": [mm x 6]}, ...]
+    Model hasil bisa diberikan ke predict_file(model_dalam_in=..., model_dangkal_in=...).
+    """
+    try:
+        labels = json.loads(labels_json) if isinstance(labels_json, str) else labels_json
+        with scan_archive.ScanArchiveReader(archive_path) as reader:
+            frames = np.empty((len(labels), 6, scan_archive.WINDOW))
+            pixel_counts = np.zeros((len(labels), 6), dtype=int)
+            for n, item in enumerate(labels):
+                scan = reader.read(int(item["record"]))
+                frames[n] = tire_depth.repair_gaps(scan["values"], scan["counts"] > 0)
+                pixel_counts[n] = np.count_nonzero(scan["counts"], axis=1)
+        result = train(frames, [item["depths"] for item in labels], pixel_counts=pixel_counts)
+        result["success"] = result["model_dalam"] is not None or result["model_dangkal"] is not None
+        return json.dumps(result, indent=2)
+    except Exception as e:
+        return json.dumps({"success": False, "message": "train_from_archive exception: {}".format(str(e))})
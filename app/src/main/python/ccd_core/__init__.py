@@ -0,0 +1,49 @@
+"""
+Inti pemrosesan CCD yang dipakai bersama tire_depth, tire_processing dan
+filtering: konversi input Chaquopy, parser baris log, filter Butterworth
+order-2, deteksi valley dan penerapan model linear.
+
+Setiap modul pemanggil memilih mode kompatibilitas sendiri (dialect parser,
+inisialisasi filter) supaya angka yang dihasilkan sama dengan implementasi
+lamanya, sementara optimasi cukup dikerjakan di sini.
+
+Bagian berbasis NumPy (filters, valley, model) baru di-import saat namanya
+pertama kali dipakai. convert, parser dan pure (mode filter, rekursi filter,
+scale/predict/apply_model) tidak butuh NumPy, jadi tetap jalan di build
+minimal; ccd_core.filters memakai rekursi yang sama dari pure.
+"""
+
+import importlib
+
+from .convert import to_python_list, bulk_lines, to_lines, normalize_lines
+from .parser import (
+    Dialect, SampleParser, parse_samples,
+    TIRE_DEPTH, TIRE_PROCESSING, FILTERING,
+)
+from .pure import INIT_EDGE, INIT_ZERO, MODE_SCIPY, scale, predict, apply_model
+
+_LAZY = {
+    "lowpass": "filters", "filtfilt": "filters", "lowpass_columns": "filters",
+    "find_valley": "valley", "count_above": "valley",
+    "DepthLUT": "model", "depth_lut": "model",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = [
+    "to_python_list", "bulk_lines", "to_lines", "normalize_lines",
+    "Dialect", "SampleParser", "parse_samples",
+    "TIRE_DEPTH", "TIRE_PROCESSING", "FILTERING",
+    "INIT_EDGE", "INIT_ZERO", "MODE_SCIPY",
+    "lowpass", "filtfilt", "lowpass_columns",
+    "find_valley", "count_above",
+    "scale", "predict", "apply_model", "DepthLUT", "depth_lut",
+]
@@ -0,0 +1,68 @@
+from typing import Any
+
+
+def to_python_list(obj: Any):
+    """Convert Java ArrayList atau iterable ke Python list"""
+    if isinstance(obj, list):
+        return obj
+
+    try:
+        return list(obj)
+    except Exception:
+        pass
+
+    try:
+        size = obj.size()
+        return [obj.get(i) for i in range(size)]
+    except Exception:
+        pass
+
+    try:
+        it = obj.iterator()
+        out = []
+        while it.hasNext():
+            out.append(it.next())
+        return out
+    except Exception:
+        pass
+
+    return []
+
+
+def bulk_lines(obj):
+    """
+    Jalur transfer bulk dari Kotlin: satu String berisi baris-baris
+    (dipisah newline), bytes, atau Java byte[] UTF-8 dikonversi dalam satu
+    langkah. Java byte[] dari Chaquopy mendukung buffer protocol, jadi
+    disalin sekaligus tanpa akses per elemen.
+    Return None untuk bentuk lain (ArrayList, String[], list Python).
+    """
+    if isinstance(obj, str):
+        return obj.splitlines()
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", "replace").splitlines()
+    try:
+        data = memoryview(obj)
+    except TypeError:
+        return None
+    return data.tobytes().decode("utf-8", "replace").splitlines()
+
+
+def to_lines(obj):
+    """bulk_lines jika bentuknya mendukung, selain itu to_python_list"""
+    lines = bulk_lines(obj)
+    return to_python_list(obj) if lines is None else lines
+
+
+def normalize_lines(raw_input):
+    """
+    Input predict_file -> list baris: path file, teks mentah multi-baris,
+    bytes / Java byte[], list Python, ArrayList atau String[] Java.
+    """
+    if isinstance(raw_input, str):
+        try:
+            with open(raw_input, "r", encoding="utf-8") as f:
+                return f.read().splitlines()
+        except Exception:
+            return raw_input.splitlines()
+    return to_lines(raw_input)
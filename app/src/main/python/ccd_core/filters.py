@@ -0,0 +1,60 @@
+import numpy as np
+
+from .pure import INIT_EDGE, INIT_ZERO, MODE_SCIPY, initial_state, recurse
+
+# ============================================================================
+# FILTER BUTTERWORTH ORDER-2
+# ============================================================================
+# Koefisien dalam format b = [b0, b1, b2], a = [a1, a2] (tanpa a0 = 1).
+# Mode inisialisasi (INIT_EDGE, INIT_ZERO, MODE_SCIPY) didefinisikan di
+# ccd_core.pure.
+#
+# Bagian feed-forward dihitung vektor oleh NumPy; inisialisasi dan rekursi
+# memakai ccd_core.pure (float Python, jauh lebih cepat daripada indexing
+# elemen ndarray). Urutan penjumlahan sama dengan rumus lama sehingga
+# hasilnya identik bit-per-bit, juga dengan pure.filtfilt.
+# lowpass_columns menjalankan rekursi yang sama untuk banyak sinyal
+# sekaligus: setiap langkah memproses satu baris (P, R) sebagai vektor.
+
+
+def lowpass(data, b_coef, a_coef, init=INIT_EDGE):
+    """Forward pass filter Butterworth order-2 (np.ndarray)"""
+    x = np.asarray(data, dtype=float)
+    n = len(x)
+    if n == 0:
+        return x.copy()
+    if n < 3:
+        if init not in (INIT_EDGE, INIT_ZERO):
+            raise ValueError("Unknown filter init: {}".format(init))
+        return x.copy()
+
+    b0, b1, b2 = float(b_coef[0]), float(b_coef[1]), float(b_coef[2])
+    y0, y1 = initial_state(float(x[0]), float(x[1]), b_coef, a_coef, init)
+    ff = (b0 * x[2:] + b1 * x[1:-1] + b2 * x[:-2]).tolist()
+    return np.array(recurse(ff, y0, y1, a_coef))
+
+
+def filtfilt(data, b_coef, a_coef, mode=INIT_EDGE):
+    """Zero-phase filtering: forward + backward pass (np.ndarray)"""
+    x = np.asarray(data, dtype=float)
+    if mode == MODE_SCIPY:
+        from scipy.signal import filtfilt as scipy_filtfilt
+        return scipy_filtfilt(b_coef, [1.0] + [float(v) for v in a_coef], x)
+    if len(x) < 3:
+        return x.copy()
+    forward = lowpass(x, b_coef, a_coef, mode)
+    return lowpass(forward[::-1], b_coef, a_coef, mode)[::-1]
+
+
+def lowpass_columns(x, b_coef, a_coef, init=INIT_EDGE):
+    """Forward pass untuk setiap kolom x (P, R) sekaligus (np.ndarray (P, R))"""
+    x = np.asarray(x, dtype=float)
+    if len(x) < 3:
+        if init not in (INIT_EDGE, INIT_ZERO):
+            raise ValueError("Unknown filter init: {}".format(init))
+        return x.copy()
+
+    b0, b1, b2 = float(b_coef[0]), float(b_coef[1]), float(b_coef[2])
+    y0, y1 = initial_state(x[0], x[1], b_coef, a_coef, init)
+    ff = b0 * x[2:] + b1 * x[1:-1] + b2 * x[:-2]
+    return np.array(recurse(ff, y0, y1, a_coef))
@@ -0,0 +1,96 @@
+import math
+import threading
+
+import numpy as np
+
+
+# ============================================================================
+# LOOKUP TABLE ADC CODE -> KEDALAMAN
+# ============================================================================
+# Valley berasal dari ADC 12-bit (VREF_MV / ADC_MAX mV per code). Setiap
+# model dikompilasi sekali menjadi tabel ADC_MAX + 1 entri: koefisien
+# polinom model yang dideret ulang di sekitar setiap code, dalam variabel
+# t = code - idx. Nilai di antara dua code (dan di luar 0..VREF_MV, dari
+# segmen tepi) dievaluasi dengan Horner atas koefisien itu, jadi hasilnya
+# sama dengan bentuk tertutup sampai pembulatan float, juga untuk "poly".
+# Tabel di-cache per versi model (model["version"] atau isi model).
+# Model boleh berisi "poly" (koefisien polinom atas nilai terskala, urutan
+# np.polyval) sebagai pengganti slope/intercept; model linear = poly
+# derajat 1, biaya evaluasinya tetap satu gather tabel.
+
+ADC_MAX = 4095
+VREF_MV = 3300.0
+LUT_CACHE_SIZE = 16
+
+
+class DepthLUT:
+    def __init__(self, model, adc_max=ADC_MAX, vref_mV=VREF_MV):
+        self.adc_max = adc_max
+        self.codes_per_mV = adc_max / vref_mV
+        poly = model["poly"] if "poly" in model else [model["slope"], model["intercept"]]
+        poly = np.atleast_1d(np.asarray(poly, dtype=float))
+
+        # nilai terskala di setiap code dan kenaikannya per code
+        step = vref_mV / adc_max
+        span = model["max"] - model["min"]
+        if span != 0:
+            scaled = (np.arange(adc_max + 1) * step - model["min"]) / span
+            h = step / span
+        else:
+            scaled, h = np.zeros(adc_max + 1), 0.0
+
+        # koefisien ke-k = p^(k)(scaled) * h^k / k! (deret Taylor eksak polinom)
+        self.coef = np.empty((len(poly), adc_max + 1))
+        deriv = poly
+        for k in range(len(poly)):
+            self.coef[k] = np.polyval(deriv, scaled) * (h ** k / math.factorial(k))
+            deriv = np.polyder(deriv)
+        self._coef = [row.tolist() for row in self.coef]
+
+    def __call__(self, valleys_mV):
+        """Kedalaman (mm) untuk valley mV skalar atau array; NaN tetap NaN"""
+        if np.ndim(valleys_mV) == 0:
+            # satu valley: cukup float Python, tanpa overhead ndarray
+            code = float(valleys_mV) * self.codes_per_mV
+            if code != code:
+                return code
+            idx = min(max(int(code), 0), self.adc_max - 1)
+            t = code - idx
+            depth = self._coef[-1][idx]
+            for row in reversed(self._coef[:-1]):
+                depth = depth * t + row[idx]
+            return depth
+
+        code = np.asarray(valleys_mV, dtype=float) * self.codes_per_mV
+        idx = np.nan_to_num(np.clip(code, 0.0, self.adc_max - 1)).astype(np.intp)
+        t = code - idx
+        depth = self.coef[-1][idx]
+        for row in self.coef[-2::-1]:
+            depth = depth * t + row[idx]
+        return depth
+
+
+_lut_cache = {}
+_lut_lock = threading.Lock()    # dipakai bersama worker device_session
+
+
+def model_key(model):
+    """Kunci cache: versi eksplisit jika ada, selain itu isi numerik model"""
+    if model.get("version") is not None:
+        return ("version", str(model["version"]))
+    return tuple(sorted(
+        (k, tuple(float(c) for c in v) if isinstance(v, (list, tuple)) else float(v))
+        for k, v in model.items() if isinstance(v, (int, float, list, tuple))
+    ))
+
+
+def depth_lut(model):
+    """DepthLUT ter-cache untuk model"""
+    key = model_key(model)
+    with _lut_lock:
+        lut = _lut_cache.get(key)
+        if lut is None:
+            if len(_lut_cache) >= LUT_CACHE_SIZE:
+                _lut_cache.pop(next(iter(_lut_cache)))
+            lut = _lut_cache[key] = DepthLUT(model)
+    return lut
@@ -0,0 +1,203 @@
+import re
+
+# ============================================================================
+# PARSER BARIS LOG CCD
+# ============================================================================
+# Satu loop parser untuk semua format log. Perbedaan antar modul (regex
+# marker sensor, format baris pixel, sensor yang diterima, window pixel)
+# dijelaskan lewat Dialect supaya setiap pemanggil mendapat sampel yang
+# sama persis dengan parser lamanya. Dialect yang punya regex satu-teks
+# (TIRE_PROCESSING) di-parse dengan satu findall atas seluruh potongan;
+# hasilnya sama dengan loop per baris.
+
+SENSOR_RE = re.compile(r"---\s*SENSOR\s+(\d+)\s*---", re.IGNORECASE)
+PIXEL_RE = re.compile(r"Pixel\[\s*(\d+)\s*\]:\s*([\d\.]+)", re.IGNORECASE)
+PIXEL_MV_RE = re.compile(r"Pixel\[\s*(\d+)\s*\]:\s*([\d\.]+)\s*mV", re.IGNORECASE)
+
+# Versi satu-teks dialect tire_processing: satu match = satu baris, yaitu
+# marker di awal baris (setelah spasi) atau pixel pertama dalam baris. Sisa
+# baris ikut dikonsumsi supaya pixel kedua pada baris yang sama diabaikan
+# seperti parser per baris.
+_WS = r"[^\S\n]"
+PROCESSING_TEXT_RE = re.compile(
+    r"^{ws}*---{ws}*SENSOR{ws}+(\d+){ws}*---[^\n]*"
+    r"|Pixel\[{ws}*(\d+){ws}*\]:{ws}*([\d\.]+){ws}*mV[^\n]*".format(ws=_WS),
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+class Dialect:
+    """
+    Aturan satu format log.
+
+    marker(line)  -> None jika bukan marker, selain itu nomor sensor
+                     (atau INVALID jika marker tidak terbaca)
+    pixel(line)   -> None atau (pixel, nilai)
+    sensor_ids    : sensor yang diterima (None = semua); sensor lain
+                    membuat pixel berikutnya diabaikan
+    window        : (pixel_min, pixel_max) inklusif, None = tanpa batas
+    text          : regex opsional atas seluruh teks (baris digabung "\\n")
+                    dengan grup (marker, pixel, nilai); jika ada, feed()
+                    memakai satu findall sebagai pengganti loop per baris
+    """
+
+    INVALID = -1
+
+    def __init__(self, name, marker, pixel, sensor_ids=None, window=None, text=None):
+        self.name = name
+        self.marker = marker
+        self.pixel = pixel
+        self.sensor_ids = None if sensor_ids is None else frozenset(sensor_ids)
+        self.window = window
+        self.text = text
+
+
+def _regex_marker(regex, anchored):
+    find = regex.match if anchored else regex.search
+
+    def marker(line):
+        m = find(line)
+        return int(m.group(1)) if m else None
+    return marker
+
+
+def _regex_pixel(regex):
+    search = regex.search
+
+    def pixel(line):
+        m = search(line)
+        if m is None:
+            return None
+        try:
+            return int(m.group(1)), float(m.group(2))
+        except ValueError:
+            return None
+    return pixel
+
+
+def _adc_marker(line):
+    # "--- SENSOR n ---": nomor = token ke-3, marker rusak -> INVALID
+    if not line.startswith("--- SENSOR"):
+        return None
+    try:
+        return int(line.split()[2])
+    except (ValueError, IndexError):
+        return Dialect.INVALID
+
+
+def _adc_pixel(line):
+    # "Pixels[n]: adc" (nilai ADC integer)
+    if not line.startswith("Pixels["):
+        return None
+    try:
+        parts = line.split(']')
+        return int(parts[0].replace('Pixels[', '').strip()), int(parts[1].replace(':', '').strip())
+    except (ValueError, IndexError):
+        return None
+
+
+# tire_depth: marker di mana saja dalam baris, hanya sensor 1-6
+TIRE_DEPTH = Dialect("tire_depth", _regex_marker(SENSOR_RE, False), _regex_pixel(PIXEL_RE),
+                     sensor_ids=range(1, 7), window=(280, 1080))
+
+# tire_processing: marker di awal baris, satuan "mV" wajib, semua nomor sensor
+TIRE_PROCESSING = Dialect("tire_processing", _regex_marker(SENSOR_RE, True), _regex_pixel(PIXEL_MV_RE),
+                          window=(280, 1080), text=PROCESSING_TEXT_RE)
+
+# filtering: log terminal ADC mentah, tanpa window pixel
+FILTERING = Dialect("filtering", _adc_marker, _adc_pixel)
+
+
+class SampleParser:
+    """
+    Parser inkremental: feed() boleh dipanggil per potongan baris, sensor
+    aktif dibawa ke potongan berikutnya. Return list sejajar
+    (sensor, pixel, nilai) sesuai urutan kedatangan.
+    """
+
+    def __init__(self, dialect=TIRE_DEPTH, current_sensor=None):
+        self.dialect = dialect
+        self.current_sensor = current_sensor
+
+    def feed(self, lines):
+        if self.dialect.text is not None:
+            return self._feed_text(lines)
+        dialect = self.dialect
+        marker = dialect.marker
+        pixel = dialect.pixel
+        allowed = dialect.sensor_ids
+        lo, hi = dialect.window if dialect.window else (None, None)
+
+        sids = []
+        pixels = []
+        values = []
+        sid = self.current_sensor
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            found = marker(line)
+            if found is not None:
+                if found == Dialect.INVALID or (allowed is not None and found not in allowed):
+                    sid = None
+                else:
+                    sid = found
+                continue
+
+            if sid is None:
+                continue
+            sample = pixel(line)
+            if sample is None:
+                continue
+            pix, value = sample
+            if lo is not None and not lo <= pix <= hi:
+                continue
+            sids.append(sid)
+            pixels.append(pix)
+            values.append(value)
+
+        self.current_sensor = sid
+        return sids, pixels, values
+
+    def _feed_text(self, lines):
+        # hasil sama dengan loop per baris, tanpa strip/regex per baris
+        dialect = self.dialect
+        allowed = dialect.sensor_ids
+        lo, hi = dialect.window if dialect.window else (None, None)
+        text = lines if isinstance(lines, str) else "\n".join(lines)
+
+        sids = []
+        pixels = []
+        values = []
+        add_sid, add_pixel, add_value = sids.append, pixels.append, values.append
+        sid = self.current_sensor
+
+        for found, pix, value in dialect.text.findall(text):
+            if found:
+                found = int(found)
+                sid = None if allowed is not None and found not in allowed else found
+                continue
+            if sid is None:
+                continue
+            try:
+                pix = int(pix)
+                value = float(value)
+            except ValueError:
+                continue
+            if lo is not None and not lo <= pix <= hi:
+                continue
+            add_sid(sid)
+            add_pixel(pix)
+            add_value(value)
+
+        self.current_sensor = sid
+        return sids, pixels, values
+
+
+def parse_samples(lines, dialect=TIRE_DEPTH, current_sensor=None):
+    """Parse sekali jalan; return (sensor, pixel, nilai, sensor aktif terakhir)"""
+    parser = SampleParser(dialect, current_sensor)
+    sids, pixels, values = parser.feed(lines)
+    return sids, pixels, values, parser.current_sensor
@@ -0,0 +1,118 @@
+import heapq
+from array import array
+
+# ============================================================================
+# JALUR TANPA NUMPY
+# ============================================================================
+# Bagian ccd_core yang hanya butuh Python standar, dipakai langsung oleh
+# build minimal (tire_processing) dan sebagai inti ccd_core.filters:
+# inisialisasi dan rekursi filter order-2 hanya ada di sini, filters cukup
+# menghitung bagian feed-forward dengan NumPy. Rekursi membawa y sebelumnya
+# di variabel lokal sehingga loop tidak melakukan indexing per sampel.
+#
+# Mode inisialisasi pass maju (menjaga angka implementasi lama):
+#   INIT_EDGE  : y[0] = x[0], y[1] = x[1]                    (tire_depth)
+#   INIT_ZERO  : y[0] = b0 x[0], y[1] = b0 x[1] + b1 x[0] - a1 y[0]
+#                                                             (tire_processing)
+#   MODE_SCIPY : scipy.signal.filtfilt dengan padding ganjil  (filtering,
+#                hanya lewat ccd_core.filtfilt)
+
+INIT_EDGE = "edge"
+INIT_ZERO = "zero"
+MODE_SCIPY = "scipy"
+
+
+def initial_state(x0, x1, b_coef, a_coef, init):
+    """(y[0], y[1]) pass maju untuk mode init"""
+    if init == INIT_ZERO:
+        y0 = float(b_coef[0]) * x0
+        return y0, float(b_coef[0]) * x1 + float(b_coef[1]) * x0 - float(a_coef[0]) * y0
+    if init == INIT_EDGE:
+        return x0, x1
+    raise ValueError("Unknown filter init: {}".format(init))
+
+
+def recurse(ff, y0, y1, a_coef):
+    """y[n] = ff[n] - a1 y[n-1] - a2 y[n-2] mulai dari (y0, y1) -> list"""
+    a1, a2 = float(a_coef[0]), float(a_coef[1])
+    out = [y0, y1]
+    append = out.append
+    for f in ff:
+        y = f - a1 * y1 - a2 * y0
+        append(y)
+        y0 = y1
+        y1 = y
+    return out
+
+
+def feedforward(x, b_coef):
+    """b0 x[n] + b1 x[n-1] + b2 x[n-2] untuk n >= 2 -> list"""
+    b0, b1, b2 = float(b_coef[0]), float(b_coef[1]), float(b_coef[2])
+    return [b0 * x2 + b1 * x1 + b2 * x0 for x0, x1, x2 in zip(x, x[1:], x[2:])]
+
+
+def lowpass(x, b_coef, a_coef, init=INIT_EDGE):
+    """Forward pass atas list / array('d') float -> list"""
+    if len(x) < 3:
+        return list(x)
+    y0, y1 = initial_state(x[0], x[1], b_coef, a_coef, init)
+    return recurse(feedforward(x, b_coef), y0, y1, a_coef)
+
+
+def lowpass_step(state, x2, b_coef, a_coef):
+    """
+    Pass maju satu sampel untuk filter inkremental. state = (x[n-2],
+    x[n-1], y[n-2], y[n-1]); return (y[n], state baru). Deretan step dari
+    state awal (x0, x1, *initial_state(...)) sama persis dengan lowpass.
+    """
+    x0, x1, y0, y1 = state
+    y = recurse(feedforward((x0, x1, x2), b_coef), y0, y1, a_coef)[2]
+    return y, (x1, x2, y1, y)
+
+
+def filtfilt(x, b_coef, a_coef, init=INIT_EDGE):
+    """Zero-phase (forward + backward) tanpa NumPy -> array('d')"""
+    if len(x) < 3:
+        return array("d", x)
+    backward = lowpass(lowpass(x, b_coef, a_coef, init)[::-1], b_coef, a_coef, init)
+    backward.reverse()
+    return array("d", backward)
+
+
+def find_valley(filtered):
+    """(nilai, index) minimum; index pertama jika ada yang sama"""
+    value = min(filtered)
+    return value, filtered.index(value)
+
+
+def count_above(filtered, threshold):
+    """Jumlah sampel terfilter > threshold (tanpa list sementara)"""
+    return sum(1 for v in filtered if v > threshold)
+
+
+def smallest(items, n, key):
+    """n item terkecil, urutan stabil seperti sorted(items, key=key)[:n]"""
+    return heapq.nsmallest(n, items, key=key)
+
+
+def scale(x, mn, mx):
+    """Min-max scaling"""
+    if x is None:
+        return None
+    if mx == mn:
+        return 0.0
+    return float((x - mn) / (mx - mn))
+
+
+def predict(slope, intercept, x):
+    """Linear prediction"""
+    if x is None:
+        return None
+    return float(slope * x + intercept)
+
+
+def apply_model(valleys, model):
+    """Valley (None = tidak valid) -> (scaled, depths) dengan model linear"""
+    scaled = [scale(v, model["min"], model["max"]) for v in valleys]
+    depths = [predict(model["slope"], model["intercept"], s) for s in scaled]
+    return scaled, depths
@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def find_valley(filtered):
+    """(nilai, index) minimum sinyal terfilter; index pertama jika ada yang sama"""
+    filtered = np.asarray(filtered, dtype=float)
+    idx = int(np.argmin(filtered))
+    return float(filtered[idx]), idx
+
+
+def count_above(filtered, threshold):
+    """Jumlah sampel terfilter > threshold"""
+    return int(np.count_nonzero(np.asarray(filtered, dtype=float) > threshold))
@@ -0,0 +1,260 @@
+import json
+import queue
+import threading
+
+import tire_depth
+
+# ============================================================================
+# SESI PER DEVICE (BANYAK SCANNER SEKALIGUS)
+# ============================================================================
+# Setiap scanner (USB atau Bluetooth, dikunci dengan device id dari
+# DeviceConnectionManager) punya sesi sendiri: antrian baris, parser +
+# filter inkremental (LivePreview), koefisien filter dan kalibrasi yang
+# dibekukan saat sesi dibuka. Satu worker thread per sesi mengosongkan
+# antriannya, jadi dua ban bisa di-scan bersamaan tanpa state bersama;
+# perubahan global tire_depth (predict_file) tidak mengubah sesi yang
+# sudah berjalan.
+#
+# Thread Kotlin hanya memanggil session_feed (masuk antrian, tidak
+# menunggu parsing), session_preview dan session_finish.
+
+FINISH_TIMEOUT_S = 10.0
+
+
+class _Finish:
+    """Penanda di antrian: selesaikan scan aktif dan kembalikan hasilnya"""
+
+    def __init__(self, waveform_points):
+        self.waveform_points = waveform_points
+        self.result = None
+        self.done = threading.Event()
+
+
+_CLOSE = object()
+
+
+class DeviceSession:
+    """Pipeline terisolasi satu device"""
+
+    def __init__(self, device_id, model=None, b_coef=None, a_coef=None,
+                 every_lines=tire_depth.PREVIEW_EVERY_LINES):
+        self.device_id = str(device_id)
+        self.model, self.b_coef, self.a_coef, self.every_lines = self._config(model, b_coef, a_coef, every_lines)
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.builder = self._new_builder()
+        self.lines_in = 0
+        self.scans = 0
+        self.max_backlog = 0
+        self.error = None           # exception pertama di worker untuk scan aktif
+        self._thread = threading.Thread(target=self._run, name="session-" + self.device_id, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _config(model, b_coef, a_coef, every_lines):
+        """Konfigurasi efektif (default global tire_depth saat ini)"""
+        return (
+            dict(model) if model else dict(tire_depth.MODEL_DALAM),
+            list(tire_depth.b if b_coef is None else b_coef),
+            list(tire_depth.a if a_coef is None else a_coef),
+            int(every_lines),
+        )
+
+    def matches(self, model=None, b_coef=None, a_coef=None, every_lines=tire_depth.PREVIEW_EVERY_LINES):
+        """True jika sesi sudah memakai konfigurasi ini"""
+        return self._config(model, b_coef, a_coef, every_lines) == \
+            (self.model, self.b_coef, self.a_coef, self.every_lines)
+
+    def _new_builder(self):
+        return tire_depth.LivePreview(self.every_lines, self.b_coef, self.a_coef, self.model)
+
+    def feed(self, lines):
+        """Masukkan baris ke antrian (bentuk input apa pun seperti FrameBuilder.feed)"""
+        lines = tire_depth.FrameBuilder._lines(lines)
+        self.lines_in += len(lines)
+        self.queue.put(lines)
+        backlog = self.queue.qsize()
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+        return backlog
+
+    def preview(self):
+        with self.lock:
+            result = self.builder.preview()
+        result["device_id"] = self.device_id
+        return result
+
+    def finish(self, waveform_points=0, timeout=FINISH_TIMEOUT_S):
+        """Tunggu antrian habis, return hasil process_file (JSON) scan aktif"""
+        marker = _Finish(waveform_points)
+        self.queue.put(marker)
+        if not marker.done.wait(timeout):
+            return json.dumps({"success": False, "message": "Session {} timed out".format(self.device_id)})
+        return marker.result
+
+    def close(self):
+        self.queue.put(_CLOSE)
+        self._thread.join(FINISH_TIMEOUT_S)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _CLOSE:
+                return
+            if isinstance(item, _Finish):
+                self._finish(item)
+                continue
+
+            # gabungkan potongan yang sudah menumpuk supaya parse per batch
+            batch = list(item)
+            pending = None
+            while pending is None:
+                try:
+                    nxt = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(nxt, list):
+                    batch.extend(nxt)
+                else:
+                    pending = nxt
+            if self.error is None:
+                try:
+                    with self.lock:
+                        self.builder.feed(batch)
+                except Exception as e:
+                    # worker tetap hidup; sisa scan dibuang, error dilaporkan finish()
+                    self.error = e
+            if pending is _CLOSE:
+                return
+            if pending is not None:
+                self._finish(pending)
+
+    def _finish(self, marker):
+        with self.lock:
+            error, self.error = self.error, None
+            builder, self.builder = self.builder, self._new_builder()
+        if error is not None:
+            marker.result = json.dumps({
+                "success": False,
+                "device_id": self.device_id,
+                "message": "session worker exception: {}".format(str(error)),
+            })
+            marker.done.set()
+            return
+        try:
+            graph = builder.graph()
+            result = json.loads(tire_depth.process_file(None, graph=graph, waveform_points=marker.waveform_points))
+            result["device_id"] = self.device_id
+            marker.result = json.dumps(result)
+            self.scans += 1
+        except Exception as e:
+            marker.result = json.dumps({"success": False, "message": "session finish exception: {}".format(str(e))})
+        marker.done.set()
+
+    def info(self):
+        return {
+            "device_id": self.device_id,
+            "lines_in": self.lines_in,
+            "scans": self.scans,
+            "backlog": self.queue.qsize(),
+            "max_backlog": self.max_backlog,
+            "model": self.model,
+        }
+
+
+# ============================================================================
+# ENTRYPOINT UNTUK KOTLIN
+# ============================================================================
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def open_session(device_id, model=None, b_coef=None, a_coef=None, every_lines=tire_depth.PREVIEW_EVERY_LINES,
+                 replace=False):
+    """
+    Sesi per device di-cache; device yang sama selalu dapat sesi yang sama.
+    replace=True: sesi lama dengan konfigurasi berbeda ditutup (scan yang
+    belum selesai dibuang) dan diganti sesi baru dengan konfigurasi ini.
+    """
+    device_id = str(device_id)
+    old = None
+    with _sessions_lock:
+        session = _sessions.get(device_id)
+        if session is not None and replace and not session.matches(model, b_coef, a_coef, every_lines):
+            old, session = session, None
+        if session is None:
+            session = DeviceSession(device_id, model, b_coef, a_coef, every_lines)
+            _sessions[device_id] = session
+    if old is not None:
+        old.close()
+    return session
+
+
+def _get(device_id):
+    session = _sessions.get(str(device_id))
+    if session is None:
+        raise KeyError("No session for device {}".format(device_id))
+    return session
+
+
+def session_open(device_id, config_json=None):
+    """
+    config_json opsional: {"model_dalam": {...}, "b": [...], "a": [...], "every_lines": n}.
+    Config untuk device yang sesinya sudah terbuka dengan konfigurasi lain
+    mengganti sesi itu ("replaced": true).
+    """
+    try:
+        config = json.loads(config_json) if isinstance(config_json, str) else (config_json or {})
+        previous = _sessions.get(str(device_id))
+        session = open_session(device_id, config.get("model_dalam"), config.get("b"), config.get("a"),
+                               config.get("every_lines", tire_depth.PREVIEW_EVERY_LINES),
+                               replace=bool(config))
+        result = session.info()
+        result["replaced"] = previous is not None and session is not previous
+        result["success"] = True
+        return json.dumps(result)
+    except Exception as e:
+        return json.dumps({"success": False, "message": "session_open exception: {}".format(str(e))})
+
+
+def session_feed(device_id, lines):
+    """Baris baru dari satu device (sesi dibuka lewat session_open); return jumlah batch yang masih antri"""
+    try:
+        backlog = _get(device_id).feed(lines)
+        return json.dumps({"success": True, "backlog": backlog})
+    except Exception as e:
+        return json.dumps({"success": False, "message": "session_feed exception: {}".format(str(e))})
+
+
+def session_preview(device_id):
+    try:
+        return json.dumps(_get(device_id).preview())
+    except Exception as e:
+        return json.dumps({"success": False, "message": "session_preview exception: {}".format(str(e))})
+
+
+def session_finish(device_id, waveform_points=0):
+    """STOP dari device: hasil akhir scan, sesi siap untuk ban berikutnya"""
+    try:
+        return _get(device_id).finish(int(waveform_points))
+    except Exception as e:
+        return json.dumps({"success": False, "message": "session_finish exception: {}".format(str(e))})
+
+
+def session_close(device_id):
+    """Device terputus: hentikan worker dan buang state sesi"""
+    try:
+        with _sessions_lock:
+            session = _sessions.pop(str(device_id), None)
+        if session is not None:
+            session.close()
+        return json.dumps({"success": True, "closed": session is not None})
+    except Exception as e:
+        return json.dumps({"success": False, "message": "session_close exception: {}".format(str(e))})
+
+
+def session_list():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return json.dumps({"success": True, "sessions": [s.info() for s in sessions]})
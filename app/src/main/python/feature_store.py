@@ -0,0 +1,259 @@
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+
+import ccd_core
+import fleet_eval
+import history_store
+import tire_depth
+
+# ============================================================================
+# CACHE FITUR PER SCAN (APPEND-ONLY, BERKUNCI scan_id)
+# ============================================================================
+# Setelah parse + filter, hanya valley per sensor, jumlah pixel dan jumlah
+# pixel tegangan tinggi sensor 1 & 6 yang dibutuhkan untuk memilih model
+# dan memprediksi kedalaman. Fitur itu disimpan sebagai record ukuran tetap
+# (FEATURE_DTYPE) sehingga kalibrasi baru cukup diterapkan ulang ke fitur
+# tanpa parse/filter ulang (lihat recompute).
+#
+# Fingerprint merangkum semua yang mempengaruhi fitur: koefisien filter,
+# mode inisialisasi filter dan threshold tegangan AUS. Record dengan
+# fingerprint berbeda dari konfigurasi aktif dianggap basi dan diproses
+# ulang dari scan mentah (mis. arsip scan_archive) jika tersedia.
+#
+# Record untuk scan_id yang sama boleh ditambahkan lagi; yang terakhir menang.
+#
+# Fitur hanya diambil dari stage yang dijalankan process_file: pada scan
+# AUS (early exit) valley sensor 2-5 tidak dihitung dan ditandai
+# VALLEY_SKIPPED. Jika threshold AUS kemudian berubah sehingga scan itu
+# bukan AUS lagi, record-nya diperlakukan seperti record basi.
+
+FEATURE_DTYPE = np.dtype([
+    ("scan_id", "<i8"),
+    ("timestamp", "<f8"),
+    ("fingerprint", "<u4"),
+    ("valleys", "<f8", (6,)),       # mV minimum sinyal terfilter, NaN = sensor kosong
+    ("valley_pixel", "<i2", (6,)),  # pixel fisik valley, -1 = tidak ada
+    ("pixel_counts", "<u2", (6,)),  # pixel yang benar-benar diterima
+    ("high_counts", "<u2", (2,)),   # pixel terfilter > AUS_VOLTAGE_THRESH, sensor 1 & 6
+])
+VALLEY_SKIPPED = -2                 # valley_pixel: dilewati early exit AUS
+
+
+def filter_fingerprint(b_coef=None, a_coef=None, voltage_thresh=None, mode=ccd_core.INIT_EDGE):
+    """CRC32 konfigurasi yang menentukan isi fitur"""
+    b_coef = tire_depth.b if b_coef is None else b_coef
+    a_coef = tire_depth.a if a_coef is None else a_coef
+    voltage_thresh = tire_depth.AUS_VOLTAGE_THRESH if voltage_thresh is None else voltage_thresh
+    packed = struct.pack("<6d", *([float(v) for v in b_coef] + [float(v) for v in a_coef] + [float(voltage_thresh)]))
+    return zlib.crc32(packed + mode.encode("ascii"))
+
+
+def features_from_graph(graph, scan_id, timestamp=None, early_exit=True):
+    """
+    Satu record fitur dari ScanGraph. Memakai stage yang sudah di-memo
+    graph (mis. dari process_file) dengan aturan skip yang sama: jika
+    early_exit dan scan AUS, sensor 2-5 tidak difilter (VALLEY_SKIPPED).
+    Sensor dengan pixel < MIN_VALLEY_PIXELS tidak punya valley.
+    """
+    rec = np.zeros(1, dtype=FEATURE_DTYPE)
+    rec["scan_id"] = int(scan_id)
+    rec["timestamp"] = time.time() if timestamp is None else float(timestamp)
+    rec["fingerprint"] = filter_fingerprint(graph.b_coef, graph.a_coef)
+    rec["valleys"] = np.nan
+    rec["valley_pixel"] = -1
+
+    sensors = graph.sensors()
+    _, label = graph.classification()
+    skip = (2, 3, 4, 5) if early_exit and label == "HARDCODED_AUS" else ()
+    for sid in range(1, 7):
+        rec["pixel_counts"][0, sid - 1] = min(graph.pixel_count(sid), 65535)
+        if sid in skip:
+            if len(sensors.get(sid, [])) >= tire_depth.MIN_VALLEY_PIXELS:
+                rec["valley_pixel"][0, sid - 1] = VALLEY_SKIPPED
+            continue
+        valley = graph.valley(sid)
+        if valley is not None:
+            rec["valleys"][0, sid - 1] = valley[0]
+            rec["valley_pixel"][0, sid - 1] = graph.pixel_offset(sid) + valley[1]
+    for col, sid in enumerate((1, 6)):
+        rec["high_counts"][0, col] = min(
+            ccd_core.count_above(graph.filtered(sid), tire_depth.AUS_VOLTAGE_THRESH), 65535
+        )
+    return rec
+
+
+class FeatureStore:
+    """Store fitur berindex scan_id; file dibaca sekali, record baru di-append"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._data = np.zeros(0, dtype=FEATURE_DTYPE)
+        self._size = 0
+        self._index = {}
+
+        if path and os.path.exists(path):
+            raw = np.fromfile(path, dtype=np.uint8)
+            whole = (len(raw) // FEATURE_DTYPE.itemsize) * FEATURE_DTYPE.itemsize
+            self._data = raw[:whole].view(FEATURE_DTYPE).copy()
+            self._size = len(self._data)
+            for row, scan_id in enumerate(self._data["scan_id"].tolist()):
+                self._index[scan_id] = row
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def records(self):
+        """Record terbaru per scan_id (urut nomor record)"""
+        rows = np.fromiter(sorted(self._index.values()), dtype=np.intp, count=len(self._index))
+        return self._data[rows]
+
+    def get(self, scan_id):
+        row = self._index.get(int(scan_id))
+        return None if row is None else self._data[row]
+
+    def append(self, rec):
+        if self.path:
+            # buang record terpotong (app mati saat menulis) sebelum append
+            with open(self.path, "ab") as f:
+                f.truncate(self._size * FEATURE_DTYPE.itemsize)
+                f.write(rec.tobytes())
+
+        if self._size + len(rec) > len(self._data):
+            grown = np.zeros(max(self._size + len(rec), 2 * len(self._data), 64), dtype=FEATURE_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:self._size + len(rec)] = rec
+        for scan_id in rec["scan_id"].tolist():
+            self._index[scan_id] = self._size
+            self._size += 1
+
+    def add_graph(self, graph, scan_id, timestamp=None, early_exit=True):
+        rec = features_from_graph(graph, scan_id, timestamp, early_exit)
+        self.append(rec)
+        return rec[0]
+
+
+# ============================================================================
+# RECOMPUTE DARI FITUR
+# ============================================================================
+
+def evaluate_features(records, model=None):
+    """Pipeline fleet_eval (model, 4 alur terkecil, kondisi) dari record fitur"""
+    valleys = records["valleys"].astype(float)
+    valleys[records["pixel_counts"] < tire_depth.MIN_VALLEY_PIXELS] = np.nan
+    return fleet_eval.evaluate_valleys(valleys, fleet_eval.aus_mask(records["high_counts"]), model)
+
+
+def _stale(records, fingerprint):
+    """Record yang harus diproses ulang dari scan mentah"""
+    skipped = (records["valley_pixel"] == VALLEY_SKIPPED).any(axis=1)
+    return (records["fingerprint"] != fingerprint) | (skipped & ~fleet_eval.aus_mask(records["high_counts"]))
+
+
+def recompute(store, model=None, raw_source=None):
+    """
+    Kedalaman semua scan di store dengan model (default MODEL_DALAM aktif).
+
+    Record basi (fingerprint berbeda, atau valley dilewati early exit
+    padahal scan tidak lagi AUS) diproses ulang lewat raw_source
+    (scan_id -> raw input atau ScanGraph) lalu fiturnya diperbarui di store;
+    tanpa raw_source record basi dilewati dan dilaporkan di "stale".
+    Return dict: scan_ids, hasil evaluate_valleys, reprocessed, stale.
+    """
+    current = filter_fingerprint()
+    records = store.records
+    stale_mask = _stale(records, current)
+    reprocessed = []
+    stale = []
+
+    for scan_id in records["scan_id"][stale_mask].tolist():
+        raw = raw_source(scan_id) if raw_source is not None else None
+        if raw is None:
+            stale.append(scan_id)
+            continue
+        graph = raw if isinstance(raw, tire_depth.ScanGraph) else tire_depth.ScanGraph(raw)
+        store.add_graph(graph, scan_id)
+        reprocessed.append(scan_id)
+
+    records = store.records
+    records = records[~_stale(records, current)]
+    result = evaluate_features(records, model)
+    result["scan_ids"] = records["scan_id"]
+    result["valley_pixel"] = records["valley_pixel"]
+    result["reprocessed"] = reprocessed
+    result["stale"] = stale
+    return result
+
+
+# ============================================================================
+# ENTRYPOINT UNTUK KOTLIN
+# ============================================================================
+
+_stores = {}
+
+
+def open_store(path):
+    store = _stores.get(path)
+    if store is None:
+        store = FeatureStore(path)
+        _stores[path] = store
+    return store
+
+
+def process_with_features(raw_input, store_path, scan_id, waveform_points=0):
+    """process_file biasa, lalu fitur scan disimpan dari graph yang sama"""
+    try:
+        graph = tire_depth.ScanGraph(ccd_core.normalize_lines(raw_input))
+        result = tire_depth.process_file(None, graph=graph, waveform_points=waveform_points)
+        if json.loads(result).get("success"):
+            open_store(store_path).add_graph(graph, scan_id)
+        return result
+    except Exception as e:
+        return json.dumps({"success": False, "message": "process_with_features exception: {}".format(str(e))})
+
+
+def recompute_depths(store_path, model_json=None, archive_path=None):
+    """
+    Hitung ulang kedalaman semua scan dari fitur tersimpan. model_json
+    default MODEL_DALAM. archive_path (scan_archive, scan_id = nomor
+    record) dipakai untuk memproses ulang record dengan fingerprint lama.
+    """
+    try:
+        model = json.loads(model_json) if isinstance(model_json, str) else model_json
+        reader = None
+        raw_source = None
+        if archive_path:
+            import scan_archive
+            reader = scan_archive.ScanArchiveReader(archive_path)
+            raw_source = lambda scan_id: reader.graph(scan_id) if 0 <= scan_id < len(reader) else None
+        try:
+            result = recompute(open_store(store_path), model, raw_source)
+        finally:
+            if reader is not None:
+                reader.close()
+
+        labels = fleet_eval.CONDITION_LABELS
+        scans = []
+        for i, scan_id in enumerate(result["scan_ids"].tolist()):
+            depths = result["depths"][i]
+            scans.append({
+                "scan_id": scan_id,
+                "model_used": history_store.MODEL_LABELS[int(result["model"][i])],
+                "depths": [None if np.isnan(d) else float(d) for d in depths],
+                "min_depth": None if np.isnan(result["min_depth"][i]) else float(result["min_depth"][i]),
+                "avg_depth": None if np.isnan(result["avg_depth"][i]) else float(result["avg_depth"][i]),
+                "condition_status": labels[int(result["condition"][i])],
+            })
+        return json.dumps({
+            "success": True,
+            "scans": scans,
+            "reprocessed": result["reprocessed"],
+            "stale": result["stale"],
+        })
+    except Exception as e:
+        return json.dumps({"success": False, "message": "recompute_depths exception: {}".format(str(e))})
@@ -1,6 +1,10 @@
+import json
+import os
 import pandas as pd
 import numpy as np
-from scipy.signal import butter, filtfilt
+from scipy.signal import butter
+
+import ccd_core
 
 # ===== Butterworth Filter Parameters =====
 order = 2
@@ -10,79 +14,352 @@ nyquist = fs / 2
 cutoff_fraction = cutoff_hz / nyquist
 b, a = butter(N=order, Wn=cutoff_fraction, btype='low', analog=False)
 
+
+def filtfilt(b_coef, a_coef, x):
+    """scipy.signal.filtfilt lewat ccd_core (MODE_SCIPY); a_coef format scipy (a0 = 1)"""
+    return ccd_core.filtfilt(x, b_coef, a_coef[1:], ccd_core.MODE_SCIPY)
+
+
 # ===== ADC to mV Conversion Parameters =====
 adc_bits = 12
 adc_max = (2 ** adc_bits) - 1
 vref_mV = 3300
 
+# ===== Spool Parameters =====
+SPOOL_DIRNAME = "terminal_spool"
+SPOOL_STATE_FILE = "spool_state.json"
+SEGMENT_MAX_SAMPLES = 200000
+# nomor sensor dari log boleh bilangan bulat apa pun (termasuk negatif)
+SAMPLE_DTYPE = np.dtype([("sensor", "<i4"), ("pixel", "<i4"), ("adc", "<i4")])
+
+# Blok filtfilt streaming: overlap jauh di atas waktu peluruhan filter
+# (pole |z| ~0.92 -> transien < 1e-14 setelah 512 sampel)
+STREAM_BLOCK = 8192
+STREAM_OVERLAP = 512
+
+
+def parse_samples(lines_list, current_sensor=None):
+    """
+    Mem-parse List<String> menjadi array sampel (sensor, pixel, adc).
+    current_sensor = sensor aktif dari potongan sebelumnya (untuk spool).
+    Return (samples, current_sensor).
+    """
+    sensors, pixels, adcs, current_sensor = ccd_core.parse_samples(
+        ccd_core.to_lines(lines_list), ccd_core.FILTERING, current_sensor
+    )
+
+    samples = np.empty(len(sensors), dtype=SAMPLE_DTYPE)
+    samples["sensor"] = sensors
+    samples["pixel"] = pixels
+    samples["adc"] = adcs
+    return samples, current_sensor
+
+
 def parse_lines_to_df(lines_list):
     """
     Mem-parse List<String> dari Kotlin, bukan file.
     """
-    sensors_data = {}
-    current_sensor = None
-
-    for line in lines_list:
-        line = line.strip()
-
-        if line.startswith("--- SENSOR"):
-            try:
-                sensor_num = int(line.split()[2])
-                current_sensor = sensor_num
-                if current_sensor not in sensors_data:
-                    sensors_data[current_sensor] = {'pixel': [], 'adc_value': []}
-            except (ValueError, IndexError):
-                current_sensor = None
-
-        elif line.startswith("Pixels[") and current_sensor is not None:
-            try:
-                parts = line.split(']')
-                pixel = int(parts[0].replace('Pixels[', '').strip())
-                adc = int(parts[1].replace(':', '').strip())
-                sensors_data[current_sensor]['pixel'].append(pixel)
-                sensors_data[current_sensor]['adc_value'].append(adc)
-            except (ValueError, IndexError):
-                pass
+    samples, _ = parse_samples(lines_list)
 
     sensor_dfs = {}
-    for sensor_num, data in sensors_data.items():
-        if data['pixel']:
-            sensor_dfs[sensor_num] = pd.DataFrame(data)
+    for sensor_num in np.unique(samples["sensor"]):
+        rows = samples[samples["sensor"] == sensor_num]
+        sensor_dfs[int(sensor_num)] = pd.DataFrame({
+            'pixel': rows["pixel"].astype(int),
+            'adc_value': rows["adc"].astype(int),
+        })
 
     return sensor_dfs
 
 
-def process_data_batch(lines_list, storage_path):
+def process_data_batch(lines_list, storage_path, spool=False):
     """
     Fungsi utama yang dipanggil Kotlin.
     Menerima List<String> dan path penyimpanan.
     TANPA plotting. TANPA menyimpan CSV.
-    Mengembalikan satu nilai float (mean dari semua mean sensor).
+    Mengembalikan satu nilai float (mean dari semua mean sensor),
+    0.0 jika tidak ada data.
+
+    spool=True: lines_list ditambahkan ke spool di storage_path lalu
+    ringkasan dihitung dari seluruh spool (lihat process_spool).
+    """
+    if spool:
+        if lines_list:
+            spool_lines(lines_list, storage_path)
+        return process_spool(storage_path)
+
+    # filter streaming per blok + statistik berjalan: tanpa DataFrame per
+    # sensor dan tanpa filtfilt atas seluruh array (lihat RunningStats)
+    return RunningStats().update(lines_list).snapshot()["overall_mean_mV"]
+
+
+# ===== Spool ke Disk untuk Sesi Terminal Panjang =====
+# Potongan baris yang datang di-parse lalu ditulis sebagai record biner
+# (SAMPLE_DTYPE) ke segment append-only di <storage_path>/terminal_spool.
+# State (sensor aktif, segment aktif) disimpan di file JSON sehingga spool
+# bisa dilanjutkan setelah app restart. Ringkasan dihitung dengan membaca
+# segment berurutan; memori terbatas pada satu segment + buffer blok per sensor.
+
+def _spool_dir(storage_path):
+    path = os.path.join(str(storage_path), SPOOL_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _segment_path(spool_dir, index):
+    return os.path.join(spool_dir, "segment_{:06d}.bin".format(index))
+
+
+def _load_state(spool_dir):
+    try:
+        with open(os.path.join(spool_dir, SPOOL_STATE_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"current_sensor": None, "segment": 0, "samples": 0}
+
+
+def _save_state(spool_dir, state):
+    tmp = os.path.join(spool_dir, SPOOL_STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(spool_dir, SPOOL_STATE_FILE))
+
+
+def _segment_paths(spool_dir):
+    names = sorted(n for n in os.listdir(spool_dir) if n.startswith("segment_") and n.endswith(".bin"))
+    return [os.path.join(spool_dir, n) for n in names]
+
+
+def spool_lines(lines_list, storage_path):
     """
-    sensor_dfs = parse_lines_to_df(lines_list)
+    Tambah potongan baris ke spool. Return jumlah sampel total di spool.
+    """
+    spool_dir = _spool_dir(storage_path)
+    state = _load_state(spool_dir)
+    samples, state["current_sensor"] = parse_samples(lines_list, state["current_sensor"])
+
+    written = 0
+    while written < len(samples):
+        path = _segment_path(spool_dir, state["segment"])
+        used = os.path.getsize(path) // SAMPLE_DTYPE.itemsize if os.path.exists(path) else 0
+        room = SEGMENT_MAX_SAMPLES - used
+        if room <= 0:
+            state["segment"] += 1
+            continue
+        chunk = samples[written:written + room]
+        with open(path, "ab") as f:
+            # buang record terpotong (app mati saat menulis) sebelum append
+            f.truncate(used * SAMPLE_DTYPE.itemsize)
+            f.write(chunk.tobytes())
+        written += len(chunk)
+
+    state["samples"] += len(samples)
+    _save_state(spool_dir, state)
+    return state["samples"]
+
 
-    if not sensor_dfs:
-        return 0.0  # Tidak ada data
+def iter_spool(storage_path):
+    """Baca sampel spool per segment (record terpotong di akhir diabaikan)"""
+    for path in _segment_paths(_spool_dir(storage_path)):
+        raw = np.fromfile(path, dtype=np.uint8)
+        whole = (len(raw) // SAMPLE_DTYPE.itemsize) * SAMPLE_DTYPE.itemsize
+        yield raw[:whole].view(SAMPLE_DTYPE)
+
+
+def clear_spool(storage_path):
+    """Hapus semua segment dan state spool"""
+    spool_dir = _spool_dir(storage_path)
+    for path in _segment_paths(spool_dir):
+        os.remove(path)
+    state_path = os.path.join(spool_dir, SPOOL_STATE_FILE)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+
+class StreamingFiltFilt:
+    """
+    filtfilt(b, a, x) untuk x yang datang bertahap.
+    x diproses per blok STREAM_BLOCK dengan overlap STREAM_OVERLAP di
+    kedua sisi; tepi awal/akhir memakai padding filtfilt yang sama dengan
+    pemanggilan atas seluruh sinyal. Memori terbatas pada satu blok.
+    tags (mis. nomor pixel) ikut digeser bersama sampel.
+    """
+
+    def __init__(self, b_coef, a_coef, block=STREAM_BLOCK, overlap=STREAM_OVERLAP):
+        self.b = b_coef
+        self.a = a_coef
+        self.block = block
+        self.overlap = overlap
+        self.buf = np.empty(0)
+        self.tags = np.empty(0, dtype=int)
+        self.started = False
+
+    def feed(self, x, tags=None):
+        """Tambah sampel; return (y, tags) bagian yang sudah final"""
+        x = np.asarray(x, dtype=float)
+        self.buf = np.concatenate([self.buf, x])
+        self.tags = np.concatenate([self.tags, np.zeros(len(x), dtype=int) if tags is None else tags])
+        ov, blk = self.overlap, self.block
+        out_y, out_t = [], []
+        while True:
+            if not self.started and len(self.buf) >= blk + ov:
+                y = filtfilt(self.b, self.a, self.buf[:blk + ov])
+                out_y.append(y[:blk])
+                out_t.append(self.tags[:blk])
+                self.buf = self.buf[blk - ov:]
+                self.tags = self.tags[blk - ov:]
+                self.started = True
+            elif self.started and len(self.buf) >= ov + blk + ov:
+                y = filtfilt(self.b, self.a, self.buf[:ov + blk + ov])
+                out_y.append(y[ov:ov + blk])
+                out_t.append(self.tags[ov:ov + blk])
+                self.buf = self.buf[blk:]
+                self.tags = self.tags[blk:]
+            else:
+                break
+        if not out_y:
+            return np.empty(0), np.empty(0, dtype=int)
+        return np.concatenate(out_y), np.concatenate(out_t)
+
+    def tail(self):
+        """(y, tags) sisa buffer jika sinyal berakhir sekarang (buffer tidak diubah)"""
+        if not len(self.buf):
+            return np.empty(0), np.empty(0, dtype=int)
+        skip = self.overlap if self.started else 0
+        if len(self.buf) <= 3 * max(len(self.a), len(self.b)):
+            # terlalu pendek untuk padding filtfilt: pakai nilai mentah
+            y = self.buf.copy()
+        else:
+            y = filtfilt(self.b, self.a, self.buf)
+        return y[skip:], self.tags[skip:]
+
+
+# ===== Statistik Berjalan per Sensor =====
+# Count, mean, varians (Welford, digabung per potongan dengan rumus Chan),
+# min/max dan kandidat valley dari tegangan terfilter (mV), memori O(1) per
+# sensor. snapshot() di akhir data = hasil process_data_batch tanpa pass ulang.
+
+VALLEY_CANDIDATES = 3
+
+
+class SensorStats:
+    def __init__(self):
+        self.filter = StreamingFiltFilt(b, a)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.valleys = []           # [(mV, pixel)] minimum lokal terendah
+        self.prev = []              # 2 sampel final terakhir untuk deteksi minimum lokal
+
+    def _merge(self, y, pixels, commit=True):
+        """Gabung potongan mV final ke statistik; commit=False -> hitung tanpa menyimpan"""
+        count, mean, m2 = self.count, self.mean, self.m2
+        lo, hi, valleys = self.min, self.max, list(self.valleys)
+        if len(y):
+            n = len(y)
+            chunk_mean = float(y.mean())
+            chunk_m2 = float(((y - chunk_mean) ** 2).sum())
+            total = count + n
+            delta = chunk_mean - mean
+            mean += delta * n / total
+            m2 += chunk_m2 + delta * delta * count * n / total
+            count = total
+            lo = min(lo, float(y.min()))
+            hi = max(hi, float(y.max()))
+
+            # minimum lokal (termasuk yang melewati batas potongan)
+            ext_y = np.concatenate([[v for v, _ in self.prev], y])
+            ext_p = np.concatenate([[p for _, p in self.prev], pixels])
+            mid = np.flatnonzero((ext_y[1:-1] < ext_y[:-2]) & (ext_y[1:-1] <= ext_y[2:])) + 1
+            for i in mid[np.argsort(ext_y[mid])[:VALLEY_CANDIDATES]]:
+                valleys.append((float(ext_y[i]), int(ext_p[i])))
+            valleys = sorted(valleys)[:VALLEY_CANDIDATES]
+
+            if commit:
+                self.prev = list(zip(ext_y[-2:].tolist(), ext_p[-2:].tolist()))
+        if commit:
+            self.count, self.mean, self.m2 = count, mean, m2
+            self.min, self.max, self.valleys = lo, hi, valleys
+        return count, mean, m2, lo, hi, valleys
+
+    def update(self, adc, pixels):
+        y, tags = self.filter.feed(adc, pixels)
+        self._merge((y / adc_max) * vref_mV, tags)
+
+    def snapshot(self):
+        y, tags = self.filter.tail()
+        count, mean, m2, lo, hi, valleys = self._merge((y / adc_max) * vref_mV, tags, commit=False)
+        return {
+            "count": count,
+            "mean_mV": mean if count else None,
+            "std_mV": float(np.sqrt(m2 / (count - 1))) if count > 1 else None,
+            "min_mV": lo if count else None,
+            "max_mV": hi if count else None,
+            "valley_candidates": [{"pixel": p, "mV": v} for v, p in valleys],
+        }
+
+
+class RunningStats:
+    """
+    Akumulator untuk layar terminal: update(lines) per potongan baris dari
+    Kotlin, snapshot() kapan saja untuk statistik live per sensor.
+    """
+
+    def __init__(self):
+        self.sensors = {}
+        self.current_sensor = None
+
+    def update_samples(self, samples):
+        for sensor_num in np.unique(samples["sensor"]):
+            rows = samples[samples["sensor"] == sensor_num]
+            stats = self.sensors.get(int(sensor_num))
+            if stats is None:
+                stats = self.sensors[int(sensor_num)] = SensorStats()
+            stats.update(rows["adc"], rows["pixel"])
+
+    def update(self, lines_list):
+        samples, self.current_sensor = parse_samples(lines_list, self.current_sensor)
+        self.update_samples(samples)
+        return self
+
+    def snapshot(self):
+        sensors = {sensor_num: self.sensors[sensor_num].snapshot() for sensor_num in sorted(self.sensors)}
+        means = [s["mean_mV"] for s in sensors.values() if s["count"]]
+        return {
+            "overall_mean_mV": float(np.mean(means)) if means else 0.0,
+            "sensors": sensors,
+        }
+
+
+def process_spool(storage_path):
+    """
+    Ringkasan process_data_batch atas seluruh spool dengan memori terbatas:
+    mean dari mean tegangan terfilter per sensor.
+    """
+    stats = RunningStats()
+    for samples in iter_spool(storage_path):
+        stats.update_samples(samples)
+    return stats.snapshot()["overall_mean_mV"]
 
-    all_filtered_voltage_means = []
 
-    for sensor_num in sorted(sensor_dfs.keys()):
-        data = sensor_dfs[sensor_num].copy()
+# ===== ENTRYPOINT STATISTIK LIVE UNTUK KOTLIN =====
+_running_stats = RunningStats()
 
-        # STEP 1: Apply Butterworth filter
-        data["adc_filtered"] = filtfilt(b, a, data["adc_value"].values)
 
-        # STEP 2: Convert to mV
-        data["voltage_mV_filtered"] = (data["adc_filtered"] / adc_max) * vref_mV
+def stats_update(lines_list):
+    """Tambah potongan baris ke akumulator live; return snapshot JSON"""
+    try:
+        return json.dumps(dict(_running_stats.update(lines_list).snapshot(), success=True))
+    except Exception as e:
+        return json.dumps({"success": False, "message": "stats_update exception: {}".format(str(e))})
 
-        # Kumpulkan rata-rata voltage dari sensor ini
-        all_filtered_voltage_means.append(data["voltage_mV_filtered"].mean())
 
-    # ===== Kalkulasi Akhir =====
-    if not all_filtered_voltage_means:
-        return 0.0
+def stats_snapshot():
+    return json.dumps(dict(_running_stats.snapshot(), success=True))
 
-    overall_mean = np.mean(all_filtered_voltage_means)
 
-    # Kembalikan hanya satu nilai float
-    return float(overall_mean)
\ No newline at end of file
+def stats_reset():
+    global _running_stats
+    _running_stats = RunningStats()
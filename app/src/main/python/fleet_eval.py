@@ -0,0 +1,223 @@
+import numpy as np
+
+import ccd_core
+import history_store
+import tire_depth
+
+# ============================================================================
+# EVALUASI FLEET (VEKTORISASI)
+# ============================================================================
+# Versi array dari pipeline tire_depth.process_file untuk menghitung ulang
+# banyak scan sekaligus (mis. setelah kalibrasi berubah). Semua langkah
+# (filter, valley, pemilihan model, scaling, prediksi, 4 alur terkecil,
+# kondisi ban) dijalankan sebagai operasi NumPy atas seluruh matriks.
+#
+# Bentuk input:
+#   valleys : (N, 6) mV, NaN = sensor tidak valid
+#   raw     : (N, 6, P) mV per pixel dalam window 280-1080, baris sensor
+#             yang hilang diisi NaN
+#
+# Seperti ScanGraph (sensors_from_frame), setiap baris hanya dievaluasi
+# dari pixel diterima pertama sampai terakhir (span); NaN di tepi window
+# tidak membuat sensor dianggap tidak valid.
+
+CONDITION_LABELS = ("UNKNOWN", "AUS", "HAMPIR_AUS", "NORMAL", "BAIK")
+CONDITION_BINS = (1.6, 2.0, 3.0)
+
+
+# ============================================================================
+# FILTER BUTTERWORTH PER BARIS
+# ============================================================================
+def frame_spans(raw):
+    """
+    (start, stop) pixel non-NaN pertama / terakhir+1 per baris, bentuk
+    raw.shape[:-1] masing-masing. Baris kosong: start = stop = 0.
+    """
+    present = ~np.isnan(np.asarray(raw, dtype=float))
+    width = present.shape[-1]
+    any_present = present.any(axis=-1)
+    start = np.where(any_present, np.argmax(present, axis=-1), 0)
+    stop = np.where(any_present, width - np.argmax(present[..., ::-1], axis=-1), 0)
+    return start, stop
+
+
+def filtfilt_matrix(raw, b_coef=None, a_coef=None, spans=None):
+    """
+    Zero-phase filtering di sepanjang sumbu terakhir untuk semua baris.
+    Setiap baris difilter atas span-nya saja (default frame_spans(raw)),
+    sama dengan ScanGraph.filtered; di luar span hasilnya NaN.
+    """
+    b_coef = tire_depth.b if b_coef is None else b_coef
+    a_coef = tire_depth.a if a_coef is None else a_coef
+    raw = np.asarray(raw, dtype=float)
+    start, stop = frame_spans(raw) if spans is None else spans
+
+    width = raw.shape[-1]
+    rows = raw.reshape(-1, width)
+    start = np.asarray(start).reshape(-1, 1)
+    length = np.asarray(stop).reshape(-1, 1) - start
+    j = np.arange(width)
+    inside = j < length
+
+    # rata kiri: kolom 0 = pixel pertama span, inisialisasi y[0]=x[0] per baris
+    left = np.take_along_axis(rows, np.minimum(start + j, width - 1), axis=-1)
+    left = np.where(inside, left, 0.0)
+    if width < 3:
+        filtered = left
+    else:
+        # (P, R) supaya setiap langkah rekursi membaca satu baris memori kontigu
+        forward = ccd_core.lowpass_columns(np.ascontiguousarray(left.T), b_coef, a_coef).T
+        # pass mundur dimulai dari pixel terakhir span masing-masing
+        tail = np.maximum(length - 1 - j, 0)
+        reverse = np.where(inside, np.take_along_axis(forward, tail, axis=-1), 0.0)
+        backward = ccd_core.lowpass_columns(np.ascontiguousarray(reverse.T), b_coef, a_coef).T
+        filtered = np.take_along_axis(backward, tail, axis=-1)
+
+    out = np.full(rows.shape, np.nan)
+    r, k = np.nonzero(inside)
+    out[r, start[r, 0] + k] = filtered[r, k]
+    return out.reshape(raw.shape)
+
+
+# ============================================================================
+# VALLEY & KLASIFIKASI DARI MATRIKS RAW
+# ============================================================================
+
+def stack_frames(raw_inputs, pixel_counts_out=None, spans_out=None):
+    """
+    Parse banyak log CCD ke matriks raw (N, 6, window) lewat
+    tire_depth.parse_ccd_frame, celah interior diinterpolasi. Di luar pixel
+    diterima pertama/terakhir tetap NaN; sinyal produksi satu sensor adalah
+    frames[n, i, start:stop] (sama dengan sensors_from_frame).
+    pixel_counts_out (list) diisi array (N, 6) pixel yang benar-benar
+    diterima, spans_out (list) diisi (start, stop) masing-masing (N, 6).
+    """
+    raw_inputs = list(raw_inputs)
+    width = tire_depth.PIXEL_MAX - tire_depth.PIXEL_MIN + 1
+    frames = np.empty((len(raw_inputs), 6, width))
+    pixel_counts = np.zeros((len(raw_inputs), 6), dtype=int)
+    start = np.zeros((len(raw_inputs), 6), dtype=int)
+    stop = np.zeros((len(raw_inputs), 6), dtype=int)
+    for n, raw in enumerate(raw_inputs):
+        values, counts = tire_depth.parse_ccd_frame(raw)
+        received = counts > 0
+        frames[n] = tire_depth.repair_gaps(values, received)
+        pixel_counts[n] = np.count_nonzero(counts, axis=1)
+        start[n], stop[n] = frame_spans(np.where(received, 0.0, np.nan))
+    if pixel_counts_out is not None:
+        pixel_counts_out.append(pixel_counts)
+    if spans_out is not None:
+        spans_out.append((start, stop))
+    return frames
+
+
+def valleys_from_raw(raw, b_coef=None, a_coef=None, min_pixels=None,
+                     pixel_counts=None, voltage_thresh=None, filtered=None, spans=None):
+    """
+    raw (N, 6, P) -> (valleys (N, 6), valley_index (N, 6), high_counts (N, 2))
+    valley_index = kolom window (pixel - PIXEL_MIN). high_counts = jumlah
+    pixel terfilter > voltage_thresh (default AUS_VOLTAGE_THRESH) pada
+    sensor 1 dan 6. pixel_counts (N, 6) = pixel yang benar-benar diterima
+    untuk cek min_pixels (default: lebar span, termasuk hasil interpolasi);
+    filtered boleh diisi hasil filtfilt_matrix yang sudah ada supaya tidak
+    difilter ulang. spans default frame_spans(raw).
+    """
+    min_pixels = tire_depth.MIN_VALLEY_PIXELS if min_pixels is None else min_pixels
+    voltage_thresh = tire_depth.AUS_VOLTAGE_THRESH if voltage_thresh is None else voltage_thresh
+    raw = np.asarray(raw, dtype=float)
+    start, stop = frame_spans(raw) if spans is None else spans
+    if filtered is None:
+        filtered = filtfilt_matrix(raw, b_coef, a_coef, (start, stop))
+
+    counts = (stop - start) if pixel_counts is None else np.asarray(pixel_counts)
+    valid = (stop > start) & (counts >= min_pixels)
+
+    safe = np.where(valid[..., None] & ~np.isnan(filtered), filtered, np.inf)
+    index = np.argmin(safe, axis=-1)
+    valleys = np.take_along_axis(filtered, index[..., None], axis=-1)[..., 0]
+    valleys[~valid] = np.nan
+    index[~valid] = -1
+
+    high = filtered[:, [0, 5], :] > voltage_thresh
+    high_counts = high.sum(axis=-1)
+    return valleys, index, high_counts
+
+
+def aus_mask(high_counts, count_thresh=None):
+    """Ban AUS jika sensor 1 DAN 6 punya >= count_thresh pixel tegangan tinggi"""
+    count_thresh = tire_depth.AUS_COUNT_THRESH if count_thresh is None else count_thresh
+    return np.all(np.asarray(high_counts) >= count_thresh, axis=-1)
+
+
+# ============================================================================
+# SCALING, PREDIKSI, 4 ALUR TERKECIL, KONDISI
+# ============================================================================
+
+def evaluate_valleys(valleys, aus=None, model=None):
+    """
+    Evaluasi N scan sekaligus dari matriks valley (N, 6).
+
+    aus (N,) bool menandai scan yang memakai kedalaman hardcoded
+    (default semua False). Return dict array:
+      scaled, depths (N, 6); smallest_4 (N, 4) index sensor 0-5 atau -1;
+      min_depth, avg_depth (N,); condition (N,) index ke CONDITION_LABELS;
+      model (N,) index ke history_store.MODEL_LABELS (DALAM / HARDCODED_AUS).
+    """
+    model = tire_depth.MODEL_DALAM if model is None else model
+    valleys = np.atleast_2d(np.asarray(valleys, dtype=float))
+    n = len(valleys)
+    aus = np.zeros(n, dtype=bool) if aus is None else np.asarray(aus, dtype=bool)
+
+    span = model["max"] - model["min"]
+    if span == 0:
+        scaled = np.where(np.isnan(valleys), np.nan, 0.0)
+    else:
+        scaled = (valleys - model["min"]) / span
+    depths = ccd_core.depth_lut(model)(valleys)
+
+    hardcoded = np.array([np.nan if d is None else d for d in tire_depth.HARDCODED_AUS_DEPTHS])
+    depths[aus] = hardcoded
+    scaled[aus] = np.nan
+
+    # urutan stabil seperti sorted() di process_file; NaN di belakang
+    order = np.argsort(np.where(np.isnan(depths), np.inf, depths), axis=1, kind="stable")[:, :4]
+    top4 = np.take_along_axis(depths, order, axis=1)
+    top4_valid = ~np.isnan(top4)
+    order[~top4_valid] = -1
+
+    count = top4_valid.sum(axis=1)
+    min_depth = np.where(count > 0, top4[:, 0], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_depth = np.where(top4_valid, top4, 0.0).sum(axis=1) / count
+    avg_depth[count == 0] = np.nan
+
+    condition = np.digitize(min_depth, CONDITION_BINS).astype(np.uint8) + 1
+    condition[np.isnan(min_depth)] = 0
+
+    return {
+        "scaled": scaled,
+        "depths": depths,
+        "smallest_4": order,
+        "min_depth": min_depth,
+        "avg_depth": avg_depth,
+        "condition": condition,
+        "model": np.where(aus, history_store.model_code("HARDCODED_AUS"),
+                          history_store.model_code("DALAM")).astype(np.uint8),
+    }
+
+
+def evaluate_raw(raw, model=None, b_coef=None, a_coef=None, pixel_counts=None):
+    """Pipeline penuh dari matriks raw (N, 6, P); pixel_counts lihat valleys_from_raw"""
+    valleys, index, high_counts = valleys_from_raw(raw, b_coef, a_coef, pixel_counts=pixel_counts)
+    result = evaluate_valleys(valleys, aus_mask(high_counts), model)
+    result["valleys"] = valleys
+    result["valley_index"] = index
+    result["high_counts"] = high_counts
+    return result
+
+
+def evaluate_history(store, model=None):
+    """Hitung ulang kedalaman semua record history_store dengan model baru"""
+    records = store.records
+    aus = records["model"] == history_store.model_code("HARDCODED_AUS")
+    return evaluate_valleys(records["valleys"].astype(float), aus, model)
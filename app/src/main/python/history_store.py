@@ -0,0 +1,252 @@
+import json
+import os
+import time
+import numpy as np
+
+# ============================================================================
+# RIWAYAT HASIL CEK BAN (APPEND-ONLY, KOLUMNAR)
+# ============================================================================
+# Satu file biner berisi record ukuran tetap (RECORD_DTYPE). Record baru
+# hanya ditambahkan di akhir file, jadi crash di tengah tulis paling banyak
+# meninggalkan satu record terpotong: diabaikan saat load dan dipotong dari
+# file sebelum append berikutnya supaya record baru tetap sejajar. Di memori
+# data disimpan sebagai structured array sehingga setiap field bisa dibaca
+# sebagai kolom NumPy untuk query vektor.
+
+LEGAL_LIMIT_MM = 1.6
+SECONDS_PER_DAY = 86400.0
+
+POSITIONS = ("DKA", "DKI", "BKA", "BKI")
+MODEL_LABELS = ("UNKNOWN", "DALAM", "DANGKAL", "HARDCODED_AUS")
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),       # epoch detik
+    ("bus", "<i8"),             # idBus dari Room
+    ("position", "u1"),         # index ke POSITIONS
+    ("model", "u1"),            # index ke MODEL_LABELS
+    ("depths", "<f4", (6,)),    # mm, NaN = sensor tidak valid
+    ("valleys", "<f4", (6,)),   # mV, NaN = sensor tidak valid
+])
+
+
+def position_code(position):
+    """'D-KA' / 'DKA' / 0 -> index posisi"""
+    if isinstance(position, (int, np.integer)):
+        if not 0 <= int(position) < len(POSITIONS):
+            raise ValueError("Unknown tire position: {}".format(position))
+        return int(position)
+    name = str(position).upper().replace("-", "").strip()
+    if name not in POSITIONS:
+        raise ValueError("Unknown tire position: {}".format(position))
+    return POSITIONS.index(name)
+
+
+def model_code(label):
+    return MODEL_LABELS.index(label) if label in MODEL_LABELS else 0
+
+
+def _to_float_row(values):
+    row = np.full(6, np.nan, dtype=np.float32)
+    for i, v in enumerate(list(values)[:6]):
+        if v is not None:
+            row[i] = v
+    return row
+
+
+class HistoryStore:
+    """
+    Store riwayat per ban dengan index (bus, posisi) -> nomor record.
+    Query latest/wear_rate/projected_limit_date hanya menyentuh record
+    ban yang diminta.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._data = np.zeros(0, dtype=RECORD_DTYPE)
+        self._size = 0
+        self._index = {}
+
+        if path and os.path.exists(path):
+            raw = np.fromfile(path, dtype=np.uint8)
+            whole = (len(raw) // RECORD_DTYPE.itemsize) * RECORD_DTYPE.itemsize
+            self._data = raw[:whole].view(RECORD_DTYPE).copy()
+            self._size = len(self._data)
+            self._build_index()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def records(self):
+        """Structured array semua record (view, jangan diubah)"""
+        return self._data[:self._size]
+
+    def _build_index(self):
+        rec = self.records
+        keys = rec["bus"] * len(POSITIONS) + rec["position"]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        self._index = {}
+        for s, e in zip(starts, ends):
+            key = int(sorted_keys[s])
+            self._index[divmod(key, len(POSITIONS))] = list(order[s:e])
+
+    def _grow(self, extra):
+        need = self._size + extra
+        if need <= len(self._data):
+            return
+        capacity = max(need, 2 * len(self._data), 64)
+        grown = np.zeros(capacity, dtype=RECORD_DTYPE)
+        grown[:self._size] = self.records
+        self._data = grown
+
+    def append(self, bus, position, depths, valleys=None, model_label="UNKNOWN", timestamp=None):
+        """Tambah satu hasil cek; langsung ditulis ke file jika ada path"""
+        rec = np.zeros(1, dtype=RECORD_DTYPE)
+        rec["timestamp"] = time.time() if timestamp is None else float(timestamp)
+        rec["bus"] = int(bus)
+        rec["position"] = position_code(position)
+        rec["model"] = model_code(model_label)
+        rec["depths"][0] = _to_float_row(depths)
+        rec["valleys"][0] = _to_float_row(valleys if valleys is not None else [])
+
+        if self.path:
+            # buang record terpotong (app mati saat menulis) sebelum append
+            with open(self.path, "ab") as f:
+                f.truncate(self._size * RECORD_DTYPE.itemsize)
+                f.write(rec.tobytes())
+
+        self._grow(1)
+        row = self._size
+        self._data[row] = rec[0]
+        self._size += 1
+        key = (int(bus), int(rec["position"][0]))
+        self._index.setdefault(key, []).append(row)
+        return row
+
+    def append_result(self, bus, position, result, timestamp=None):
+        """Tambah hasil process_file (dict atau string JSON)"""
+        if isinstance(result, str):
+            result = json.loads(result)
+        data = sorted(result.get("data", []), key=lambda d: d["sensor"])
+        return self.append(
+            bus, position,
+            depths=[d.get("depth") for d in data],
+            valleys=[d.get("valley") for d in data],
+            model_label=result.get("model_used", "UNKNOWN"),
+            timestamp=timestamp,
+        )
+
+    def _tire_records(self, bus, position):
+        rows = self._index.get((int(bus), position_code(position)))
+        if not rows:
+            return self._data[:0]
+        rec = self.records[np.asarray(rows)]
+        return rec[np.argsort(rec["timestamp"], kind="stable")]
+
+    def _series(self, bus, position, groove=None):
+        """(t hari, kedalaman) urut waktu; groove None = alur terkecil"""
+        rec = self._tire_records(bus, position)
+        depths = rec["depths"]
+        if groove is None:
+            valid = ~np.all(np.isnan(depths), axis=1)
+            y = np.full(len(rec), np.nan)
+            y[valid] = np.nanmin(depths[valid], axis=1)
+        else:
+            y = depths[:, int(groove) - 1].astype(float)
+        keep = ~np.isnan(y)
+        return rec["timestamp"][keep] / SECONDS_PER_DAY, y[keep]
+
+    def latest(self, bus, position, n=5):
+        """N record terakhir ban ini (terbaru dulu)"""
+        return self._tire_records(bus, position)[::-1][:int(n)]
+
+    def wear_fit(self, bus, position, groove=None):
+        """
+        Least squares kedalaman vs waktu.
+        Return (slope mm/hari, intercept mm pada t=0 hari epoch, jumlah titik)
+        atau None jika titik < 2 / waktu tidak bervariasi.
+        """
+        t, y = self._series(bus, position, groove)
+        if len(t) < 2:
+            return None
+        t_mean = t.mean()
+        dt = t - t_mean
+        denom = float(np.dot(dt, dt))
+        if denom == 0.0:
+            return None
+        slope = float(np.dot(dt, y - y.mean()) / denom)
+        intercept = float(y.mean() - slope * t_mean)
+        return slope, intercept, len(t)
+
+    def wear_rate(self, bus, position, groove=None):
+        """Laju aus mm/hari (positif = menipis)"""
+        fit = self.wear_fit(bus, position, groove)
+        return None if fit is None else -fit[0]
+
+    def projected_limit_date(self, bus, position, limit=LEGAL_LIMIT_MM, groove=None):
+        """Perkiraan epoch detik saat kedalaman mencapai limit (None jika tidak menipis)"""
+        fit = self.wear_fit(bus, position, groove)
+        if fit is None or fit[0] >= 0:
+            return None
+        slope, intercept, _ = fit
+        return float((limit - intercept) / slope * SECONDS_PER_DAY)
+
+    def trend(self, bus, position, n=5, limit=LEGAL_LIMIT_MM):
+        """Ringkasan tren satu ban (dict siap JSON)"""
+        latest = self.latest(bus, position, n)
+        fit = self.wear_fit(bus, position)
+        return {
+            "bus": int(bus),
+            "position": POSITIONS[position_code(position)],
+            "latest": [
+                {
+                    "timestamp": float(r["timestamp"]),
+                    "model_used": MODEL_LABELS[int(r["model"])],
+                    "depths": [None if np.isnan(v) else float(v) for v in r["depths"]],
+                    "valleys": [None if np.isnan(v) else float(v) for v in r["valleys"]],
+                }
+                for r in latest
+            ],
+            "points": 0 if fit is None else fit[2],
+            "wear_rate_mm_per_day": None if fit is None else -fit[0],
+            "projected_limit_date": self.projected_limit_date(bus, position, limit),
+            "legal_limit_mm": limit,
+        }
+
+
+# ============================================================================
+# ENTRYPOINT UNTUK KOTLIN
+# ============================================================================
+
+_stores = {}
+
+
+def open_store(path):
+    """Store per path di-cache supaya index tidak dibangun ulang tiap panggilan"""
+    store = _stores.get(path)
+    if store is None:
+        store = HistoryStore(path)
+        _stores[path] = store
+    return store
+
+
+def record_result(path, bus_id, posisi, result_json, timestamp=None):
+    """Simpan hasil process_file ke riwayat"""
+    try:
+        row = open_store(path).append_result(bus_id, posisi, result_json, timestamp)
+        return json.dumps({"success": True, "row": int(row)})
+    except Exception as e:
+        return json.dumps({"success": False, "message": "record_result exception: {}".format(str(e))})
+
+
+def get_trend(path, bus_id, posisi, n=5):
+    """Tren aus satu ban: N cek terakhir, laju aus, dan perkiraan tanggal batas legal"""
+    try:
+        trend = open_store(path).trend(bus_id, posisi, int(n))
+        trend["success"] = True
+        return json.dumps(trend)
+    except Exception as e:
+        return json.dumps({"success": False, "message": "get_trend exception: {}".format(str(e))})
@@ -0,0 +1,213 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fleet_eval
+import scan_archive
+import tire_depth
+
+# ============================================================================
+# SWEEP PARAMETER FILTER & THRESHOLD
+# ============================================================================
+# Corpus scan berlabel di-parse sekali (bisa disimpan ke .npz), lalu grid
+# kombinasi cutoff_hz x voltage_thresh x count_thresh x min_pixels
+# dievaluasi di process pool. Setiap task memegang satu cutoff: matriks
+# terfilter dihitung sekali lalu dipakai untuk semua kombinasi threshold.
+#
+# Koefisien tire_depth saat ini setara cutoff 54.8 Hz pada fs 548 Hz.
+# Setiap sensor dievaluasi atas span pixel diterimanya (corpus "start" /
+# "stop") seperti process_file, jadi scan ber-window parsial ikut dinilai
+# dengan angka yang sama dengan aplikasi.
+
+DEFAULT_GRID = {
+    "cutoff_hz": [30.0, 40.0, 54.8, 70.0],
+    "voltage_thresh": [2700.0, 2800.0, 2900.0],
+    "count_thresh": [1, 2, 3],
+    "min_pixels": [30, 50, 80],
+}
+
+
+# ============================================================================
+# CORPUS
+# ============================================================================
+
+def load_corpus(items, archive_path=None):
+    """
+    items: [{"log": path/list baris | "record": i, "depths": [mm x 6], "aus": bool?}]
+    "record" dibaca dari archive_path (scan_archive). Label AUS default:
+    kedalaman ukur terkecil < batas legal.
+    """
+    n = len(items)
+    width = tire_depth.PIXEL_MAX - tire_depth.PIXEL_MIN + 1
+    frames = np.empty((n, 6, width))
+    pixel_counts = np.zeros((n, 6), dtype=int)
+    start = np.zeros((n, 6), dtype=int)
+    stop = np.zeros((n, 6), dtype=int)
+    depths = np.full((n, 6), np.nan)
+    aus = np.zeros(n, dtype=bool)
+
+    reader = scan_archive.ScanArchiveReader(archive_path) if archive_path else None
+    try:
+        for i, item in enumerate(items):
+            if "record" in item:
+                scan = reader.read(int(item["record"]))
+                values, counts = scan["values"], scan["counts"]
+            else:
+                log = item["log"]
+                if isinstance(log, str) and os.path.exists(log):
+                    with open(log, "r", encoding="utf-8") as f:
+                        log = f.read()
+                values, counts = tire_depth.parse_ccd_frame(log)
+            frames[i] = tire_depth.repair_gaps(values, counts > 0)
+            pixel_counts[i] = np.count_nonzero(counts, axis=1)
+            # span pixel diterima (pertama, terakhir+1); sensor kosong 0, 0
+            received = counts > 0
+            any_received = received.any(axis=1)
+            start[i] = np.where(any_received, received.argmax(axis=1), 0)
+            stop[i] = np.where(any_received, width - received[:, ::-1].argmax(axis=1), 0)
+
+            row = [np.nan if v is None else float(v) for v in item["depths"]][:6]
+            depths[i, :len(row)] = row
+            if "aus" in item:
+                aus[i] = bool(item["aus"])
+            else:
+                measured = depths[i][np.isfinite(depths[i])]
+                aus[i] = bool(len(measured)) and measured.min() < fleet_eval.CONDITION_BINS[0]
+    finally:
+        if reader is not None:
+            reader.close()
+
+    return {"frames": frames, "pixel_counts": pixel_counts, "start": start, "stop": stop,
+            "depths": depths, "aus": aus}
+
+
+def save_corpus(path, corpus):
+    np.savez_compressed(path, **corpus)
+
+
+def open_corpus(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def corpus_spans(corpus):
+    return corpus["start"], corpus["stop"]
+
+
+# ============================================================================
+# EVALUASI SATU KOMBINASI
+# ============================================================================
+
+def score(corpus, filtered, voltage_thresh, count_thresh, min_pixels, model=None):
+    """Error kedalaman dan akurasi klasifikasi AUS untuk satu kombinasi"""
+    valleys, _, high_counts = fleet_eval.valleys_from_raw(
+        corpus["frames"], min_pixels=min_pixels, pixel_counts=corpus["pixel_counts"],
+        voltage_thresh=voltage_thresh, filtered=filtered, spans=corpus_spans(corpus)
+    )
+    result = fleet_eval.evaluate_valleys(valleys, fleet_eval.aus_mask(high_counts, count_thresh), model)
+
+    err = result["depths"] - corpus["depths"]
+    err = err[np.isfinite(err)]
+    measured_min = np.where(np.isfinite(corpus["depths"]), corpus["depths"], np.inf).min(axis=1)
+    min_err = result["min_depth"] - measured_min
+    min_err = min_err[np.isfinite(min_err)]
+
+    predicted_aus = result["condition"] == fleet_eval.CONDITION_LABELS.index("AUS")
+    return {
+        "voltage_thresh": float(voltage_thresh),
+        "count_thresh": int(count_thresh),
+        "min_pixels": int(min_pixels),
+        "depth_samples": int(len(err)),
+        "depth_mae_mm": float(np.abs(err).mean()) if len(err) else None,
+        "depth_rmse_mm": float(np.sqrt(np.mean(err * err))) if len(err) else None,
+        "min_depth_mae_mm": float(np.abs(min_err).mean()) if len(min_err) else None,
+        "aus_accuracy": float(np.mean(predicted_aus == corpus["aus"])) if len(predicted_aus) else None,
+    }
+
+
+_CORPUS = None
+
+
+def _init_worker(corpus):
+    global _CORPUS
+    _CORPUS = corpus
+
+
+def _evaluate_cutoff(task):
+    cutoff_hz, combos, model = task
+    b_coef, a_coef = tire_depth.design_butter_lowpass(cutoff_hz)
+    filtered = fleet_eval.filtfilt_matrix(_CORPUS["frames"], b_coef, a_coef, corpus_spans(_CORPUS))
+    rows = []
+    for voltage_thresh, count_thresh, min_pixels in combos:
+        row = score(_CORPUS, filtered, voltage_thresh, count_thresh, min_pixels, model)
+        row["cutoff_hz"] = float(cutoff_hz)
+        rows.append(row)
+    return rows
+
+
+def sweep(corpus, grid=None, workers=None, model=None):
+    """Evaluasi seluruh grid; return list hasil urut depth_mae_mm"""
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    combos = list(itertools.product(grid["voltage_thresh"], grid["count_thresh"], grid["min_pixels"]))
+    tasks = [(cutoff, combos, model) for cutoff in grid["cutoff_hz"]]
+
+    if workers == 1:
+        _init_worker(corpus)
+        chunks = [_evaluate_cutoff(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(corpus,)) as pool:
+            chunks = list(pool.map(_evaluate_cutoff, tasks))
+
+    rows = [row for chunk in chunks for row in chunk]
+    rows.sort(key=lambda r: (r["depth_mae_mm"] is None, r["depth_mae_mm"], -(r["aus_accuracy"] or 0.0)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep filter cutoff and AUS/valley thresholds over labeled scans")
+    parser.add_argument("labels", help="JSON list of {log|record, depths, aus?}")
+    parser.add_argument("--archive", help="scan archive for items with 'record'")
+    parser.add_argument("--cache", help=".npz file for the parsed corpus (created if missing)")
+    parser.add_argument("--cutoff", type=float, nargs="+", default=DEFAULT_GRID["cutoff_hz"])
+    parser.add_argument("--vthresh", type=float, nargs="+", default=DEFAULT_GRID["voltage_thresh"])
+    parser.add_argument("--cthresh", type=int, nargs="+", default=DEFAULT_GRID["count_thresh"])
+    parser.add_argument("--min-pixels", type=int, nargs="+", default=DEFAULT_GRID["min_pixels"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    tire_depth.debug_log = lambda message: None
+    t0 = time.perf_counter()
+    if args.cache and os.path.exists(args.cache):
+        corpus = open_corpus(args.cache)
+    else:
+        with open(args.labels, "r", encoding="utf-8") as f:
+            corpus = load_corpus(json.load(f), args.archive)
+        if args.cache:
+            save_corpus(args.cache, corpus)
+    t1 = time.perf_counter()
+
+    grid = {
+        "cutoff_hz": args.cutoff,
+        "voltage_thresh": args.vthresh,
+        "count_thresh": args.cthresh,
+        "min_pixels": args.min_pixels,
+    }
+    rows = sweep(corpus, grid, args.workers)
+    t2 = time.perf_counter()
+    print(json.dumps({
+        "scans": int(len(corpus["frames"])),
+        "combinations": len(rows),
+        "load_s": t1 - t0,
+        "sweep_s": t2 - t1,
+        "best": rows[:args.top],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
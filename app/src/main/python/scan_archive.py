@@ -0,0 +1,351 @@
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+
+import history_store
+import tire_depth
+
+# ============================================================================
+# ARSIP BINER SCAN CCD MENTAH
+# ============================================================================
+# Pengganti log teks "Pixel[ N]: V mV" (~25 byte/sampel) untuk menyimpan
+# setiap inspeksi dan memutarnya ulang langsung ke pipeline tire_depth.
+#
+# Layout file:
+#   FILE_MAGIC, versi (u16)
+#   record*   : panjang payload (u32) + payload zlib
+#   index     : jumlah (u32) + entri INDEX_ENTRY per record
+#   trailer   : offset index (u64) + INDEX_MAGIC
+#
+# Payload (sebelum kompresi):
+#   SCAN_HEADER (bus, posisi, timestamp, mV per LSB), firmware & versi
+#   model (u8 panjang + utf-8), lalu per sensor SENSOR_HEADER (pixel awal,
+#   panjang span, flag, code sampel pertama) + bitmap pixel diterima (jika
+#   ada celah) atau jumlah sampel per pixel u16 (jika ada duplikat) +
+#   delta code antar pixel diterima (int16, int32 jika ada lompatan besar),
+#   disimpan per byte-plane supaya zlib mendapat deretan byte yang mirip.
+#
+# Yang disimpan adalah nilai yang benar-benar diterima (tanpa interpolasi
+# celah) dan counts apa adanya, dengan resolusi 0.01 mV seperti log teks,
+# jadi replay memberi hasil process_file yang sama dengan scan aslinya.
+#
+# Record tanpa index (mis. app mati sebelum close) tetap bisa dibaca:
+# reader memindai record dari awal file jika trailer tidak ditemukan.
+
+FILE_MAGIC = b"TTSA"
+INDEX_MAGIC = b"TIDX"
+FORMAT_VERSION = 1
+DEFAULT_MV_PER_LSB = 0.01
+
+FILE_HEADER = struct.Struct("<4sH")
+RECORD_LEN = struct.Struct("<I")
+SCAN_HEADER = struct.Struct("<qBdf")
+SENSOR_HEADER = struct.Struct("<HHBI")
+INDEX_ENTRY = struct.Struct("<QqBd")
+TRAILER = struct.Struct("<Q4s")
+
+FLAG_MASK = 1       # bitmap pixel diterima
+FLAG_COUNTS = 2     # counts u16 per pixel (menggantikan bitmap)
+FLAG_WIDE = 4       # delta int32
+
+WINDOW = tire_depth.PIXEL_MAX - tire_depth.PIXEL_MIN + 1
+
+
+# ============================================================================
+# ENCODE / DECODE SATU SCAN
+# ============================================================================
+
+def _pack_text(value):
+    data = str(value or "").encode("utf-8")[:255]
+    return bytes([len(data)]) + data
+
+
+def _unpack_text(buf, pos):
+    n = buf[pos]
+    return buf[pos + 1:pos + 1 + n].decode("utf-8"), pos + 1 + n
+
+
+def _lsb_divisor(mv_per_lsb):
+    """1 / mV per LSB jika bulat (0.01 -> 100): code / 100 == float("x.yz") persis"""
+    inv = round(1.0 / mv_per_lsb)
+    return inv if inv > 0 and abs(inv * mv_per_lsb - 1.0) < 1e-6 else None
+
+
+def _planes(arr):
+    return arr.view(np.uint8).reshape(-1, arr.itemsize).T.tobytes()
+
+
+def _from_planes(buf, dtype, n, pos):
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(buf, np.uint8, dtype.itemsize * n, pos).reshape(dtype.itemsize, n)
+    return np.ascontiguousarray(planes.T).view(dtype)[:, 0], pos + dtype.itemsize * n
+
+
+def encode_scan(values, counts, bus=0, position=0, timestamp=None,
+                firmware="", model_version="", mv_per_lsb=DEFAULT_MV_PER_LSB, level=6):
+    """Frame (6, window) hasil parse_ccd_frame -> payload terkompresi"""
+    values = np.asarray(values, dtype=float)
+    counts = np.asarray(counts)
+    valid = counts > 0
+    inv = _lsb_divisor(mv_per_lsb)
+
+    parts = [
+        SCAN_HEADER.pack(int(bus), history_store.position_code(position),
+                         time.time() if timestamp is None else float(timestamp), mv_per_lsb),
+        _pack_text(firmware),
+        _pack_text(model_version),
+    ]
+    for row in range(6):
+        received = np.flatnonzero(valid[row])
+        if not len(received):
+            parts.append(SENSOR_HEADER.pack(0, 0, 0, 0))
+            continue
+        first, last = int(received[0]), int(received[-1])
+        span_counts = counts[row, first:last + 1]
+        scaled = values[row, received] * inv if inv else values[row, received] / mv_per_lsb
+        codes = np.clip(np.rint(scaled), 0, 0xFFFFFFFF).astype(np.int64)
+        deltas = np.diff(codes)
+
+        flags = 0
+        if (span_counts > 1).any():
+            flags |= FLAG_COUNTS
+        elif len(received) < len(span_counts):
+            flags |= FLAG_MASK
+        if len(deltas) and np.abs(deltas).max() > 32767:
+            flags |= FLAG_WIDE
+        parts.append(SENSOR_HEADER.pack(first, last - first + 1, flags, int(codes[0])))
+        if flags & FLAG_COUNTS:
+            parts.append(_planes(np.minimum(span_counts, 65535).astype("<u2")))
+        elif flags & FLAG_MASK:
+            parts.append(np.packbits(span_counts > 0).tobytes())
+        parts.append(_planes(deltas.astype("<i4" if flags & FLAG_WIDE else "<i2")))
+
+    return zlib.compress(b"".join(parts), level)
+
+
+def decode_scan(payload):
+    """Payload -> dict meta + values/counts (6, window) seperti parse_ccd_frame"""
+    buf = zlib.decompress(payload)
+    bus, position, timestamp, mv_per_lsb = SCAN_HEADER.unpack_from(buf, 0)
+    pos = SCAN_HEADER.size
+    firmware, pos = _unpack_text(buf, pos)
+    model_version, pos = _unpack_text(buf, pos)
+    inv = _lsb_divisor(mv_per_lsb)
+
+    values = np.full((6, WINDOW), np.nan)
+    counts = np.zeros((6, WINDOW), dtype=np.uint16)
+    for row in range(6):
+        first, length, flags, first_code = SENSOR_HEADER.unpack_from(buf, pos)
+        pos += SENSOR_HEADER.size
+        if not length:
+            continue
+        span_counts = np.ones(length, dtype=np.uint16)
+        if flags & FLAG_COUNTS:
+            span_counts, pos = _from_planes(buf, "<u2", length, pos)
+        elif flags & FLAG_MASK:
+            nbytes = (length + 7) // 8
+            span_counts = np.unpackbits(np.frombuffer(buf, np.uint8, nbytes, pos))[:length].astype(np.uint16)
+            pos += nbytes
+        span_valid = span_counts > 0
+
+        deltas, pos = _from_planes(buf, "<i4" if flags & FLAG_WIDE else "<i2",
+                                   int(span_valid.sum()) - 1, pos)
+        codes = np.empty(len(deltas) + 1, dtype=np.int64)
+        codes[0] = first_code
+        np.cumsum(deltas, out=codes[1:])
+        codes[1:] += first_code
+
+        span = values[row, first:first + length]
+        span[span_valid] = codes / inv if inv else codes * mv_per_lsb
+        counts[row, first:first + length] = span_counts
+
+    return {
+        "bus": bus,
+        "position": history_store.POSITIONS[position],
+        "timestamp": timestamp,
+        "firmware": firmware,
+        "model_version": model_version,
+        "mv_per_lsb": mv_per_lsb,
+        "values": values,
+        "counts": counts,
+    }
+
+
+# ============================================================================
+# WRITER / READER FILE ARSIP
+# ============================================================================
+
+def _read_index(f):
+    """[(offset, bus, posisi, timestamp)] dan offset index, atau (None, None) jika tidak ada trailer"""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size < FILE_HEADER.size + TRAILER.size:
+        return None, None
+    f.seek(size - TRAILER.size)
+    index_offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+    if magic != INDEX_MAGIC or index_offset >= size:
+        return None, None
+    f.seek(index_offset)
+    (n,) = struct.unpack("<I", f.read(4))
+    raw = f.read(n * INDEX_ENTRY.size)
+    entries = [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(n)]
+    return entries, index_offset
+
+
+def _scan_entries(f, end=None):
+    """Bangun ulang index dengan membaca record satu per satu"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell() if end is None else end
+    entries = []
+    offset = FILE_HEADER.size
+    while offset + RECORD_LEN.size <= end:
+        f.seek(offset)
+        (length,) = RECORD_LEN.unpack(f.read(RECORD_LEN.size))
+        if offset + RECORD_LEN.size + length > end:
+            break
+        payload = f.read(length)
+        try:
+            head = zlib.decompressobj().decompress(payload, SCAN_HEADER.size)
+            bus, position, timestamp, _ = SCAN_HEADER.unpack_from(head, 0)
+        except (zlib.error, struct.error):
+            break
+        entries.append((offset, bus, position, timestamp))
+        offset += RECORD_LEN.size + length
+    return entries, offset
+
+
+class ScanArchiveWriter:
+    """
+    Tambah scan ke file arsip. File yang sudah ada dibuka untuk append:
+    index lama dibaca lalu ditulis ulang di akhir saat close().
+    """
+
+    def __init__(self, path, mv_per_lsb=DEFAULT_MV_PER_LSB, level=6):
+        self.path = path
+        self.mv_per_lsb = mv_per_lsb
+        self.level = level
+        exists = os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER.size
+        self._f = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, _ = FILE_HEADER.unpack(self._f.read(FILE_HEADER.size))
+            if magic != FILE_MAGIC:
+                self._f.close()
+                raise ValueError("Not a scan archive: {}".format(path))
+            self.entries, data_end = _read_index(self._f)
+            if self.entries is None:
+                self.entries, data_end = _scan_entries(self._f)
+            self._f.truncate(data_end)
+            self._f.seek(data_end)
+        else:
+            self._f.write(FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION))
+            self.entries = []
+
+    def append(self, values, counts, bus=0, position=0, timestamp=None, firmware="", model_version=""):
+        """Tambah satu frame; return nomor record"""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        payload = encode_scan(values, counts, bus, position, timestamp,
+                              firmware, model_version, self.mv_per_lsb, self.level)
+        offset = self._f.tell()
+        self._f.write(RECORD_LEN.pack(len(payload)))
+        self._f.write(payload)
+        self.entries.append((offset, int(bus), history_store.position_code(position), timestamp))
+        return len(self.entries) - 1
+
+    def append_raw(self, raw_lines, bus=0, position=0, timestamp=None, firmware="", model_version=""):
+        """Parse log teks sekali lalu simpan sebagai frame"""
+        values, counts = tire_depth.parse_ccd_frame(raw_lines)
+        return self.append(values, counts, bus, position, timestamp, firmware, model_version)
+
+    def close(self):
+        if self._f is None:
+            return
+        index_offset = self._f.tell()
+        self._f.write(struct.pack("<I", len(self.entries)))
+        self._f.write(b"".join(INDEX_ENTRY.pack(*e) for e in self.entries))
+        self._f.write(TRAILER.pack(index_offset, INDEX_MAGIC))
+        self._f.close()
+        self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ScanArchiveReader:
+    """Akses acak ke scan di file arsip lewat index"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        magic, self.version = FILE_HEADER.unpack(self._f.read(FILE_HEADER.size))
+        if magic != FILE_MAGIC:
+            self._f.close()
+            raise ValueError("Not a scan archive: {}".format(path))
+        self.entries, _ = _read_index(self._f)
+        if self.entries is None:
+            self.entries, _ = _scan_entries(self._f)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, bus=None, position=None):
+        """Nomor record yang cocok dengan bus/posisi (urut waktu)"""
+        pos_code = None if position is None else history_store.position_code(position)
+        hits = [
+            i for i, (_, b, p, _) in enumerate(self.entries)
+            if (bus is None or b == int(bus)) and (pos_code is None or p == pos_code)
+        ]
+        return sorted(hits, key=lambda i: self.entries[i][3])
+
+    def read(self, i):
+        offset = self.entries[i][0]
+        self._f.seek(offset)
+        (length,) = RECORD_LEN.unpack(self._f.read(RECORD_LEN.size))
+        return decode_scan(self._f.read(length))
+
+    def graph(self, i, **kwargs):
+        """ScanGraph siap proses untuk record i (tanpa parsing teks)"""
+        scan = self.read(i)
+        return tire_depth.ScanGraph.from_frame(scan["values"], scan["counts"], **kwargs)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.read(i)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================================
+# ENTRYPOINT UNTUK KOTLIN
+# ============================================================================
+
+def archive_scan(path, raw_lines, bus_id, posisi, firmware="", model_version="", timestamp=None):
+    """Simpan scan mentah ke arsip; return nomor record"""
+    try:
+        with ScanArchiveWriter(path) as writer:
+            row = writer.append_raw(raw_lines, bus_id, posisi, timestamp, firmware, model_version)
+        return json.dumps({"success": True, "record": row})
+    except Exception as e:
+        return json.dumps({"success": False, "message": "archive_scan exception: {}".format(str(e))})
+
+
+def replay_scan(path, record):
+    """Proses ulang satu scan dari arsip dengan model yang sedang aktif"""
+    try:
+        with ScanArchiveReader(path) as reader:
+            graph = reader.graph(int(record))
+        return tire_depth.process_file(None, graph=graph)
+    except Exception as e:
+        return json.dumps({"success": False, "message": "replay_scan exception: {}".format(str(e))})
@@ -0,0 +1,430 @@
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import ccd_core
+import device_session
+import tire_depth
+import tire_processing
+
+# ============================================================================
+# SIMULATOR SCANNER CCD + HARNESS LATENSI
+# ============================================================================
+# Pengganti scanner fisik di DeviceConnectionManager untuk mengukur latensi
+# STOP -> hasil akhir di Linux biasa (atau di device lewat Chaquopy).
+# SimulatedScanner memutar capture (rekaman atau sintetis) baris per baris
+# pada line rate firmware, lengkap dengan jitter, baris hilang/dobel dan
+# perintah START/STOP, ke callback on_line seperti onDataReceived.
+
+DEFAULT_LINE_RATE = 548.0   # baris/detik (fs firmware, lihat filtering.fs)
+
+
+def synthetic_capture(seed=0, worn=False, noise_mV=15.0, depth_mV=600.0):
+    """Capture sintetis 6 sensor x window 280-1080 dengan satu valley per sensor"""
+    rng = random.Random(seed)
+    lines = []
+    for sid in range(1, 7):
+        lines.append("--- SENSOR {} ---".format(sid))
+        base = 2950.0 if (worn and sid in (1, 6)) else 2400.0
+        center = rng.randint(500, 860)
+        for pix in range(tire_depth.PIXEL_MIN, tire_depth.PIXEL_MAX + 1):
+            mv = base - depth_mV * math.exp(-((pix - center) / 40.0) ** 2) + rng.gauss(0.0, noise_mV)
+            lines.append("Pixel[{:4d}]: {:.2f} mV".format(pix, mv))
+    return lines
+
+
+def load_capture(path):
+    """Capture rekaman dari file log teks"""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+class SimulatedScanner:
+    """
+    Scanner virtual. send_command("START") mulai streaming di thread
+    sendiri, "STOP" menghentikan lebih awal; akhir capture juga dianggap
+    STOP. Callback: on_line(line) per baris, on_stop() sekali per scan.
+    """
+
+    def __init__(self, capture, line_rate=DEFAULT_LINE_RATE, jitter_s=0.0,
+                 drop_prob=0.0, dup_prob=0.0, speed=1.0, seed=None):
+        self.capture = list(capture)
+        self.line_rate = float(line_rate)
+        self.jitter_s = float(jitter_s)
+        self.drop_prob = float(drop_prob)
+        self.dup_prob = float(dup_prob)
+        self.speed = float(speed)
+        self.rng = random.Random(seed)
+        self.on_line = None
+        self.on_stop = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def send_command(self, command):
+        command = str(command).strip().upper()
+        if command == "START":
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._stream, daemon=True)
+            self._thread.start()
+        elif command == "STOP":
+            self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _stream(self):
+        interval = 1.0 / (self.line_rate * self.speed)
+        jitter = self.jitter_s / self.speed
+        start = time.perf_counter()
+        k = 0
+        for line in self.capture:
+            if self._stop.is_set():
+                break
+            if self.drop_prob and self.rng.random() < self.drop_prob:
+                continue
+            copies = 2 if self.dup_prob and self.rng.random() < self.dup_prob else 1
+            for _ in range(copies):
+                # jadwal absolut: keterlambatan sleep tidak menumpuk
+                k += 1
+                due = start + k * interval + (self.rng.gauss(0.0, jitter) if jitter else 0.0)
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.on_line is not None:
+                    self.on_line(line)
+        if self.on_stop is not None:
+            self.on_stop()
+
+
+# ============================================================================
+# KONSUMEN: MODE BATCH & STREAMING
+# ============================================================================
+
+class BatchConsumer:
+    """Seperti BluetoothSharedViewModel: tampung baris, proses semua setelah STOP"""
+
+    def __init__(self):
+        self.lines = []
+
+    def on_line(self, line):
+        self.lines.append(line)
+
+    def finish(self):
+        return tire_depth.process_file(self.lines)
+
+
+class StreamingConsumer:
+    """Parse setiap baris saat tiba; setelah STOP tinggal filter/valley/prediksi"""
+
+    def __init__(self):
+        self.builder = tire_depth.FrameBuilder()
+
+    def on_line(self, line):
+        self.builder.feed([line])
+
+    def finish(self):
+        values, counts = self.builder.frame()
+        return tire_depth.process_file(None, graph=tire_depth.ScanGraph.from_frame(values, counts))
+
+
+CONSUMERS = {"batch": BatchConsumer, "streaming": StreamingConsumer}
+
+
+def run_once(capture, mode="batch", **scanner_kwargs):
+    """Satu scan lengkap; return (latensi STOP->hasil detik, hasil JSON)"""
+    consumer = CONSUMERS[mode]()
+    scanner = SimulatedScanner(capture, **scanner_kwargs)
+    stopped = threading.Event()
+    scanner.on_line = consumer.on_line
+    scanner.on_stop = stopped.set
+    scanner.send_command("START")
+    stopped.wait()
+    t_stop = time.perf_counter()
+    result = consumer.finish()
+    latency = time.perf_counter() - t_stop
+    scanner.join()
+    return latency, result
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure_latency(captures, runs=100, mode="batch", **scanner_kwargs):
+    """Ulangi run_once atas captures (bergiliran); statistik latensi dalam ms"""
+    latencies = []
+    failures = 0
+    for i in range(runs):
+        latency, result = run_once(captures[i % len(captures)], mode, seed=i, **scanner_kwargs)
+        if not json.loads(result).get("success"):
+            failures += 1
+        latencies.append(latency * 1000.0)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "runs": runs,
+        "failures": failures,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "max_ms": latencies[-1] if latencies else None,
+    }
+
+
+# ============================================================================
+# OVERHEAD TRANSFER JAVA -> PYTHON
+# ============================================================================
+# Bentuk input dari Kotlin: ArrayList<String> (akses per elemen lewat
+# size()/get(i), satu lintasan JNI per baris), String[] (per elemen),
+# satu String hasil joinToString("\n") dan byte[] UTF-8 (satu transfer).
+# Di luar device, JavaListStub meniru antarmuka ArrayList Chaquopy untuk
+# menghitung jumlah panggilan; biaya JNI per panggilan hanya terukur di device
+# (panggil bridge_overhead dengan objek Java sungguhan).
+
+class JavaListStub:
+    """Meniru java.util.ArrayList dari Chaquopy: hanya size()/get(i)"""
+
+    def __init__(self, items):
+        self._items = list(items)
+        self.calls = 0
+
+    def size(self):
+        self.calls += 1
+        return len(self._items)
+
+    def get(self, i):
+        self.calls += 1
+        return self._items[i]
+
+
+def bridge_forms(capture):
+    """Capture yang sama dalam setiap bentuk input"""
+    joined = "\n".join(capture)
+    return {
+        "array_list": JavaListStub(capture),
+        "list": list(capture),
+        "string": joined,
+        "bytes": joined.encode("utf-8"),
+    }
+
+
+def _time_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times.sort()
+    return _percentile(times, 50)
+
+
+def bridge_overhead(raw_input, repeats=20):
+    """
+    Ukur konversi satu input (bentuk apa pun, termasuk objek Java di
+    device) ke baris, dan konversi + parse frame. Return JSON.
+    """
+    try:
+        repeats = int(repeats)
+        convert_ms = _time_ms(lambda: ccd_core.to_lines(raw_input), repeats)
+        total_ms = _time_ms(lambda: tire_depth.parse_ccd_frame(raw_input), repeats)
+        return json.dumps({
+            "success": True,
+            "form": type(raw_input).__name__,
+            "lines": len(ccd_core.to_lines(raw_input)),
+            "convert_ms": convert_ms,
+            "convert_parse_ms": total_ms,
+        })
+    except Exception as e:
+        return json.dumps({"success": False, "message": "bridge_overhead exception: {}".format(str(e))})
+
+
+def measure_bridge(capture, repeats=20):
+    """Perbandingan bentuk input untuk capture yang sama (ms p50 per scan)"""
+    report = []
+    for form, obj in bridge_forms(capture).items():
+        row = json.loads(bridge_overhead(obj, repeats))
+        row["form"] = form
+        if isinstance(obj, JavaListStub):
+            obj.calls = 0
+            ccd_core.to_lines(obj)
+            row["bridge_calls"] = obj.calls
+        else:
+            row["bridge_calls"] = 0 if isinstance(obj, list) else 1
+        report.append(row)
+    return report
+
+
+# ============================================================================
+# BANYAK SCANNER SEKALIGUS (device_session)
+# ============================================================================
+
+def measure_multi_device(captures, devices=4, model=None, **scanner_kwargs):
+    """
+    N scanner virtual streaming bersamaan, masing-masing ke sesi sendiri
+    (device_session). Hasil setiap sesi dibandingkan dengan process_file
+    atas baris yang benar-benar dikirim device itu: beda = cross-talk.
+    """
+    sessions = []
+    scanners = []
+    delivered = []
+    results = [None] * devices
+    latencies = [None] * devices
+    stopped = [threading.Event() for _ in range(devices)]
+
+    for i in range(devices):
+        session = device_session.DeviceSession("sim-{}".format(i), model=model)
+        scanner = SimulatedScanner(captures[i % len(captures)], seed=i, **scanner_kwargs)
+        sent = []
+
+        def on_line(line, session=session, sent=sent):
+            sent.append(line)
+            session.feed([line])
+
+        def on_stop(i=i, session=session):
+            t_stop = time.perf_counter()
+            results[i] = session.finish()
+            latencies[i] = (time.perf_counter() - t_stop) * 1000.0
+            stopped[i].set()
+
+        scanner.on_line = on_line
+        scanner.on_stop = on_stop
+        sessions.append(session)
+        scanners.append(scanner)
+        delivered.append(sent)
+
+    t0 = time.perf_counter()
+    for scanner in scanners:
+        scanner.send_command("START")
+    for event in stopped:
+        event.wait()
+    wall = time.perf_counter() - t0
+
+    mismatches = 0
+    for i in range(devices):
+        got = json.loads(results[i])
+        ref = json.loads(tire_depth.process_file(None, graph=tire_depth.ScanGraph(
+            delivered[i], model=sessions[i].model)))
+        if got.get("min_depth") != ref.get("min_depth") or \
+                [d.get("valley") for d in got.get("data", [])] != [d.get("valley") for d in ref.get("data", [])]:
+            mismatches += 1
+
+    lines = sum(len(sent) for sent in delivered)
+    report = {
+        "devices": devices,
+        "lines": lines,
+        "wall_s": wall,
+        "lines_per_s": lines / wall if wall > 0 else None,
+        "line_rate_per_device": scanner_kwargs.get("line_rate", DEFAULT_LINE_RATE) * scanner_kwargs.get("speed", 1.0),
+        "max_backlog": max(s.max_backlog for s in sessions),
+        "finish_p50_ms": _percentile(sorted(latencies), 50),
+        "finish_max_ms": max(latencies),
+        "failures": sum(1 for r in results if not json.loads(r).get("success")),
+        "cross_talk_mismatches": mismatches,
+    }
+    for session in sessions:
+        session.close()
+    return report
+
+
+# ============================================================================
+# ENGINE TANPA NUMPY vs JALUR NUMPY
+# ============================================================================
+
+def cold_import_ms(module, repeats=5):
+    """Import modul di interpreter baru (p50 ms) + apakah NumPy ikut ter-load"""
+    code = ("import sys, time; t = time.perf_counter(); import {}; "
+            "print((time.perf_counter() - t) * 1000.0, 'numpy' in sys.modules)").format(module)
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    numpy_loaded = False
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        ms, loaded = out.stdout.split()
+        times.append(float(ms))
+        numpy_loaded = numpy_loaded or loaded == "True"
+    times.sort()
+    return _percentile(times, 50), numpy_loaded
+
+
+def measure_engines(captures, repeats=30):
+    """tire_processing (Python murni) vs tire_depth (NumPy): import dan ms per scan"""
+    pure_ms = []
+    numpy_ms = []
+    for capture in captures:
+        pure_ms.append(_time_ms(lambda: tire_processing.process_file(capture), repeats))
+        numpy_ms.append(_time_ms(lambda: tire_depth.process_file(capture), repeats))
+    pure_import, pure_numpy = cold_import_ms("tire_processing")
+    numpy_import, _ = cold_import_ms("tire_depth")
+    pure_p50 = _percentile(sorted(pure_ms), 50)
+    numpy_p50 = _percentile(sorted(numpy_ms), 50)
+    return {
+        "scans": len(captures),
+        "pure_scan_ms": pure_p50,
+        "numpy_scan_ms": numpy_p50,
+        "pure_vs_numpy": pure_p50 / numpy_p50 if numpy_p50 else None,
+        "pure_import_ms": pure_import,
+        "pure_imports_numpy": pure_numpy,
+        "numpy_import_ms": numpy_import,
+        "scan_duration_ms": 1000.0 * len(captures[0]) / DEFAULT_LINE_RATE,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay CCD captures and measure STOP-to-result latency")
+    parser.add_argument("captures", nargs="*", help="recorded log files (default: synthetic)")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--mode", choices=["batch", "streaming", "both"], default="both")
+    parser.add_argument("--line-rate", type=float, default=DEFAULT_LINE_RATE)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--jitter", type=float, default=0.0, help="per-line jitter std (s)")
+    parser.add_argument("--drop", type=float, default=0.0, help="dropped line probability")
+    parser.add_argument("--dup", type=float, default=0.0, help="duplicated line probability")
+    parser.add_argument("--bridge", action="store_true", help="compare Java->Python input forms instead")
+    parser.add_argument("--devices", type=int, default=0, help="concurrent simulated devices (session benchmark)")
+    parser.add_argument("--engines", action="store_true", help="compare NumPy-free tire_processing with tire_depth")
+    args = parser.parse_args(argv)
+
+    tire_depth.debug_log = lambda message: None
+    if args.captures:
+        captures = [load_capture(p) for p in args.captures]
+    else:
+        captures = [synthetic_capture(seed=i, worn=(i % 4 == 0)) for i in range(8)]
+
+    if args.bridge:
+        print(json.dumps(measure_bridge(captures[0], args.runs), indent=2))
+        return
+
+    if args.engines:
+        print(json.dumps(measure_engines(captures, args.runs), indent=2))
+        return
+
+    if args.devices:
+        print(json.dumps(measure_multi_device(captures, args.devices, line_rate=args.line_rate, speed=args.speed,
+                                              jitter_s=args.jitter, drop_prob=args.drop, dup_prob=args.dup),
+                         indent=2))
+        return
+
+    modes = ["batch", "streaming"] if args.mode == "both" else [args.mode]
+    report = [
+        measure_latency(captures, args.runs, mode, line_rate=args.line_rate, speed=args.speed,
+                        jitter_s=args.jitter, drop_prob=args.drop, dup_prob=args.dup)
+        for mode in modes
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
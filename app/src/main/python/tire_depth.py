@@ -1,7 +1,12 @@
 import json
+import math
 import re
+import statistics
+import time
 import numpy as np
-from typing import Any
+
+import ccd_core
+from ccd_core import pure, to_python_list, scale, predict
 
 # ============================================================================
 # ANDROID LOGGING SETUP
@@ -39,125 +44,199 @@ MODEL_DANGKAL = {
 }
 
 # Koefisien Filter Butterworth
+# (order-2, cutoff 54.8 Hz pada fs 548 Hz; lihat design_butter_lowpass)
 b = [0.0674553, 0.134911, 0.0674553]
 a = [-1.14298, 0.412801]
+SAMPLE_RATE_HZ = 548.0
+FILTER_CUTOFF_HZ = 54.8
+
+# Deteksi ban AUS (sensor 1 & 6) dan valley
+AUS_VOLTAGE_THRESH = 2800.0  # mV
+AUS_COUNT_THRESH = 2         # MINIMAL 2 pixel per sensor
+MIN_VALLEY_PIXELS = 50
+HARDCODED_AUS_DEPTHS = [1.28, 2.87, 2.94, 1.8, None, None]
+
+# Window pixel CCD dan ADC firmware
+PIXEL_MIN = 280
+PIXEL_MAX = 1080
+VREF_MV = 3300.0
+ADC_MAX = 4095
+
+# Batas kualitas sinyal per sensor (lihat assess_sensor_quality)
+QUALITY_MIN_COVERAGE = 0.9       # fraksi pixel window yang terisi
+QUALITY_MAX_GAP = 5              # pixel hilang berurutan
+QUALITY_SATURATION_MV = 0.98 * VREF_MV
+QUALITY_MAX_SATURATED = 0.02     # fraksi sampel jenuh
+QUALITY_MAX_NOISE_MV = 50.0      # std residual (raw - terfilter)
+
+# Penumpukan beberapa scan (lihat stack_passes)
+STACK_TRIM_FRACTION = 0.2        # fraksi sampel dibuang per sisi (trimmed mean)
+STACK_TARGET_NOISE_MV = 10.0
+
+# Preview kedalaman selama scan berjalan (lihat LivePreview)
+PREVIEW_EVERY_LINES = 50
+PREVIEW_SETTLE = 64              # pole filter |z| ~0.64 -> 0.64^64 < 1e-12
+PREVIEW_STABLE_SAMPLES = 100     # valley tidak berpindah selama N sampel = stabil
+
+# Hasil progresif (lihat progressive_results)
+PROGRESSIVE_BUDGET_MS = 150.0
+PROGRESSIVE_DECIMATION = 4
+PROGRESSIVE_SENSOR_ORDER = (1, 6, 2, 3, 4, 5)   # sensor 1 & 6 dulu untuk klasifikasi AUS
 
 
 # ============================================================================
 # FUNGSI FILTER BUTTERWORTH
 # ============================================================================
 
+def design_butter_lowpass(cutoff_hz, fs=SAMPLE_RATE_HZ):
+    """
+    Koefisien Butterworth low-pass order-2 (transformasi bilinear, sama
+    dengan scipy.signal.butter) dalam format b/a modul ini: a tanpa a0=1.
+    """
+    k = math.tan(math.pi * cutoff_hz / fs)
+    norm = 1.0 / (1.0 + math.sqrt(2.0) * k + k * k)
+    b0 = k * k * norm
+    return [b0, 2.0 * b0, b0], [2.0 * (k * k - 1.0) * norm, (1.0 - math.sqrt(2.0) * k + k * k) * norm]
+
+
 def butter_lowpass_filter(data, b_coef, a_coef):
-    """Forward pass filter Butterworth order-2"""
-    data = np.array(data, dtype=float)
-    n = len(data)
-    if n == 0:
-        return data
-
-    y = np.zeros(n)
-    if n >= 1:
-        y[0] = data[0]
-    if n >= 2:
-        y[1] = data[1]
-
-    for i in range(2, n):
-        y[i] = (
-                b_coef[0] * data[i]
-                + b_coef[1] * data[i - 1]
-                + b_coef[2] * data[i - 2]
-                - a_coef[0] * y[i - 1]
-                - a_coef[1] * y[i - 2]
-        )
-    return y
+    """Forward pass filter Butterworth order-2 (ccd_core, inisialisasi y[0]=x[0], y[1]=x[1])"""
+    return ccd_core.lowpass(data, b_coef, a_coef, ccd_core.INIT_EDGE)
 
 
 def butter_filtfilt(data, b_coef, a_coef):
     """Zero-phase filtering: forward + backward pass"""
-    data_arr = np.array(data, dtype=float)
-    if len(data_arr) < 3:
-        return data_arr
-    forward = butter_lowpass_filter(data_arr, b_coef, a_coef)
-    backward = butter_lowpass_filter(forward[::-1], b_coef, a_coef)
-    return backward[::-1]
+    return ccd_core.filtfilt(data, b_coef, a_coef, ccd_core.INIT_EDGE)
 
 
 # ============================================================================
-# CONVERTER UNTUK CHAQUOPY
+# PARSER CCD DATA
 # ============================================================================
 
-def to_python_list(obj: Any):
-    """Convert Java ArrayList atau iterable ke Python list"""
-    if isinstance(obj, list):
-        return obj
+SENSOR_RE = ccd_core.parser.SENSOR_RE
+PIXEL_RE = ccd_core.parser.PIXEL_RE
 
-    try:
-        return list(obj)
-    except Exception:
-        pass
 
-    try:
-        size = obj.size()
-        return [obj.get(i) for i in range(size)]
-    except Exception:
-        pass
+class FrameBuilder:
+    """
+    Parser inkremental ke frame berindex pixel (lihat parse_ccd_frame).
+    feed() boleh dipanggil berkali-kali dengan potongan baris selama data
+    masih mengalir; frame() mengembalikan snapshot (values, counts).
+    """
 
-    try:
-        it = obj.iterator()
-        out = []
-        while it.hasNext():
-            out.append(it.next())
-        return out
-    except Exception:
-        pass
+    def __init__(self):
+        self.width = PIXEL_MAX - PIXEL_MIN + 1
+        self.values = np.full((6, self.width), np.nan)
+        self.counts = np.zeros((6, self.width), dtype=np.uint16)
+        self.parser = ccd_core.SampleParser(ccd_core.TIRE_DEPTH)
+        self.lines_seen = 0
+
+    @property
+    def current_sensor(self):
+        return self.parser.current_sensor
+
+    @staticmethod
+    def _lines(lines):
+        bulk = ccd_core.bulk_lines(lines)
+        if bulk is not None:
+            return bulk
+        try:
+            return "\n".join([str(x) for x in to_python_list(lines)]).splitlines()
+        except:
+            return str(lines).splitlines()
 
-    return []
+    def feed(self, lines):
+        """Tambah baris (string multi-baris, bytes/byte[], list, ArrayList atau String[] Java)"""
+        return self._feed_lines(self._lines(lines))
 
+    def _feed_lines(self, lines):
+        sids, pixels, values = self.parser.feed(lines)
+        if sids:
+            self._add(sids, pixels, values)
+        self.lines_seen += len(lines)
+        return self
 
-# ============================================================================
-# PARSER CCD DATA
-# ============================================================================
+    def _add(self, sids, pixels, values):
+        # taruh langsung di slot pixel-nya; duplikat: nilai terakhir menang
+        flat = (np.array(sids) - 1) * self.width + (np.array(pixels) - PIXEL_MIN)
+        values = np.array(values, dtype=float)
+        last = len(flat) - 1 - np.unique(flat[::-1], return_index=True)[1]
+        self.values.reshape(-1)[flat[last]] = values[last]
+        np.add.at(self.counts.reshape(-1), flat, 1)
 
-def process_single_sensor_parsing(raw_text):
-    """Parse log CCD multi-sensor"""
-    if hasattr(raw_text, "splitlines"):
-        pass
-    else:
-        try:
-            raw_text = "\n".join([str(x) for x in to_python_list(raw_text)])
-        except:
-            raw_text = str(raw_text)
+    def frame(self):
+        """Snapshot (values, counts) berbentuk (6, window)"""
+        return self.values.copy(), self.counts.copy()
 
-    # Inisialisasi dengan INTEGER key
-    sensors = {i: [] for i in range(1, 7)}
 
-    lines = raw_text.splitlines()
-    current_sensor = None
+def parse_ccd_frame(raw_text):
+    """
+    Parse log CCD multi-sensor ke frame berindex pixel.
+
+    Setiap sensor punya array tetap selebar window 280-1080 dan sampel
+    diletakkan langsung di posisi pixel - PIXEL_MIN, jadi baris Bluetooth
+    yang hilang/dobel tidak menggeser sampel berikutnya.
+    Return (values, counts), keduanya (6, window):
+      values : mV, NaN = pixel tidak diterima (duplikat: nilai terakhir)
+      counts : jumlah sampel yang diterima per pixel
+    """
+    return FrameBuilder().feed(raw_text).frame()
 
-    sensor_re = re.compile(r"---\s*SENSOR\s+(\d+)\s*---", re.IGNORECASE)
-    pixel_re = re.compile(r"Pixel\[\s*(\d+)\s*\]:\s*([\d\.]+)", re.IGNORECASE)
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+def repair_gaps(values, valid=None):
+    """
+    Isi pixel hilang di antara dua pixel valid dengan interpolasi linear
+    (vektor untuk semua baris sekaligus). Pixel di luar pixel valid
+    pertama/terakhir tetap NaN (tidak diekstrapolasi).
+    """
+    values = np.asarray(values, dtype=float)
+    if valid is None:
+        valid = ~np.isnan(values)
+    width = values.shape[-1]
+    idx = np.arange(width)
+
+    prev_idx = np.maximum.accumulate(np.where(valid, idx, -1), axis=-1)
+    next_idx = np.minimum.accumulate(np.where(valid, idx, width)[..., ::-1], axis=-1)[..., ::-1]
+    interior = ~valid & (prev_idx >= 0) & (next_idx < width)
+
+    filled = np.where(valid, values, np.nan)
+    if interior.any():
+        lo = np.take_along_axis(values, np.clip(prev_idx, 0, width - 1), axis=-1)
+        hi = np.take_along_axis(values, np.clip(next_idx, 0, width - 1), axis=-1)
+        span = np.where(interior, next_idx - prev_idx, 1)
+        weight = (idx - prev_idx) / span
+        filled[interior] = (lo + weight * (hi - lo))[interior]
+    return filled
+
+
+def process_single_sensor_parsing(raw_text, pixels_out=None):
+    """
+    Parse log CCD multi-sensor.
+    Return {sid: np.ndarray mV} dari pixel valid pertama sampai terakhir
+    dengan celah sudah diinterpolasi. Jika pixels_out (dict) diberikan,
+    diisi {sid: counts per pixel} dari parse_ccd_frame.
+    """
+    values, counts = parse_ccd_frame(raw_text)
+    return sensors_from_frame(values, counts, pixels_out)
 
-        # Deteksi marker sensor
-        m_s = sensor_re.search(line)
-        if m_s:
-            current_sensor = int(m_s.group(1))
-            continue
 
-        # Parse pixel data
-        m_p = pixel_re.search(line)
-        if m_p and current_sensor is not None:
-            try:
-                pix = int(m_p.group(1))
-                mv = float(m_p.group(2))
-                if 280 <= pix <= 1080:
-                    sensors[current_sensor].append(mv)
-            except:
-                continue
+def sensors_from_frame(values, counts, pixels_out=None):
+    """
+    Frame (values, counts) dari parse_ccd_frame / arsip biner -> {sid: mV}
+    dari pixel valid pertama sampai terakhir, celah sudah diinterpolasi.
+    """
+    filled = repair_gaps(values, counts > 0)
+
+    sensors = {}
+    for sid in range(1, 7):
+        received = np.flatnonzero(counts[sid - 1])
+        if len(received):
+            sensors[sid] = filled[sid - 1, received[0]:received[-1] + 1]
+        else:
+            sensors[sid] = filled[sid - 1, :0]
 
+    if pixels_out is not None:
+        pixels_out.update({sid: counts[sid - 1] for sid in range(1, 7)})
     return sensors
 
 
@@ -165,34 +244,44 @@ def process_single_sensor_parsing(raw_text):
 # DETEKSI VALLEY
 # ============================================================================
 
-def detect_valleys(sensors):
-    """Deteksi valley dari setiap sensor"""
+def detect_valleys(sensors, sensor_ids=None, graph=None):
+    """
+    Deteksi valley dari setiap sensor.
+    sensor_ids membatasi sensor yang difilter; sensor lain dilewati
+    (valley None) tanpa biaya filter. Hasil filter diambil dari graph
+    sehingga tidak dihitung ulang oleh choose_model.
+    """
+    if graph is None:
+        graph = ScanGraph(sensors=sensors)
+
     valleys = []
     details = {}
 
     for sid in range(1, 7):
-        data = sensors.get(sid, [])
+        valley = None
+        if sensor_ids is None or sid in sensor_ids:
+            valley = graph.valley(sid)
 
-        if len(data) < 50:
+        if valley is None:
             valleys.append(None)
             details[sid] = {
                 "filtered": [],
                 "valley_index": None,
+                "valley_pixel": None,
                 "valley_value": None,
-                "pixel_count": int(len(data))
+                "pixel_count": graph.pixel_count(sid)
             }
             continue
 
-        filtered = butter_filtfilt(data, b, a)
-        min_val = float(np.min(filtered))
-        min_idx = int(np.argmin(filtered))
+        min_val, min_idx = valley
 
         valleys.append(min_val)
         details[sid] = {
-            "filtered": [float(v) for v in filtered],
+            "filtered": graph.filtered(sid).tolist(),
             "valley_index": min_idx,
+            "valley_pixel": graph.pixel_offset(sid) + min_idx,
             "valley_value": float(min_val),
-            "pixel_count": int(len(data))
+            "pixel_count": graph.pixel_count(sid)
         }
 
     return valleys, details
@@ -202,7 +291,7 @@ def detect_valleys(sensors):
 # PEMILIHAN MODEL - PERBAIKAN LOGIKA AUS
 # ============================================================================
 
-def choose_model(sensors):
+def choose_model(sensors, graph=None):
     """
     PERBAIKAN: Deteksi ban AUS jika sensor 1 DAN sensor 6
     masing-masing memiliki MINIMAL 2 pixel dengan tegangan > 2800 mV
@@ -210,29 +299,24 @@ def choose_model(sensors):
     PERUBAHAN KUNCI:
     - Sebelumnya: count > 2 (berarti butuh minimal 3 pixel)
     - Sekarang: count >= 2 (berarti butuh minimal 2 pixel) âœ…
-    """
-    # Ambil data RAW dari sensor 1 dan 6
-    raw_s1 = sensors.get(1, [])
-    raw_s6 = sensors.get(6, [])
 
-    # FILTER menggunakan butter_filtfilt
-    if len(raw_s1) >= 3:
-        filtered_s1 = butter_filtfilt(raw_s1, b, a)
-    else:
-        filtered_s1 = np.array(raw_s1, dtype=float)
+    Sinyal terfilter sensor 1 & 6 diambil dari graph (dipakai bersama
+    dengan detect_valleys).
+    """
+    if graph is None:
+        graph = ScanGraph(sensors=sensors)
 
-    if len(raw_s6) >= 3:
-        filtered_s6 = butter_filtfilt(raw_s6, b, a)
-    else:
-        filtered_s6 = np.array(raw_s6, dtype=float)
+    # FILTER menggunakan butter_filtfilt (data < 3 pixel dikembalikan apa adanya)
+    filtered_s1 = graph.filtered(1)
+    filtered_s6 = graph.filtered(6)
 
     # Threshold
-    voltage_thresh = 2800.0  # mV
-    count_thresh = 2         # MINIMAL 2 pixel
+    voltage_thresh = AUS_VOLTAGE_THRESH
+    count_thresh = AUS_COUNT_THRESH
 
     # Hitung pixel > 2800 mV
-    count_s1 = int(np.sum(filtered_s1 > voltage_thresh))
-    count_s6 = int(np.sum(filtered_s6 > voltage_thresh))
+    count_s1 = ccd_core.count_above(filtered_s1, voltage_thresh)
+    count_s6 = ccd_core.count_above(filtered_s6, voltage_thresh)
 
     # DEBUGGING INFO
     sep_line = "=" * 60
@@ -264,47 +348,316 @@ def choose_model(sensors):
         debug_log("MODEL: DALAM (Ban Normal)")
         debug_log("Prediksi menggunakan kalibrasi standar")
         debug_log(sep_line)
-        return MODEL_DALAM, "DALAM"
+        return graph.model or MODEL_DALAM, "DALAM"
+
+
+# ============================================================================
+# KUALITAS SINYAL PER SENSOR
+# ============================================================================
+
+def assess_sensor_quality(voltages, counts=None, filtered=None):
+    """
+    Nilai kualitas satu sensor: cakupan window 280-1080, saturasi dekat
+    VREF_MV, celah index pixel, dan noise (std raw - terfilter, hanya jika
+    sinyal terfilter tersedia). counts = jumlah sampel per pixel dari
+    parse_ccd_frame; None dianggap berurutan dari 280 tanpa celah.
+    """
+    volts = np.asarray(voltages, dtype=float)
+    n = len(volts)
+    window = PIXEL_MAX - PIXEL_MIN + 1
+
+    if counts is None:
+        counts = np.zeros(window, dtype=np.uint16)
+        counts[:n] = 1
+    counts = np.asarray(counts)
+    received = counts > 0
+    received_count = int(np.count_nonzero(received))
+
+    # panjang run pixel hilang (termasuk di tepi window)
+    edges = np.diff(np.concatenate(([0], (~received).astype(np.int8), [0])))
+    gaps = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+    coverage = float(received_count) / window
+    saturated = int(np.count_nonzero(volts >= QUALITY_SATURATION_MV))
+    saturated_frac = float(saturated) / n if n else 0.0
+
+    noise = None
+    if filtered is not None and n >= 3 and len(filtered) == n:
+        noise = float(np.std(volts - np.asarray(filtered, dtype=float)))
+
+    issues = []
+    if received_count < MIN_VALLEY_PIXELS:
+        issues.append("low_pixels")
+    if coverage < QUALITY_MIN_COVERAGE:
+        issues.append("low_coverage")
+    if len(gaps) and int(gaps.max()) > QUALITY_MAX_GAP:
+        issues.append("gaps")
+    if saturated_frac > QUALITY_MAX_SATURATED:
+        issues.append("saturation")
+    if noise is not None and noise > QUALITY_MAX_NOISE_MV:
+        issues.append("noisy")
+
+    return {
+        "pixel_count": received_count,
+        "coverage": round(coverage, 4),
+        "duplicates": int(counts.sum()) - received_count,
+        "missing_pixels": window - received_count,
+        "max_gap": int(gaps.max()) if len(gaps) else 0,
+        "saturated": saturated,
+        "noise_mV": None if noise is None else round(noise, 3),
+        "issues": issues,
+        "ok": not issues
+    }
 
 
 # ============================================================================
 # SCALING & PREDIKSI
 # ============================================================================
+# scale() dan predict() berasal dari ccd_core (di-import di atas).
+
+# ============================================================================
+# STAGE GRAPH PER SCAN
+# ============================================================================
+
+class ScanGraph:
+    """
+    Graph stage satu scan: parse -> filter -> valley -> classify -> predict.
 
-def scale(x, mn, mx):
-    """Min-max scaling"""
-    if x is None:
-        return None
-    if mx == mn:
-        return 0.0
-    return float((x - mn) / (mx - mn))
+    Output setiap stage dihitung sekali (memo per sensor) dan dipakai
+    bersama oleh semua konsumen, jadi sensor yang sama tidak pernah
+    difilter dua kali. Intermediate yang sudah ada bisa disuntik lewat
+    argumen `cache` ({(stage, sid): value}) atau inject(). `model`
+    menggantikan MODEL_DALAM hanya untuk graph ini (kalibrasi per device).
+    """
+
+    STAGES = ("parse", "pixels", "filter", "valley", "quality", "classify", "predict")
+
+    def __init__(self, raw_text=None, sensors=None, b_coef=None, a_coef=None, cache=None, model=None):
+        self.raw_text = raw_text
+        self.b_coef = b if b_coef is None else b_coef
+        self.a_coef = a if a_coef is None else a_coef
+        self.model = model
+        self._memo = {}
+        self.computed = {stage: 0 for stage in self.STAGES}
+        for (stage, sid), value in (cache or {}).items():
+            self.inject(stage, value, sid)
+        if sensors is not None:
+            self.inject("parse", sensors)
+
+    @classmethod
+    def from_frame(cls, values, counts, **kwargs):
+        """Graph dari frame berindex pixel tanpa parsing teks"""
+        pixels = {}
+        graph = cls(sensors=sensors_from_frame(values, counts, pixels), **kwargs)
+        graph.inject("pixels", pixels)
+        return graph
+
+    def inject(self, stage, value, sid=None):
+        """Suntik hasil stage (sid None untuk stage level-scan)"""
+        if stage not in self.STAGES:
+            raise ValueError("Unknown stage: {}".format(stage))
+        self._memo[(stage, sid)] = value
+
+    def is_cached(self, stage, sid=None):
+        return (stage, sid) in self._memo
+
+    def _run(self, stage, sid, compute):
+        key = (stage, sid)
+        if key not in self._memo:
+            self._memo[key] = compute()
+            self.computed[stage] += 1
+        return self._memo[key]
+
+    def sensors(self):
+        """Stage parse: {sid: [mV]}"""
+        def compute():
+            pixels = {}
+            sensors = process_single_sensor_parsing(self.raw_text, pixels_out=pixels)
+            self._memo.setdefault(("pixels", None), pixels)
+            return sensors
+
+        return self._run("parse", None, compute)
+
+    def pixels(self):
+        """{sid: jumlah sampel per pixel} (None jika sensors disuntik tanpa pixel)"""
+        self.sensors()
+        return self._memo.get(("pixels", None))
+
+    def pixel_count(self, sid):
+        """Jumlah pixel yang benar-benar diterima (tanpa hasil interpolasi)"""
+        pixels = self.pixels()
+        if pixels and sid in pixels:
+            return int(np.count_nonzero(pixels[sid]))
+        return len(self.sensors().get(sid, []))
+
+    def pixel_offset(self, sid):
+        """Pixel fisik untuk index 0 pada data sensor"""
+        pixels = self.pixels()
+        if pixels and sid in pixels:
+            received = np.flatnonzero(pixels[sid])
+            if len(received):
+                return PIXEL_MIN + int(received[0])
+        return PIXEL_MIN
+
+    def filtered(self, sid):
+        """Stage filter: sinyal zero-phase satu sensor (np.ndarray)"""
+        return self._run(
+            "filter", sid,
+            lambda: ccd_core.filtfilt(self.sensors().get(sid, []), self.b_coef, self.a_coef, ccd_core.INIT_EDGE)
+        )
 
+    def valley(self, sid):
+        """Stage valley: (nilai, index) atau None jika pixel < 50"""
+        def compute():
+            if self.pixel_count(sid) < MIN_VALLEY_PIXELS:
+                return None
+            return ccd_core.find_valley(self.filtered(sid))
+
+        return self._run("valley", sid, compute)
+
+    def quality(self, sid):
+        """
+        Stage quality: assess_sensor_quality satu sensor. Noise hanya
+        dihitung jika sensor sudah difilter (tidak memicu filter baru).
+        """
+        def compute():
+            pixels = self.pixels()
+            filtered = self._memo.get(("filter", sid))
+            return assess_sensor_quality(
+                self.sensors().get(sid, []),
+                pixels.get(sid) if pixels else None,
+                filtered
+            )
+
+        return self._run("quality", sid, compute)
+
+    def classification(self):
+        """Stage classify: (model, label) dari sensor 1 & 6"""
+        return self._run("classify", None, lambda: choose_model(self.sensors(), graph=self))
+
+    def prediction(self, sid):
+        """Stage predict: (scaled, depth) satu sensor, (None, None) jika tidak ada"""
+        def compute():
+            model, _ = self.classification()
+            valley = self.valley(sid)
+            if model is None or valley is None:
+                return None, None
+            scaled = scale(valley[0], model["min"], model["max"])
+            return scaled, float(ccd_core.depth_lut(model)(valley[0]))
+
+        return self._run("predict", sid, compute)
+
+
+# ============================================================================
+# DOWNSAMPLING WAVEFORM (LTTB)
+# ============================================================================
 
-def predict(slope, intercept, x):
-    """Linear prediction"""
-    if x is None:
-        return None
-    return float(slope * x + intercept)
+def lttb_indices(y, n_out, keep=None):
+    """
+    Index titik hasil Largest-Triangle-Three-Buckets (x = index sampel).
+    Titik pertama & terakhir selalu dipilih; index `keep` (mis. valley)
+    menggantikan pilihan di bucket-nya supaya selalu ikut.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out-2 bucket di antara titik pertama dan terakhir; batas dihitung
+    # dengan bilangan bulat (linspace + astype bisa membulatkan ke bawah)
+    edges = np.arange(n_out - 1) * (n - 2) // (n_out - 2) + 1
+    sizes = np.diff(edges)
+    avg_x = (edges[:-1] + edges[1:] - 1) / 2.0
+    avg_y = np.add.reduceat(y[:edges[-1]], edges[:-1]) / sizes
+    # rata-rata bucket berikutnya; bucket terakhir memakai titik akhir
+    next_x = np.append(avg_x[1:], n - 1)
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((prev - next_x[i]) * (y[lo:hi] - y[prev]) - (prev - xs) * (next_y[i] - y[prev]))
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+
+    if keep is not None and 0 < keep < n - 1:
+        bucket = int(np.searchsorted(edges, keep, side="right")) - 1
+        selected[bucket + 1] = keep
+    return selected
+
+
+def sensor_waveforms(graph, n_points):
+    """
+    Kurva terfilter tiap sensor yang punya valley, diperkecil ke n_points
+    dengan LTTB; valley selalu termasuk. Format ringkas per sensor:
+    {"sensor", "pixels": [int], "mV": [0.1 mV]}.
+    """
+    waveforms = []
+    for sid in range(1, 7):
+        valley = graph.valley(sid) if graph.is_cached("valley", sid) else None
+        if valley is None:
+            continue
+        filtered = graph.filtered(sid)
+        idx = lttb_indices(filtered, int(n_points), keep=valley[1])
+        waveforms.append({
+            "sensor": sid,
+            "pixels": (idx + graph.pixel_offset(sid)).tolist(),
+            "mV": np.round(filtered[idx], 1).tolist()
+        })
+    return waveforms
 
 
 # ============================================================================
 # PIPELINE UTAMA: MULTI-SENSOR
 # ============================================================================
 
-def process_file(raw_text):
+def interpret_condition(min_depth):
+    """(status, detail) kondisi ban dari kedalaman alur terkecil"""
+    condition_status = "UNKNOWN"
+    condition_detail = ""
+    if min_depth is not None:
+        if min_depth < 1.6:
+            condition_status = "AUS"
+            condition_detail = "âš ï¸ Kedalaman < 1.6mm (batas legal). Ban WAJIB diganti!"
+        elif min_depth < 2.0:
+            condition_status = "HAMPIR_AUS"
+            condition_detail = "âš¡ Kedalaman mendekati batas. Persiapkan penggantian!"
+        elif min_depth < 3.0:
+            condition_status = "NORMAL"
+            condition_detail = "âœ… Kedalaman memadai. Pantau berkala."
+        else:
+            condition_status = "BAIK"
+            condition_detail = "âœ… Kondisi sangat baik."
+
+    return condition_status, condition_detail
+
+
+def process_file(raw_text, early_exit=True, graph=None, waveform_points=0):
     """
-    Pipeline lengkap dengan HARDCODED OUTPUT untuk kondisi AUS
+    Pipeline lengkap dengan HARDCODED OUTPUT untuk kondisi AUS.
+
+    Cek tegangan tinggi sensor 1 & 6 dijalankan sebelum deteksi valley.
+    Jika early_exit aktif dan kondisi AUS terpenuhi, filter + valley
+    sensor 2-5 dilewati karena hasilnya diganti kedalaman hardcoded;
+    sensor yang dilewati dilaporkan di "skipped_stages".
+
+    Semua stage dijalankan lewat ScanGraph; `graph` bisa diisi graph
+    yang sudah berisi intermediate dari cache.
+
+    waveform_points > 0 menambahkan "waveforms": kurva terfilter tiap
+    sensor yang punya valley, diperkecil dengan LTTB (sensor_waveforms).
     """
     try:
-        # Convert input
-        try:
-            raw_text = str(raw_text)
-        except:
-            raw_text = "\n".join([str(x) for x in to_python_list(raw_text)])
+        if graph is None:
+            graph = ScanGraph(raw_text)
 
-        # 1. Parse data CCD
-        sensors = process_single_sensor_parsing(raw_text)
-        total_pixels = int(sum(len(v) for v in sensors.values()))
+        # 1. Parse data CCD (string, list Python, atau ArrayList Java)
+        sensors = graph.sensors()
+        total_pixels = sum(graph.pixel_count(sid) for sid in range(1, 7))
 
         if total_pixels == 0:
             return json.dumps({
@@ -320,12 +673,24 @@ def process_file(raw_text):
         debug_log("Total pixels: {}".format(total_pixels))
         for sid in range(1, 7):
             data = sensors.get(sid, [])
-            if data:
+            if len(data):
                 debug_log("Sensor {}: {} pixels, range [{:.1f} - {:.1f}] mV".format(
-                    sid, len(data), min(data), max(data)))
+                    sid, graph.pixel_count(sid), np.min(data), np.max(data)))
 
-        # 2. Deteksi valley
-        valleys, details = detect_valleys(sensors)
+        # 2. Pilih model (cukup sensor 1 & 6, jadi dijalankan lebih dulu)
+        debug_log("\n" + sep_line)
+        model, label = graph.classification()
+
+        # 3. Deteksi valley (sensor 2-5 dilewati jika hasil sudah pasti AUS)
+        skipped_stages = {}
+        if early_exit and label == "HARDCODED_AUS":
+            skipped = [sid for sid in range(2, 6) if len(sensors.get(sid, [])) >= MIN_VALLEY_PIXELS]
+            if skipped:
+                skipped_stages = {"filter": skipped, "valley": skipped}
+                debug_log("EARLY EXIT: filter/valley sensor {} dilewati".format(skipped))
+            valleys, details = detect_valleys(sensors, sensor_ids=(1, 6), graph=graph)
+        else:
+            valleys, details = detect_valleys(sensors, graph=graph)
 
         # DEBUG: Valley values
         debug_log("\n" + sep_line)
@@ -335,9 +700,17 @@ def process_file(raw_text):
             val_str = "{} mV".format(v) if v is not None else "None"
             debug_log("  Sensor {}: {}".format(i, val_str))
 
-        # 3. Pilih model
-        debug_log("\n" + sep_line)
-        model, label = choose_model(sensors)
+        # Kualitas sinyal; sensor yang gagal cukup di-scan ulang (merge_rescan).
+        # Pada mode AUS hanya sensor 1 & 6 yang menentukan hasil.
+        quality = []
+        for sid in range(1, 7):
+            q = {"sensor": sid}
+            q.update(graph.quality(sid))
+            quality.append(q)
+        relevant = (1, 6) if label == "HARDCODED_AUS" else range(1, 7)
+        rescan_sensors = [q["sensor"] for q in quality if not q["ok"] and q["sensor"] in relevant]
+        if rescan_sensors:
+            debug_log("Sensor perlu scan ulang: {}".format(rescan_sensors))
 
         # ========================================================================
         # HARDCODED OUTPUT UNTUK KONDISI AUS
@@ -348,7 +721,7 @@ def process_file(raw_text):
             debug_log(sep_line)
 
             # Hardcoded depths: 1.28, 2.87, 2.94, 1.8
-            hardcoded_depths = [1.28, 2.87, 2.94, 1.8, None, None]
+            hardcoded_depths = HARDCODED_AUS_DEPTHS
 
             # Susun data per sensor
             data = []
@@ -357,6 +730,7 @@ def process_file(raw_text):
                 data.append({
                     "sensor": sid,
                     "valley": details[sid]["valley_value"],
+                    "valley_pixel": details[sid]["valley_pixel"],
                     "scaled": None,
                     "depth": hardcoded_depths[i],
                     "pixel_count": int(details[sid]["pixel_count"])
@@ -379,7 +753,7 @@ def process_file(raw_text):
             condition_status = "AUS"
             condition_detail = "âš ï¸ Kedalaman < 1.6mm (batas legal). Ban WAJIB diganti!"
 
-            return json.dumps({
+            result = {
                 "success": True,
                 "model_used": "HARDCODED_AUS",
                 "total_pixels": total_pixels,
@@ -388,8 +762,14 @@ def process_file(raw_text):
                 "min_depth": min_depth,
                 "avg_depth": avg_depth,
                 "condition_status": condition_status,
-                "condition_detail": condition_detail
-            }, indent=2)
+                "condition_detail": condition_detail,
+                "skipped_stages": skipped_stages,
+                "quality": quality,
+                "rescan_sensors": rescan_sensors
+            }
+            if waveform_points:
+                result["waveforms"] = sensor_waveforms(graph, waveform_points)
+            return json.dumps(result, indent=2)
 
         # ========================================================================
         # FLOW NORMAL: Gunakan model DALAM
@@ -401,11 +781,10 @@ def process_file(raw_text):
         debug_log("Min: {:.2f}, Max: {:.2f}".format(model['min'], model['max']))
         debug_log("Slope: {:.4f}, Intercept: {:.4f}".format(model['slope'], model['intercept']))
 
-        # 4. Normalisasi
-        scaled = [scale(v, model["min"], model["max"]) for v in valleys]
-
-        # 5. Prediksi kedalaman
-        depths = [predict(model["slope"], model["intercept"], s) for s in scaled]
+        # 4-5. Normalisasi + prediksi kedalaman
+        predictions = [graph.prediction(sid) for sid in range(1, 7)]
+        scaled = [p[0] for p in predictions]
+        depths = [p[1] for p in predictions]
 
         # DEBUG: Predicted depths
         debug_log("\nKedalaman Per Sensor:")
@@ -420,6 +799,7 @@ def process_file(raw_text):
             data.append({
                 "sensor": sid,
                 "valley": details[sid]["valley_value"],
+                "valley_pixel": details[sid]["valley_pixel"],
                 "scaled": scaled[i],
                 "depth": depths[i],
                 "pixel_count": int(details[sid]["pixel_count"])
@@ -444,24 +824,10 @@ def process_file(raw_text):
         debug_log(sep_line + "\n")
 
         # 8. Interpretasi kondisi ban
-        condition_status = "UNKNOWN"
-        condition_detail = ""
-        if min_depth is not None:
-            if min_depth < 1.6:
-                condition_status = "AUS"
-                condition_detail = "âš ï¸ Kedalaman < 1.6mm (batas legal). Ban WAJIB diganti!"
-            elif min_depth < 2.0:
-                condition_status = "HAMPIR_AUS"
-                condition_detail = "âš¡ Kedalaman mendekati batas. Persiapkan penggantian!"
-            elif min_depth < 3.0:
-                condition_status = "NORMAL"
-                condition_detail = "âœ… Kedalaman memadai. Pantau berkala."
-            else:
-                condition_status = "BAIK"
-                condition_detail = "âœ… Kondisi sangat baik."
+        condition_status, condition_detail = interpret_condition(min_depth)
 
         # 9. Return hasil
-        return json.dumps({
+        result = {
             "success": True,
             "model_used": label,
             "total_pixels": total_pixels,
@@ -470,8 +836,14 @@ def process_file(raw_text):
             "min_depth": min_depth,
             "avg_depth": avg_depth,
             "condition_status": condition_status,
-            "condition_detail": condition_detail
-        }, indent=2)
+            "condition_detail": condition_detail,
+            "skipped_stages": skipped_stages,
+            "quality": quality,
+            "rescan_sensors": rescan_sensors
+        }
+        if waveform_points:
+            result["waveforms"] = sensor_waveforms(graph, waveform_points)
+        return json.dumps(result, indent=2)
 
     except Exception as e:
         import traceback
@@ -486,6 +858,574 @@ def process_file(raw_text):
         })
 
 
+# ============================================================================
+# PREVIEW KEDALAMAN LIVE SELAMA SCAN
+# ============================================================================
+# Sampel setiap sensor datang berurutan menurut pixel. Pass maju filter
+# dihitung per sampel saat tiba (ccd_core.pure.lowpass_step, sama persis
+# dengan pass maju butter_filtfilt). Pass mundur hanya dijalankan atas ekor
+# yang belum "settle": nilai yang berjarak > PREVIEW_SETTLE sampel dari
+# ujung sudah final (pengaruh ujung meluruh < 1e-12) dan langsung masuk
+# valley berjalan, jadi riwayat tidak pernah difilter ulang.
+
+class _SensorTrack:
+    """Filter inkremental + valley berjalan untuk satu sensor"""
+
+    def __init__(self, b_coef, a_coef):
+        self.b = [float(v) for v in b_coef]
+        self.a = [float(v) for v in a_coef]
+        self.first_pixel = None
+        self.last_pixel = None
+        self.x = []
+        self.f = []
+        self.settled = 0
+        self.valley = None          # (nilai, index) dari bagian final
+        self.high = 0               # sampel final > AUS_VOLTAGE_THRESH
+        self.tail = []
+        self.last_valley_index = None
+        self.valley_since = 0
+
+    def _append(self, value):
+        x, f = self.x, self.f
+        x.append(value)
+        n = len(x)
+        if n == 1:
+            f.append(value)
+        elif n == 2:
+            f[:] = pure.initial_state(x[0], x[1], self.b, self.a, ccd_core.INIT_EDGE)
+        else:
+            y, _ = pure.lowpass_step((x[-3], x[-2], f[-2], f[-1]), value, self.b, self.a)
+            f.append(y)
+
+    def push(self, pixel, value):
+        if self.last_pixel is None:
+            self.first_pixel = pixel
+        elif pixel == self.last_pixel:
+            # duplikat: nilai terakhir menang (sama dengan frame)
+            self.x.pop()
+            self.f.pop()
+        elif pixel > self.last_pixel:
+            # celah: interpolasi linear seperti repair_gaps
+            prev = self.x[-1]
+            gap = pixel - self.last_pixel
+            for k in range(1, gap):
+                self._append(prev + (value - prev) * k / gap)
+        else:
+            # pixel mundur = sapuan baru sensor ini; mulai ulang
+            self.__init__(self.b, self.a)
+            self.first_pixel = pixel
+        self._append(value)
+        self.last_pixel = pixel
+
+    def update(self):
+        """Pass mundur atas ekor; finalisasi sampel yang sudah settle"""
+        n = len(self.f)
+        if n < 3:
+            self.tail = list(self.x)
+            return
+        back = ccd_core.lowpass(self.f[self.settled:][::-1], self.b, self.a, ccd_core.INIT_EDGE)[::-1]
+        final_upto = max(self.settled, n - PREVIEW_SETTLE)
+        done = back[:final_upto - self.settled]
+        if len(done):
+            idx = int(np.argmin(done))
+            if self.valley is None or done[idx] < self.valley[0]:
+                self.valley = (float(done[idx]), self.settled + idx)
+            self.high += ccd_core.count_above(done, AUS_VOLTAGE_THRESH)
+        self.tail = back[final_upto - self.settled:].tolist()
+        self.settled = final_upto
+
+    def current_valley(self):
+        """(nilai, index) valley bagian final + ekor provisional"""
+        best = self.valley
+        if self.tail:
+            idx = int(np.argmin(self.tail))
+            if best is None or self.tail[idx] < best[0]:
+                best = (float(self.tail[idx]), self.settled + idx)
+        return best
+
+    def high_count(self):
+        return self.high + sum(1 for v in self.tail if v > AUS_VOLTAGE_THRESH)
+
+
+class LivePreview(FrameBuilder):
+    """
+    FrameBuilder yang sekaligus memperkirakan kedalaman selama scan.
+    feed() menampung baris; setiap every_lines baris valley berjalan
+    diperbarui. preview() murah (tanpa filter ulang); graph() memberi
+    ScanGraph frame lengkap untuk hasil akhir tanpa parse ulang.
+    """
+
+    def __init__(self, every_lines=PREVIEW_EVERY_LINES, b_coef=None, a_coef=None, model=None):
+        super().__init__()
+        self.every_lines = int(every_lines)
+        self.b_coef = b if b_coef is None else b_coef
+        self.a_coef = a if a_coef is None else a_coef
+        self.model = model
+        self.tracks = {}
+        self._pending = []
+        self._dirty = set()
+
+    def feed(self, lines):
+        self._pending.extend(self._lines(lines))
+        if len(self._pending) >= self.every_lines:
+            self.flush()
+        return self
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._feed_lines(pending)
+        for sid in self._dirty:
+            track = self.tracks[sid]
+            track.update()
+            valley = track.current_valley()
+            index = None if valley is None else valley[1]
+            if index != track.last_valley_index:
+                track.last_valley_index = index
+                track.valley_since = len(track.x)
+        self._dirty.clear()
+        return self
+
+    def _add(self, sids, pixels, values):
+        super()._add(sids, pixels, values)
+        tracks = self.tracks
+        for sid, pixel, value in zip(sids, pixels, values):
+            track = tracks.get(sid)
+            if track is None:
+                track = tracks[sid] = _SensorTrack(self.b_coef, self.a_coef)
+            track.push(pixel, value)
+            self._dirty.add(sid)
+
+    def preview(self, flush=False):
+        """Kedalaman provisional per sensor dari valley berjalan"""
+        if flush:
+            self.flush()
+        received = np.count_nonzero(self.counts, axis=1)
+        aus = all(
+            sid in self.tracks and self.tracks[sid].high_count() >= AUS_COUNT_THRESH
+            for sid in (1, 6)
+        )
+
+        sensors = []
+        depths = []
+        for sid in range(1, 7):
+            track = self.tracks.get(sid)
+            valley = track.current_valley() if track is not None else None
+            enough = int(received[sid - 1]) >= MIN_VALLEY_PIXELS
+            if aus:
+                depth = HARDCODED_AUS_DEPTHS[sid - 1]
+            elif valley is not None and enough:
+                depth = float(ccd_core.depth_lut(self.model or MODEL_DALAM)(valley[0]))
+            else:
+                depth = None
+            if depth is not None:
+                depths.append(depth)
+            sensors.append({
+                "sensor": sid,
+                "pixel_count": int(received[sid - 1]),
+                "valley": None if valley is None else valley[0],
+                "valley_pixel": None if valley is None else track.first_pixel + valley[1],
+                "depth": depth,
+                "receiving": sid == self.current_sensor,
+                "stable": track is not None and enough
+                          and len(track.x) - track.valley_since >= PREVIEW_STABLE_SAMPLES,
+            })
+
+        smallest4 = sorted(depths)[:4]
+        return {
+            "success": True,
+            "provisional": True,
+            "model_used": "HARDCODED_AUS" if aus else "DALAM",
+            "lines": self.lines_seen + len(self._pending),
+            "sensors": sensors,
+            "min_depth": smallest4[0] if smallest4 else None,
+            "avg_depth": sum(smallest4) / len(smallest4) if smallest4 else None,
+        }
+
+    def graph(self):
+        self.flush()
+        return ScanGraph.from_frame(*self.frame(), b_coef=self.b_coef, a_coef=self.a_coef, model=self.model)
+
+
+# ===== Entrypoint preview untuk Kotlin (satu scan aktif) =====
+_live_preview = None
+
+
+def live_start(every_lines=PREVIEW_EVERY_LINES):
+    global _live_preview
+    _live_preview = LivePreview(every_lines)
+    return json.dumps({"success": True})
+
+
+def live_feed(lines):
+    """Tambah baris yang baru diterima; return preview JSON"""
+    try:
+        if _live_preview is None:
+            live_start()
+        return json.dumps(_live_preview.feed(lines).preview())
+    except Exception as e:
+        return json.dumps({"success": False, "message": "live_feed exception: {}".format(str(e))})
+
+
+def live_finish(waveform_points=0):
+    """Hasil akhir process_file dari frame yang sudah terkumpul"""
+    global _live_preview
+    try:
+        if _live_preview is None:
+            return json.dumps({"success": False, "message": "No live scan in progress"})
+        graph = _live_preview.graph()
+        _live_preview = None
+        return process_file(None, graph=graph, waveform_points=waveform_points)
+    except Exception as e:
+        return json.dumps({"success": False, "message": "live_finish exception: {}".format(str(e))})
+
+
+# ============================================================================
+# HASIL PROGRESIF DENGAN DEADLINE
+# ============================================================================
+# Untuk handset lambat: hasil kasar (provisional) dalam budget waktu dari
+# sinyal yang dirata-rata per PROGRESSIVE_DECIMATION pixel, sensor diproses
+# berurutan sampai deadline; lalu hasil penuh dari process_file memakai
+# ScanGraph yang sama (parse tidak diulang). Setiap stage melaporkan
+# durasi dan apakah selesai sebelum deadline.
+
+def _stage(stages, name, t_start, deadline, **extra):
+    now = time.perf_counter()
+    entry = {"stage": name, "ms": round((now - t_start) * 1000.0, 3), "within_budget": now <= deadline}
+    entry.update(extra)
+    stages.append(entry)
+    return now
+
+
+def _coarse_valley(voltages, decimation, b_coef, a_coef):
+    """(nilai, pixel index) valley dari sinyal rata-rata blok decimation pixel"""
+    n = (len(voltages) // decimation) * decimation
+    coarse = np.asarray(voltages[:n], dtype=float).reshape(-1, decimation).mean(axis=1)
+    filtered = ccd_core.filtfilt(coarse, b_coef, a_coef, ccd_core.INIT_EDGE)
+    value, idx = ccd_core.find_valley(filtered)
+    return value, idx * decimation + decimation // 2, filtered
+
+
+def coarse_result(graph, deadline, decimation=PROGRESSIVE_DECIMATION):
+    """
+    Hasil kasar dari sensor yang sempat diproses sebelum deadline.
+    Return dict seperti process_file dengan provisional=True.
+    """
+    sensors = graph.sensors()
+    fs = SAMPLE_RATE_HZ / decimation
+    b_coef, a_coef = design_butter_lowpass(min(FILTER_CUTOFF_HZ, 0.45 * fs), fs)
+
+    valleys = {}
+    high_counts = {}
+    processed = []
+    for sid in PROGRESSIVE_SENSOR_ORDER:
+        if processed and time.perf_counter() > deadline:
+            break
+        processed.append(sid)
+        data = sensors.get(sid, [])
+        if graph.pixel_count(sid) < MIN_VALLEY_PIXELS or len(data) < 3 * decimation:
+            continue
+        value, idx, filtered = _coarse_valley(data, decimation, b_coef, a_coef)
+        valleys[sid] = (value, graph.pixel_offset(sid) + idx)
+        high_counts[sid] = ccd_core.count_above(filtered, AUS_VOLTAGE_THRESH) * decimation
+
+    aus = all(high_counts.get(sid, 0) >= AUS_COUNT_THRESH for sid in (1, 6))
+    label = "HARDCODED_AUS" if aus else "DALAM"
+    model = graph.model or MODEL_DALAM
+
+    data = []
+    for sid in range(1, 7):
+        valley, pixel = valleys.get(sid, (None, None))
+        if aus:
+            scaled, depth = None, HARDCODED_AUS_DEPTHS[sid - 1]
+        else:
+            scaled = scale(valley, model["min"], model["max"])
+            depth = None if valley is None else float(ccd_core.depth_lut(model)(valley))
+        data.append({
+            "sensor": sid,
+            "valley": valley,
+            "valley_pixel": pixel,
+            "scaled": scaled,
+            "depth": depth,
+            "pixel_count": graph.pixel_count(sid)
+        })
+
+    valid = [d for d in data if d["depth"] is not None]
+    smallest4 = sorted(valid, key=lambda x: x["depth"])[:4]
+    min_depth = float(smallest4[0]["depth"]) if smallest4 else None
+    avg_depth = float(sum(x["depth"] for x in smallest4) / len(smallest4)) if smallest4 else None
+    condition_status, condition_detail = interpret_condition(min_depth)
+
+    return {
+        "success": True,
+        "provisional": True,
+        "model_used": label,
+        "total_pixels": sum(graph.pixel_count(sid) for sid in range(1, 7)),
+        "data": data,
+        "smallest_4": smallest4,
+        "min_depth": min_depth,
+        "avg_depth": avg_depth,
+        "condition_status": condition_status,
+        "condition_detail": condition_detail,
+        "sensors_processed": processed,
+        "classification_complete": 1 in processed and 6 in processed,
+        "decimation": decimation
+    }
+
+
+def progressive_results(raw_text, budget_ms=PROGRESSIVE_BUDGET_MS, graph=None,
+                        decimation=PROGRESSIVE_DECIMATION, waveform_points=0):
+    """
+    Generator: hasil kasar (provisional) lalu hasil penuh, keduanya dict.
+    Budget dihitung sejak generator mulai berjalan.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + budget_ms / 1000.0
+    stages = []
+    if graph is None:
+        graph = ScanGraph(raw_text)
+
+    graph.sensors()
+    t = _stage(stages, "parse", t0, deadline)
+    if sum(graph.pixel_count(sid) for sid in range(1, 7)) == 0:
+        yield json.loads(process_file(None, graph=graph))
+        return
+
+    coarse = coarse_result(graph, deadline, decimation)
+    t = _stage(stages, "coarse", t, deadline, sensors=coarse["sensors_processed"])
+    coarse["stages"] = list(stages)
+    coarse["budget_ms"] = budget_ms
+    yield coarse
+
+    final = json.loads(process_file(None, graph=graph, waveform_points=waveform_points))
+    _stage(stages, "refine", t, deadline)
+    final["provisional"] = False
+    final["stages"] = stages
+    final["budget_ms"] = budget_ms
+    yield final
+
+
+def process_file_progressive(raw_text, budget_ms=PROGRESSIVE_BUDGET_MS, on_result=None, waveform_points=0):
+    """
+    Entrypoint APK. on_result (callable Python atau objek Java dengan
+    invoke()) menerima JSON hasil kasar segera setelah siap, lalu JSON
+    hasil penuh; hasil penuh juga dikembalikan.
+    """
+    try:
+        result = None
+        for item in progressive_results(raw_text, float(budget_ms), waveform_points=waveform_points):
+            result = json.dumps(item, indent=2)
+            if on_result is not None:
+                if callable(on_result):
+                    on_result(result)
+                else:
+                    on_result.invoke(result)
+        return result
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "message": "process_file_progressive exception: {}".format(str(e))
+        })
+
+
+# ============================================================================
+# SCAN ULANG PARSIAL
+# ============================================================================
+
+def merge_rescan(previous, rescan, sensor_ids=None):
+    """
+    Gabungkan capture ulang sensor yang gagal ke scan sebelumnya.
+
+    previous/rescan boleh ScanGraph atau raw input. sensor_ids default =
+    sensor yang punya data di rescan. Hasil filter/valley sensor yang tidak
+    diganti dipakai ulang dari graph sebelumnya tanpa dihitung lagi.
+    Return ScanGraph baru dengan atribut merged_sensors.
+    """
+    if not isinstance(previous, ScanGraph):
+        previous = ScanGraph(previous)
+    if not isinstance(rescan, ScanGraph):
+        rescan = ScanGraph(rescan, b_coef=previous.b_coef, a_coef=previous.a_coef)
+
+    if sensor_ids is None:
+        sensor_ids = [sid for sid in range(1, 7) if len(rescan.sensors().get(sid, []))]
+    sensor_ids = sorted(int(sid) for sid in to_python_list(sensor_ids))
+
+    sensors = {}
+    pixels = {}
+    cache = {}
+    prev_pixels = previous.pixels() or {}
+    new_pixels = rescan.pixels() or {}
+    for sid in range(1, 7):
+        source, source_pixels = (rescan, new_pixels) if sid in sensor_ids else (previous, prev_pixels)
+        sensors[sid] = source.sensors().get(sid, [])
+        if sid in source_pixels:
+            pixels[sid] = source_pixels[sid]
+        if sid not in sensor_ids:
+            for stage in ("filter", "valley"):
+                if previous.is_cached(stage, sid):
+                    cache[(stage, sid)] = previous._memo[(stage, sid)]
+
+    merged = ScanGraph(sensors=sensors, b_coef=previous.b_coef, a_coef=previous.a_coef, cache=cache)
+    if len(pixels) == 6:
+        merged.inject("pixels", pixels)
+    merged.merged_sensors = sensor_ids
+    return merged
+
+
+def process_rescan(previous_raw, rescan_raw, sensor_ids=None):
+    """Entrypoint APK: proses scan sebelumnya + capture ulang sensor gagal"""
+    try:
+        graph = merge_rescan(previous_raw, rescan_raw, sensor_ids)
+        result = json.loads(process_file(None, graph=graph))
+        result["merged_sensors"] = graph.merged_sensors
+        return json.dumps(result, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "message": "process_rescan exception: {}".format(str(e))
+        })
+
+
+# ============================================================================
+# PENUMPUKAN SCAN BERULANG (MULTI-PASS)
+# ============================================================================
+# Beberapa capture posisi ban yang sama disejajarkan per index pixel
+# (frame parse_ccd_frame sudah berindex pixel), lalu digabung per pixel
+# dengan median / trimmed mean sebelum filter dan deteksi valley.
+# Noise per pass = median selisih antar-pass per pixel; noise hasil tumpukan
+# diperkirakan sigma * efisiensi / sqrt(n) (median: sqrt(pi/2) untuk n > 2).
+
+def _as_frame(scan):
+    """Raw input atau tuple (values, counts) -> frame"""
+    if isinstance(scan, tuple):
+        values, counts = scan
+        return np.asarray(values, dtype=float), np.asarray(counts)
+    return parse_ccd_frame(scan)
+
+
+def robust_stack(frames, valid, method="median", trim_fraction=STACK_TRIM_FRACTION):
+    """
+    Gabung frames (N, ...) per posisi dengan mengabaikan sampel tidak valid.
+    method "median" atau "trimmed" (buang floor(trim * n) sampel per sisi).
+    Posisi tanpa sampel valid bernilai NaN.
+    """
+    ordered = np.sort(np.where(valid, frames, np.nan), axis=0)   # NaN di belakang
+    n = valid.sum(axis=0)
+    rank = np.arange(len(frames)).reshape((-1,) + (1,) * (frames.ndim - 1))
+
+    if method == "median":
+        lo = np.take_along_axis(ordered, np.maximum((n - 1) // 2, 0)[None], axis=0)[0]
+        hi = np.take_along_axis(ordered, np.maximum(n // 2, 0)[None], axis=0)[0]
+        stacked = (lo + hi) / 2.0
+    elif method == "trimmed":
+        k = np.floor(n * trim_fraction).astype(int)
+        keep = (rank >= k) & (rank < n - k)
+        kept = keep.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stacked = np.where(keep, ordered, 0.0).sum(axis=0) / kept
+    else:
+        raise ValueError("Unknown stack method: {}".format(method))
+
+    stacked[n == 0] = np.nan
+    return stacked
+
+
+def _trimmed_efficiency(passes, trim_fraction):
+    """
+    std trimmed mean / std mean untuk noise gaussian (varians asimtotik
+    trimmed mean dengan fraksi buang efektif k/n per sisi).
+    """
+    k = int(passes * trim_fraction)
+    if k == 0 or passes - 2 * k < 1:
+        return 1.0
+    alpha = k / float(passes)
+    z = statistics.NormalDist().inv_cdf(1.0 - alpha)
+    phi = math.exp(-0.5 * z * z) / math.sqrt(2.0 * math.pi)
+    var = ((1.0 - 2.0 * alpha) - 2.0 * z * phi + 2.0 * alpha * z * z) / (1.0 - 2.0 * alpha) ** 2
+    return math.sqrt(var)
+
+
+def stack_passes(scans, method="median", trim_fraction=STACK_TRIM_FRACTION,
+                 target_noise_mV=STACK_TARGET_NOISE_MV):
+    """
+    Tumpuk beberapa capture posisi yang sama menjadi satu ScanGraph.
+
+    scans: list raw input / (values, counts). Return ScanGraph dengan
+    atribut stack_info: jumlah pass, metode, dan per sensor noise per pass,
+    perkiraan noise hasil tumpukan, serta jumlah pass yang dibutuhkan
+    untuk mencapai target_noise_mV.
+    """
+    parsed = [_as_frame(scan) for scan in to_python_list(scans)]
+    if not parsed:
+        raise ValueError("No passes to stack")
+    values = np.stack([v for v, _ in parsed])
+    counts = np.stack([c for _, c in parsed]).astype(np.uint32)
+    valid = counts > 0
+
+    stacked = robust_stack(values, valid, method, trim_fraction)
+    total_counts = np.minimum(counts.sum(axis=0), np.iinfo(np.uint16).max).astype(np.uint16)
+
+    # noise per pass robust terhadap spike dari selisih antar pasangan pass
+    # pada pixel yang sama: median |x_i - x_j| = 0.6745 * sqrt(2) * sigma
+    n = valid.sum(axis=0)
+    diffs = [
+        np.where(valid[i] & valid[j], np.abs(values[i] - values[j]), np.nan)
+        for i in range(len(values)) for j in range(i + 1, len(values))
+    ]
+    pooled = np.full(6, np.nan)
+    if diffs:
+        diffs = np.stack(diffs)
+        for row in range(6):
+            d = diffs[:, row][~np.isnan(diffs[:, row])]
+            if len(d):
+                pooled[row] = float(np.median(d)) / (0.6745 * math.sqrt(2.0))
+
+    passes = len(parsed)
+    # faktor efisiensi (noise gaussian): median ~sqrt(pi/2); trimmed mean lihat _trimmed_efficiency
+    if method == "median" and passes > 2:
+        efficiency = math.sqrt(math.pi / 2.0)
+    elif method == "trimmed":
+        efficiency = _trimmed_efficiency(passes, trim_fraction)
+    else:
+        efficiency = 1.0
+    sensors = []
+    for sid in range(1, 7):
+        row_n = n[sid - 1][n[sid - 1] > 0]
+        sigma = pooled[sid - 1]
+        info = {"sensor": sid, "passes": int(np.median(row_n)) if len(row_n) else 0}
+        if np.isnan(sigma):
+            info.update({"pass_noise_mV": None, "stacked_noise_mV": None, "passes_needed": None})
+        else:
+            eff_passes = max(info["passes"], 1)
+            info["pass_noise_mV"] = round(float(sigma), 3)
+            info["stacked_noise_mV"] = round(float(sigma * efficiency / math.sqrt(eff_passes)), 3)
+            info["passes_needed"] = max(1, int(math.ceil((sigma * efficiency / target_noise_mV) ** 2)))
+        sensors.append(info)
+
+    graph = ScanGraph.from_frame(stacked, total_counts)
+    graph.stack_info = {
+        "passes": passes,
+        "method": method,
+        "target_noise_mV": target_noise_mV,
+        "sensors": sensors,
+    }
+    return graph
+
+
+def process_stacked(raw_passes, method="median", target_noise_mV=STACK_TARGET_NOISE_MV, waveform_points=0):
+    """Entrypoint APK: proses beberapa capture posisi yang sama sebagai satu scan"""
+    try:
+        graph = stack_passes(raw_passes, method, target_noise_mV=target_noise_mV)
+        result = json.loads(process_file(None, graph=graph, waveform_points=waveform_points))
+        result["stacking"] = graph.stack_info
+        return json.dumps(result, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "success": False,
+            "message": "process_stacked exception: {}".format(str(e))
+        })
+
+
 # ============================================================================
 # SINGLE-SENSOR PROCESSING
 # ============================================================================
@@ -493,7 +1433,7 @@ def process_file(raw_text):
 def process_single_sensor(raw_lines):
     """Proses data single sensor dengan asumsi 4 groove"""
     try:
-        lines = to_python_list(raw_lines)
+        lines = ccd_core.to_lines(raw_lines)
         if not lines:
             return json.dumps({
                 "success": False,
@@ -521,7 +1461,6 @@ def process_single_sensor(raw_lines):
 
         # Filter data
         filtered = butter_filtfilt(voltages, b, a)
-        filtered = np.array(filtered, dtype=float)
 
         # Split menjadi 4 segment
         n = len(filtered)
@@ -594,7 +1533,8 @@ def process_single_sensor(raw_lines):
 # DISPATCHER: ENTRYPOINT UTAMA
 # ============================================================================
 
-def predict_file(raw_input, model_dalam_in=None, model_dangkal_in=None, b_in=None, a_in=None):
+def predict_file(raw_input, model_dalam_in=None, model_dangkal_in=None, b_in=None, a_in=None,
+                 waveform_points=0):
     """Fungsi utama yang dipanggil dari APK"""
     global MODEL_DALAM, MODEL_DANGKAL, b, a
 
@@ -609,20 +1549,11 @@ def predict_file(raw_input, model_dalam_in=None, model_dangkal_in=None, b_in=Non
         a = a_in
 
     # Normalize input menjadi list of lines
-    lines = None
-    if isinstance(raw_input, str):
-        try:
-            with open(raw_input, "r", encoding="utf-8") as f:
-                content = f.read()
-            lines = content.splitlines()
-        except Exception:
-            lines = raw_input.splitlines()
-    else:
-        lines = to_python_list(raw_input)
+    lines = ccd_core.normalize_lines(raw_input)
 
     # Prioritas 1: Coba multi-sensor CCD
     try:
-        res_multi = process_file(lines)
+        res_multi = process_file(lines, waveform_points=waveform_points)
         res_obj = json.loads(res_multi)
         if res_obj.get("success"):
             return res_multi
@@ -662,13 +1593,21 @@ def get_model_info():
             "a": a
         },
         "pixel_range": {
-            "min": 280,
-            "max": 1080
+            "min": PIXEL_MIN,
+            "max": PIXEL_MAX
+        },
+        "signal_quality": {
+            "min_coverage": QUALITY_MIN_COVERAGE,
+            "max_gap": QUALITY_MAX_GAP,
+            "saturation_mV": QUALITY_SATURATION_MV,
+            "max_saturated_fraction": QUALITY_MAX_SATURATED,
+            "max_noise_mV": QUALITY_MAX_NOISE_MV
         },
         "aus_detection": {
-            "voltage_threshold": 2800,
-            "min_pixels_required": 2,
+            "voltage_threshold": AUS_VOLTAGE_THRESH,
+            "min_pixels_required": AUS_COUNT_THRESH,
             "sensors_checked": [1, 6],
-            "hardcoded_depths": [1.28, 2.87, 2.94, 1.8]
+            "hardcoded_depths": [1.28, 2.87, 2.94, 1.8],
+            "early_exit": True
         }
     }, indent=2)
\ No newline at end of file
@@ -1,6 +1,10 @@
 import json
-import re
-from typing import Any
+from array import array
+from itertools import groupby
+
+import ccd_core
+from ccd_core import pure, to_python_list
+from ccd_core.parser import PIXEL_MV_RE
 
 # MODEL DARI COLAB
 model_dalam = {
@@ -25,33 +29,21 @@ a_coef = [-1.14298, 0.412801]
 # -------------------------
 # Butterworth implementation
 # -------------------------
+# Filter, parser dan model dijalankan oleh bagian ccd_core tanpa NumPy
+# (pure.filtfilt mode INIT_ZERO, parse_samples dialect TIRE_PROCESSING,
+# apply_model), jadi modul ini bisa dipakai di build minimal. Sampel
+# internal berupa array('d'); fungsi publik filter tetap mengembalikan list
+# Python.
 def butter_lowpass_filter(data, b, a):
     """
     Direct-form IIR forward filter (biquad-like) for 2nd order coefficients.
-    This is a manual implementation similar to scipy.signal.lfilter for these
-    specific coefficients.
+    Initialized with y[0] = b[0]*x[0] (ccd_core INIT_ZERO).
     """
-    n = len(data)
-    if n == 0:
+    if len(data) == 0:
         return []
-    if n < 3:
-        # fallback: return copy
+    if len(data) < 3:
         return data[:]
-
-    y = [0.0] * n
-    # initialize using safe formulas
-    y[0] = b[0] * data[0]
-    y[1] = b[0] * data[1] + b[1] * data[0] - a[0] * y[0]
-
-    for i in range(2, n):
-        y[i] = (
-            b[0] * data[i]
-            + b[1] * data[i - 1]
-            + b[2] * data[i - 2]
-            - a[0] * y[i - 1]
-            - a[1] * y[i - 2]
-        )
-    return y
+    return pure.lowpass(data, b, a, ccd_core.INIT_ZERO)
 
 
 def butter_filtfilt(data, b, a):
@@ -63,44 +55,7 @@ def butter_filtfilt(data, b, a):
         return []
     if len(data) < 3:
         return data[:]
-    forward = butter_lowpass_filter(data, b, a)
-    backward = butter_lowpass_filter(forward[::-1], b, a)
-    return backward[::-1]
-
-
-# -------------------------
-# Safe converter for ArrayList (Chaquopy)
-# -------------------------
-def to_python_list(obj: Any):
-    """
-    Convert possible Java ArrayList or iterable to Python list.
-    Returns list of strings or original list items if already Python list.
-    """
-    # Already a native list
-    if isinstance(obj, list):
-        return obj
-    # Try to cast to list
-    try:
-        return list(obj)
-    except Exception:
-        pass
-    # Try Java-style .size() and .get(i)
-    try:
-        size = obj.size()
-        return [obj.get(i) for i in range(size)]
-    except Exception:
-        pass
-    # Try Java-style iterator
-    try:
-        it = obj.iterator()
-        out = []
-        while it.hasNext():
-            out.append(it.next())
-        return out
-    except Exception:
-        pass
-    # Can't convert: return empty
-    return []
+    return pure.filtfilt(data, b, a, ccd_core.INIT_ZERO).tolist()
 
 
 # -------------------------
@@ -113,37 +68,17 @@ def parse_ccd_raw_lines(raw_lines):
       --- SENSOR 1 ---
       Pixel[   0]: 1234.56 mV
       ...
-    Returns a dict sensors: {1: [voltages], 2: [...], ..., 6: [...]}
+    Returns a dict sensors: {1: array('d') voltages, 2: ..., ..., 6: ...}
     """
-    lines = to_python_list(raw_lines)
-    sensor_pattern = re.compile(r"---\s*SENSOR\s+(\d+)\s*---", re.IGNORECASE)
-    pixel_pattern = re.compile(r"Pixel\[\s*(\d+)\s*\]:\s*([\d\.]+)\s*mV", re.IGNORECASE)
+    lines = [str(raw) for raw in ccd_core.to_lines(raw_lines) if raw is not None]
+    sids, _, voltages, _ = ccd_core.parse_samples(lines, ccd_core.TIRE_PROCESSING)
 
-    sensors = {i: [] for i in range(1, 7)}
-    current_sensor = None
-
-    for raw in lines:
-        if raw is None:
-            continue
-        line = str(raw).strip()
-        if not line:
-            continue
-
-        m_sensor = sensor_pattern.match(line)
-        if m_sensor:
-            current_sensor = int(m_sensor.group(1))
-            continue
-
-        m_pixel = pixel_pattern.search(line)
-        if m_pixel and current_sensor is not None:
-            try:
-                pixel_idx = int(m_pixel.group(1))
-                voltage = float(m_pixel.group(2))
-            except Exception:
-                continue
-            # keep only pixels in your stated window (280..1080)
-            if 280 <= pixel_idx <= 1080:
-                sensors.setdefault(current_sensor, []).append(voltage)
+    sensors = {i: array("d") for i in range(1, 7)}
+    start = 0
+    for sid, run in groupby(sids):
+        stop = start + sum(1 for _ in run)
+        sensors.setdefault(sid, array("d")).extend(voltages[start:stop])
+        start = stop
 
     return sensors
 
@@ -166,10 +101,9 @@ def detect_valleys_from_sensors(sensors: dict):
             valleys.append(None)
             details[sid] = {"filtered": [], "valley_index": None, "valley_value": None, "pixel_count": len(data)}
             continue
-        filtered = butter_filtfilt(data, b_coef, a_coef)
+        filtered = pure.filtfilt(data, b_coef, a_coef, ccd_core.INIT_ZERO)
         # find min value (valley) and its index
-        min_val = min(filtered)
-        min_idx = filtered.index(min_val)
+        min_val, min_idx = pure.find_valley(filtered)
         valleys.append(min_val)
         details[sid] = {"filtered": filtered, "valley_index": min_idx, "valley_value": min_val, "pixel_count": len(data)}
     return valleys, details
@@ -186,7 +120,7 @@ def choose_model_from_sensors(sensors: dict):
     def safe_filter(sig):
         if len(sig) < 3:
             return []
-        return butter_filtfilt(sig, b_coef, a_coef)
+        return pure.filtfilt(sig, b_coef, a_coef, ccd_core.INIT_ZERO)
 
     s1 = sensors.get(1, [])
     s6 = sensors.get(6, [])
@@ -195,8 +129,8 @@ def choose_model_from_sensors(sensors: dict):
     f6 = safe_filter(s6)
 
     th_high = 2801
-    c1 = sum(1 for v in f1 if v > th_high)
-    c6 = sum(1 for v in f6 if v > th_high)
+    c1 = pure.count_above(f1, th_high)
+    c6 = pure.count_above(f6, th_high)
 
     if c1 > 2 and c6 > 2:
         return model_dangkal, "DANGKAL"
@@ -207,22 +141,11 @@ def choose_model_from_sensors(sensors: dict):
 # Min-max scaler & linear predict
 # -------------------------
 def transform_minmax(values, mn, mx):
-    out = []
-    for v in values:
-        if v is None:
-            out.append(None)
-        else:
-            if mx == mn:
-                out.append(0.0)
-            else:
-                out.append((v - mn) / (mx - mn))
-    return out
+    return [ccd_core.scale(v, mn, mx) for v in values]
 
 
 def predict_linear(slope, intercept, x):
-    if x is None:
-        return None
-    return slope * x + intercept
+    return ccd_core.predict(slope, intercept, x)
 
 
 # -------------------------
@@ -241,8 +164,7 @@ def process_file(raw_lines):
 
         model, label = choose_model_from_sensors(sensors)
 
-        scaled = transform_minmax(valleys, model["min"], model["max"])
-        depths = [predict_linear(model["slope"], model["intercept"], s) for s in scaled]
+        scaled, depths = ccd_core.apply_model(valleys, model)
 
         data = []
         for i in range(6):
@@ -258,11 +180,11 @@ def process_file(raw_lines):
         valid = [d for d in data if d["depth"] is not None]
         if len(valid) < 4:
             # fallback behavior: if fewer than 4 valid, use as many as available
-            smallest4 = sorted(valid, key=lambda x: x["depth"])[:max(1, len(valid))]
+            smallest4 = pure.smallest(valid, max(1, len(valid)), key=lambda x: x["depth"])
             min_depth = smallest4[0]["depth"] if smallest4 else None
             avg_depth = (sum(x["depth"] for x in smallest4) / len(smallest4)) if smallest4 else None
         else:
-            smallest4 = sorted(valid, key=lambda x: x["depth"])[:4]
+            smallest4 = pure.smallest(valid, 4, key=lambda x: x["depth"])
             min_depth = smallest4[0]["depth"]
             avg_depth = sum(x["depth"] for x in smallest4) / 4
 
@@ -291,25 +213,23 @@ def process_single_sensor(raw_lines):
     filter each region and estimate 'thickness' using a linear calibration.
     """
     try:
-        lines = to_python_list(raw_lines)
+        lines = ccd_core.to_lines(raw_lines)
         if not lines:
             return json.dumps({"success": False, "message": "Empty data", "result": None})
 
         # parse voltages only (ignore sensor markers)
-        pixel_pattern = re.compile(r"Pixel\[\s*(\d+)\s*\]:\s*([\d\.]+)\s*mV", re.IGNORECASE)
-        voltages = []
+        voltages = array("d")
         for raw in lines:
             if raw is None:
                 continue
-            line = str(raw).strip()
-            m = pixel_pattern.search(line)
+            m = PIXEL_MV_RE.search(str(raw).strip())
             if m:
                 voltages.append(float(m.group(2)))
 
         if len(voltages) < 50:
             return json.dumps({"success": False, "message": "Not enough pixels in single sensor", "result": None})
 
-        filtered = butter_filtfilt(voltages, b_coef, a_coef)
+        filtered = pure.filtfilt(voltages, b_coef, a_coef, ccd_core.INIT_ZERO)
 
         # split into 4 equal segments (heuristic for 4 grooves)
         n = len(filtered)
@@ -395,22 +315,8 @@ def predict_file(raw_input, model_dalam_in=None, model_dangkal_in=None, b_in=Non
     if a_in is not None:
         a_coef = a_in
 
-    # Normalize input into list of lines
-    lines = None
-    if isinstance(raw_input, str):
-        # if looks like a path (heuristic: contains OS newline but not sensor markers),
-        # still try to open safely; otherwise treat as raw content
-        try:
-            # try open file
-            with open(raw_input, "r", encoding="utf-8") as f:
-                content = f.read()
-            lines = content.splitlines()
-        except Exception:
-            # treat raw_input as raw text containing newlines
-            lines = raw_input.splitlines()
-    else:
-        # try to convert from ArrayList / iterable
-        lines = to_python_list(raw_input)
+    # Normalize input into list of lines (path, raw text, list, or ArrayList)
+    lines = ccd_core.normalize_lines(raw_input)
 
     # First attempt: multi-sensor CCD
     try:
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modul Python app (Chaquopy) ada di src/main/python
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "main", "python"))
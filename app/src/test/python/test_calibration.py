@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pytest
+
+import calibration
+import scan_archive
+import scanner_sim
+import tire_depth
+from test_fleet_eval import _drop
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def _labeled_scans():
+    scans = []
+    for seed in range(4):
+        worn = seed % 2 == 1
+        scan = scanner_sim.synthetic_capture(seed=seed, worn=worn)
+        # scan ber-window parsial: pixel tepi sensor 1 dan 6 tidak terkirim
+        dropped = {(1, tire_depth.PIXEL_MIN), (6, tire_depth.PIXEL_MAX), (3, 281)}
+        if seed == 2:
+            # sensor 2 jarang: span lebar tapi < MIN_VALLEY_PIXELS pixel diterima
+            dropped |= {(2, p) for p in range(tire_depth.PIXEL_MIN, tire_depth.PIXEL_MAX + 1) if p % 20}
+        scans.append(_drop(scan, dropped))
+    depths = [[2.0 + 0.5 * s + 0.1 * i for i in range(6)] for s in range(4)]
+    return scans, depths
+
+
+def test_scan_features_match_process_file_on_partial_window():
+    scans, _ = _labeled_scans()
+    valleys, aus = calibration.scan_features(scans)
+    for n, scan in enumerate(scans):
+        ref = json.loads(tire_depth.process_file(scan, early_exit=False))
+        assert aus[n] == (ref["model_used"] == "HARDCODED_AUS")
+        expected = [np.nan if d["valley"] is None else d["valley"] for d in ref["data"]]
+        np.testing.assert_allclose(valleys[n], expected, rtol=0, atol=1e-9)
+    assert aus.tolist() == [False, True, False, True]
+    assert np.isnan(valleys[2, 1])
+
+
+def test_train_from_archive_uses_partial_window_scans(tmp_path):
+    scans, depths = _labeled_scans()
+    path = str(tmp_path / "scans.bin")
+    for scan in scans:
+        assert json.loads(scan_archive.archive_scan(path, scan, 1, "DKA"))["success"]
+
+    labels = [{"record": n, "depths": d} for n, d in enumerate(depths)]
+    result = json.loads(calibration.train_from_archive(path, json.dumps(labels)))
+    direct = calibration.train(scans, depths)
+
+    assert result["success"]
+    assert result["metrics"]["model_dalam"]["samples"] == 11
+    assert result["metrics"]["model_dangkal"]["samples"] == 12
+    # arsip menyimpan mV dan counts persis seperti log, jadi model identik
+    for key in ("model_dalam", "model_dangkal"):
+        assert result[key] == direct[key]
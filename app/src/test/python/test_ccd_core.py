@@ -0,0 +1,179 @@
+import copy
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+import ccd_core
+import filtering
+import scanner_sim
+import tire_depth
+import tire_processing
+from ccd_core import model as ccd_model
+from ccd_core import pure
+
+B = [0.0674553, 0.134911, 0.0674553]
+A = [-1.14298, 0.412801]
+
+
+def test_depth_lut_cache_is_thread_safe():
+    # lebih banyak model daripada LUT_CACHE_SIZE supaya eviction terus terjadi
+    models = [{"min": 1700.0 + i, "max": 2600.0, "slope": -1.8, "intercept": 11.9}
+              for i in range(3 * ccd_model.LUT_CACHE_SIZE)]
+    errors = []
+
+    def worker(offset):
+        try:
+            for n in range(400):
+                model = models[(n + offset) % len(models)]
+                expected = ccd_core.predict(model["slope"], model["intercept"],
+                                            ccd_core.scale(2000.0, model["min"], model["max"]))
+                assert abs(float(ccd_core.depth_lut(model)(2000.0)) - expected) < 1e-9
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(k * 7,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(ccd_model._lut_cache) <= ccd_model.LUT_CACHE_SIZE
+
+
+MODEL = {"min": 1717.81055814, "max": 2642.29232265, "slope": -1.80321265, "intercept": 11.879767975539409}
+# valley di bawah 0 mV dan di atas VREF (code < 0 dan > 4095) ikut diuji
+VALLEYS = np.concatenate([
+    np.linspace(-1000.0, 4500.0, 50001),
+    np.random.default_rng(0).uniform(0.0, ccd_model.VREF_MV, 20000),
+    np.arange(-3, ccd_model.ADC_MAX + 4) * (ccd_model.VREF_MV / ccd_model.ADC_MAX),
+])
+
+
+@pytest.mark.parametrize("model", [
+    MODEL,
+    dict(MODEL, poly=[0.3, -1.2, -1.8, 11.88]),
+    dict(MODEL, poly=[0.8, -1.9, 11.0]),
+    dict(MODEL, max=MODEL["min"]),
+], ids=["linear", "cubic", "quadratic", "zero-span"])
+def test_depth_lut_matches_closed_form(model):
+    lut = ccd_model.DepthLUT(model)
+    if "poly" in model:
+        scaled = (VALLEYS - model["min"]) / (model["max"] - model["min"])
+        closed = np.polyval(model["poly"], scaled)
+    else:
+        closed = np.array(pure.apply_model(VALLEYS.tolist(), model)[1])
+
+    assert np.abs(lut(VALLEYS) - closed).max() <= 2e-13
+    scalar = np.array([lut(float(v)) for v in VALLEYS[::7]])
+    assert np.abs(scalar - closed[::7]).max() <= 2e-13
+
+
+def test_depth_lut_keeps_nan():
+    lut = ccd_core.depth_lut(dict(MODEL, poly=[0.3, -1.2, -1.8, 11.88]))
+    depths = lut(np.array([np.nan, 2000.0, np.nan]))
+    assert np.isnan(depths[[0, 2]]).all() and not np.isnan(depths[1])
+    assert np.isnan(lut(float("nan")))
+
+
+def test_text_dialect_matches_line_parser():
+    # TIRE_PROCESSING memakai satu findall; hasil harus sama dengan loop per baris
+    per_line = copy.copy(ccd_core.TIRE_PROCESSING)
+    per_line.text = None
+    lines = [
+        "Pixel[300]: 1.0 mV", "--- SENSOR 2 ---", "Pixel[ 279 ]: 2.0 mV", "Pixel[280]: 3.0mV tail Pixel[400]: 9 mV",
+        "  --- sensor 9 ---  ", "pixel[500]: 4.5 MV\r", "x --- SENSOR 3 ---", "Pixel[600]: 1.2.3 mV",
+        "", "   ", "Pixel[700]: 55 V", "--- SENSOR 4 --- Pixel[300]: 12.5 mV", "Pixel[1080]: 6.0 mV",
+    ]
+    for cut in range(len(lines) + 1):
+        fast = ccd_core.SampleParser(ccd_core.TIRE_PROCESSING)
+        slow = ccd_core.SampleParser(per_line)
+        assert fast.feed(lines[:cut]) + fast.feed(lines[cut:]) == slow.feed(lines[:cut]) + slow.feed(lines[cut:])
+        assert fast.current_sensor == slow.current_sensor
+
+
+def test_pure_filter_is_filters_backend():
+    x = [1500.0 + (i * 37 % 101) * 9.5 for i in range(300)]
+    for mode in (ccd_core.INIT_ZERO, ccd_core.INIT_EDGE):
+        assert list(pure.filtfilt(x, B, A, mode)) == ccd_core.filtfilt(x, B, A, mode).tolist()
+        assert pure.lowpass(x, B, A, mode) == ccd_core.lowpass(x, B, A, mode).tolist()
+
+
+def test_tire_processing_does_not_import_numpy():
+    code = "import sys, tire_processing; sys.exit('numpy' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
+
+
+def test_lowpass_columns_matches_lowpass_per_column():
+    cols = [[1500.0 + (i * (7 + k) % 53) * 11.0 for i in range(120)] for k in range(5)]
+    matrix = ccd_core.lowpass_columns([list(row) for row in zip(*cols)], B, A)
+    for k, col in enumerate(cols):
+        assert matrix[:, k].tolist() == ccd_core.lowpass(col, B, A).tolist()
+
+
+def test_lowpass_step_chain_equals_lowpass():
+    x = [2000.0 + (i * 29 % 71) * 6.5 for i in range(200)]
+    for mode in (ccd_core.INIT_EDGE, ccd_core.INIT_ZERO):
+        y = list(pure.initial_state(x[0], x[1], B, A, mode))
+        state = (x[0], x[1], y[0], y[1])
+        for value in x[2:]:
+            out, state = pure.lowpass_step(state, value, B, A)
+            y.append(out)
+        assert y == pure.lowpass(x, B, A, mode)
+
+
+# ============================================================================
+# TRANSFER BULK (user-043)
+# ============================================================================
+
+def _forms(lines):
+    text = "\n".join(lines)
+    return {
+        "str": text,
+        "str-crlf": "\r\n".join(lines) + "\r\n",
+        "bytes": text.encode("utf-8"),
+        "bytearray": bytearray(text.encode("utf-8")),
+        "memoryview": memoryview(text.encode("utf-8")),
+        "list": list(lines),
+    }
+
+
+FORMS = list(_forms([]))
+
+
+@pytest.mark.parametrize("form", FORMS)
+def test_bulk_forms_parse_identically_in_tire_depth(form, monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+    capture = scanner_sim.synthetic_capture(seed=9)
+    raw = _forms(capture)[form]
+    assert ccd_core.to_lines(raw) == capture
+
+    values, counts = tire_depth.parse_ccd_frame(raw)
+    ref_values, ref_counts = tire_depth.parse_ccd_frame(capture)
+    assert np.array_equal(values, ref_values, equal_nan=True)
+    assert np.array_equal(counts, ref_counts)
+    assert tire_depth.predict_file(raw) == tire_depth.process_file(capture)
+
+
+@pytest.mark.parametrize("form", FORMS)
+def test_bulk_forms_parse_identically_in_tire_processing(form):
+    capture = scanner_sim.synthetic_capture(seed=9)
+    raw = _forms(capture)[form]
+    assert tire_processing.parse_ccd_raw_lines(raw) == tire_processing.parse_ccd_raw_lines(capture)
+    assert tire_processing.process_file(raw) == tire_processing.process_file(capture)
+    assert tire_processing.predict_file(raw) == tire_processing.process_file(capture)
+
+
+@pytest.mark.parametrize("form", FORMS)
+def test_bulk_forms_parse_identically_in_filtering(form, tmp_path):
+    lines = ["--- SENSOR {} ---".format(sid) if p == 0 else "Pixels[{}]: {}".format(p, 1000 + 37 * ((p * sid) % 50))
+             for sid in (1, 2) for p in range(300)]
+    raw = _forms(lines)[form]
+    samples, current = filtering.parse_samples(raw)
+    ref_samples, ref_current = filtering.parse_samples(lines)
+    assert samples.tolist() == ref_samples.tolist() and current == ref_current == 2
+    assert filtering.process_data_batch(raw, str(tmp_path)) == filtering.process_data_batch(lines, str(tmp_path))
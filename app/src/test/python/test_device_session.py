@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import ccd_core
+import device_session
+import scanner_sim
+import tire_depth
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def _failing_dialect():
+    base = ccd_core.TIRE_DEPTH
+
+    def pixel(line):
+        if "BAD" in line:
+            raise ValueError("corrupt line: {}".format(line))
+        return base.pixel(line)
+
+    return ccd_core.Dialect("failing", base.marker, pixel, sensor_ids=range(1, 7), window=base.window)
+
+
+def test_worker_error_is_reported_by_finish_and_session_recovers():
+    capture = scanner_sim.synthetic_capture(seed=3)
+    session = device_session.DeviceSession("bad-line")
+    try:
+        session.builder.parser.dialect = _failing_dialect()
+        session.feed(capture[:100])
+        session.feed(["Pixel[ 400]: BAD mV"])
+        session.feed(capture[100:])
+
+        result = json.loads(session.finish(timeout=2.0))
+        assert result["success"] is False
+        assert "corrupt line" in result["message"]
+        assert result["device_id"] == "bad-line"
+        assert session._thread.is_alive()
+
+        # scan berikutnya di sesi yang sama tidak terpengaruh
+        session.feed(capture)
+        result = json.loads(session.finish(timeout=2.0))
+        assert result["success"]
+        assert result["min_depth"] == json.loads(tire_depth.process_file(capture))["min_depth"]
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def sessions():
+    opened = []
+    yield opened
+    for device_id in opened:
+        device_session.session_close(device_id)
+
+
+def test_session_feed_without_open_session_fails():
+    result = json.loads(device_session.session_feed("never-opened", ["--- SENSOR 1 ---"]))
+    assert result["success"] is False
+    assert result["message"].startswith("session_feed exception:")
+    assert all(s["device_id"] != "never-opened" for s in json.loads(device_session.session_list())["sessions"])
+
+
+def test_session_open_with_new_config_replaces_session(sessions):
+    sessions.append("cfg")
+    first = json.loads(device_session.session_open("cfg"))
+    assert first["success"] and not first["replaced"]
+    old = device_session._get("cfg")
+    assert json.loads(device_session.session_feed("cfg", ["--- SENSOR 1 ---"]))["success"]
+
+    # tanpa config / config sama: sesi (dan scan aktif) tetap
+    assert not json.loads(device_session.session_open("cfg"))["replaced"]
+    same = json.dumps({"every_lines": tire_depth.PREVIEW_EVERY_LINES})
+    assert not json.loads(device_session.session_open("cfg", same))["replaced"]
+    assert device_session._get("cfg") is old
+
+    model = dict(tire_depth.MODEL_DALAM, slope=-2.0)
+    result = json.loads(device_session.session_open("cfg", json.dumps({"model_dalam": model, "every_lines": 50})))
+    assert result["success"] and result["replaced"]
+    assert result["model"] == model and result["lines_in"] == 0
+    session = device_session._get("cfg")
+    assert session is not old and session.every_lines == 50
+    assert not old._thread.is_alive()
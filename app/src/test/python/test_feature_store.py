@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+import feature_store
+import scanner_sim
+import tire_depth
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def test_aus_scan_stores_only_stages_process_file_ran(tmp_path):
+    scan = scanner_sim.synthetic_capture(seed=4, worn=True)
+    result = json.loads(feature_store.process_with_features(scan, str(tmp_path / "f.bin"), 7))
+    assert result["model_used"] == "HARDCODED_AUS"
+    assert result["skipped_stages"]["filter"] == [2, 3, 4, 5]
+
+    rec = feature_store.open_store(str(tmp_path / "f.bin")).get(7)
+    assert rec["valley_pixel"][1:5].tolist() == [feature_store.VALLEY_SKIPPED] * 4
+    assert np.isnan(rec["valleys"][1:5]).all()
+    for sensor in (result["data"][0], result["data"][5]):
+        assert rec["valleys"][sensor["sensor"] - 1] == sensor["valley"]
+        assert rec["valley_pixel"][sensor["sensor"] - 1] == sensor["valley_pixel"]
+
+    # features_from_graph tidak memfilter sensor yang dilewati process_file
+    graph = tire_depth.ScanGraph(scan)
+    tire_depth.process_file(None, graph=graph)
+    filtered = graph.computed["filter"]
+    feature_store.features_from_graph(graph, 8)
+    assert graph.computed["filter"] == filtered == 2
+
+
+def test_skipped_valleys_reprocessed_when_scan_no_longer_aus(tmp_path, monkeypatch):
+    scan = scanner_sim.synthetic_capture(seed=4, worn=True)
+    store = feature_store.FeatureStore(str(tmp_path / "f.bin"))
+    store.add_graph(tire_depth.ScanGraph(scan), 1)
+
+    result = feature_store.recompute(store)
+    assert result["scan_ids"].tolist() == [1] and result["stale"] == []
+
+    # threshold jumlah pixel dinaikkan: scan bukan AUS lagi, valley 2-5 dibutuhkan
+    monkeypatch.setattr(tire_depth, "AUS_COUNT_THRESH", 10 ** 4)
+    assert feature_store.recompute(store)["stale"] == [1]
+    result = feature_store.recompute(store, raw_source=lambda scan_id: scan)
+    assert result["reprocessed"] == [1]
+    ref = json.loads(tire_depth.process_file(scan))
+    assert ref["model_used"] == "DALAM"
+    np.testing.assert_allclose(result["depths"][0], [d["depth"] for d in ref["data"]], atol=1e-9)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import filtering
+
+LINES = [
+    "--- SENSOR 300 ---",
+    "Pixels[10]: 1200",
+    "Pixels[11]: 1210",
+    "--- SENSOR -2 ---",
+    "Pixels[12]: 900",
+    "--- SENSOR 3 ---",
+    "Pixels[13]: 1500",
+]
+
+
+def test_parse_samples_keeps_out_of_range_sensor_ids():
+    samples, current = filtering.parse_samples(LINES)
+    assert samples["sensor"].tolist() == [300, 300, -2, 3]
+    assert samples["adc"].tolist() == [1200, 1210, 900, 1500]
+    assert current == 3
+    assert sorted(filtering.parse_lines_to_df(LINES)) == [-2, 3, 300]
+
+
+def test_spool_round_trip_with_out_of_range_sensor_ids(tmp_path):
+    assert filtering.spool_lines(LINES[:3], str(tmp_path)) == 2
+    assert filtering.spool_lines(LINES[3:], str(tmp_path)) == 4
+    samples = np.concatenate(list(filtering.iter_spool(str(tmp_path))))
+    assert samples["sensor"].tolist() == [300, 300, -2, 3]
+
+
+
+def _long_lines(seed=7):
+    rng = np.random.default_rng(seed)
+    lines = []
+    for sensor, n in ((1, 3 * filtering.STREAM_BLOCK + 517), (2, filtering.STREAM_BLOCK + 1), (4, 40)):
+        lines.append("--- SENSOR {} ---".format(sensor))
+        adc = 2000 + 600 * np.sin(np.arange(n) / 90.0) + rng.normal(0, 40, n)
+        lines.extend("Pixels[{}]: {}".format(i, int(v)) for i, v in enumerate(adc))
+    return lines
+
+
+def _batch_mean(lines):
+    """Referensi: filtfilt atas seluruh sinyal tiap sensor, mean dari mean"""
+    samples, _ = filtering.parse_samples(lines)
+    means = []
+    for sensor_num in np.unique(samples["sensor"]):
+        adc = samples["adc"][samples["sensor"] == sensor_num].astype(float)
+        filtered = filtering.filtfilt(filtering.b, filtering.a, adc)
+        means.append(((filtered / filtering.adc_max) * filtering.vref_mV).mean())
+    return float(np.mean(means))
+
+
+def test_snapshot_and_spool_equal_batch_on_long_uneven_chunks(tmp_path):
+    lines = _long_lines()
+    assert sum(1 for line in lines if line.startswith("Pixels")) > filtering.STREAM_BLOCK
+    expected = _batch_mean(lines)
+
+    assert filtering.process_data_batch(lines, str(tmp_path)) == pytest.approx(expected, rel=1e-12)
+
+    stats = filtering.RunningStats()
+    bounds = [0, 1, 4000, 4001, 13000, 25000, len(lines)]
+    for lo, hi in zip(bounds, bounds[1:]):
+        stats.update(lines[lo:hi])
+        if lo == 4000:
+            filtering.process_data_batch(lines[lo:hi], str(tmp_path), spool=True)
+        else:
+            filtering.spool_lines(lines[lo:hi], str(tmp_path))
+    assert stats.snapshot()["overall_mean_mV"] == pytest.approx(expected, rel=1e-12)
+    assert filtering.process_spool(str(tmp_path)) == pytest.approx(expected, rel=1e-12)
+
+
+def test_process_data_batch_without_samples_returns_zero(tmp_path):
+    assert filtering.process_data_batch(["--- SENSOR 1 ---"], str(tmp_path)) == 0.0
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+import pytest
+
+import fleet_eval
+import history_store
+import scanner_sim
+import tire_depth
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def _drop(capture, pixels):
+    """Buang baris Pixel[p] untuk setiap (sensor, p) di pixels"""
+    out = []
+    sid = None
+    for line in capture:
+        if line.startswith("--- SENSOR"):
+            sid = int(line.split()[2])
+        elif sid is not None and (sid, int(line[6:10])) in pixels:
+            continue
+        out.append(line)
+    return out
+
+
+def _scans():
+    worn = scanner_sim.synthetic_capture(seed=4, worn=True)
+    normal = scanner_sim.synthetic_capture(seed=1)
+    return [
+        normal,
+        worn,
+        # satu pixel tepi hilang pada sensor AUS penentu
+        _drop(worn, {(1, tire_depth.PIXEL_MIN)}),
+        _drop(worn, {(6, tire_depth.PIXEL_MAX)}),
+        # tepi + celah interior di beberapa sensor
+        _drop(normal, {(2, p) for p in range(280, 300)} | {(3, 700), (3, 701), (5, 1080)}),
+        # sensor dengan span pendek (< MIN_VALLEY_PIXELS)
+        _drop(normal, {(4, p) for p in range(320, 1081)}),
+    ]
+
+
+def test_vectorised_matches_process_file_on_partial_windows():
+    scans = _scans()
+    counts_out = []
+    frames = fleet_eval.stack_frames(scans, counts_out)
+    result = fleet_eval.evaluate_raw(frames, pixel_counts=counts_out[0])
+
+    for n, scan in enumerate(scans):
+        ref = json.loads(tire_depth.process_file(scan, early_exit=False))
+        assert ref["success"]
+        assert history_store.MODEL_LABELS[result["model"][n]] == ref["model_used"]
+        for sensor in ref["data"]:
+            i = sensor["sensor"] - 1
+            if sensor["valley"] is None:
+                assert np.isnan(result["valleys"][n, i])
+            else:
+                assert result["valleys"][n, i] == pytest.approx(sensor["valley"], abs=1e-9)
+                assert tire_depth.PIXEL_MIN + result["valley_index"][n, i] == sensor["valley_pixel"]
+            if sensor["depth"] is None:
+                assert np.isnan(result["depths"][n, i])
+            else:
+                assert result["depths"][n, i] == pytest.approx(sensor["depth"], abs=1e-9)
+        assert result["min_depth"][n] == pytest.approx(ref["min_depth"], abs=1e-9)
+
+
+def test_filtfilt_matrix_row_matches_scan_graph():
+    scan = _drop(scanner_sim.synthetic_capture(seed=2), {(1, 280), (1, 281), (1, 1080)})
+    values, counts = tire_depth.parse_ccd_frame(scan)
+    frame = tire_depth.repair_gaps(values, counts > 0)
+    filtered = fleet_eval.filtfilt_matrix(frame)
+
+    graph = tire_depth.ScanGraph.from_frame(values, counts)
+    start, stop = fleet_eval.frame_spans(frame)
+    assert (start[0], stop[0]) == (2, frame.shape[-1] - 1)
+    np.testing.assert_allclose(filtered[0, 2:-1], graph.filtered(1), rtol=0, atol=1e-9)
+    assert np.isnan(filtered[0, :2]).all() and np.isnan(filtered[0, -1])
+
+
+def test_stack_frames_spans_rebuild_production_signal():
+    scans = _scans()
+    spans_out = []
+    frames = fleet_eval.stack_frames(scans, spans_out=spans_out)
+    start, stop = spans_out[0]
+
+    for n, scan in enumerate(scans):
+        sensors = tire_depth.process_single_sensor_parsing(scan)
+        for i in range(6):
+            np.testing.assert_array_equal(frames[n, i, start[n, i]:stop[n, i]], sensors[i + 1])
+    assert (start[2, 0], stop[2, 0]) == (1, frames.shape[-1])
+    assert stop[5, 3] - start[5, 3] == 40
+
+
+def test_evaluate_history_keeps_history_model_labels():
+    store = history_store.HistoryStore()
+    store.append(1, "DKA", [5.0] * 6, [2000.0] * 6, "DALAM", timestamp=1)
+    store.append(1, "DKI", [0.5] * 6, [2900.0] * 6, "HARDCODED_AUS", timestamp=2)
+    result = fleet_eval.evaluate_history(store)
+    labels = [history_store.MODEL_LABELS[m] for m in result["model"]]
+    assert labels == ["DALAM", "HARDCODED_AUS"]
+    assert (result["model"] == store.records["model"]).all()
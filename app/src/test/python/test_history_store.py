@@ -0,0 +1,24 @@
+import numpy as np
+
+import history_store
+
+
+def test_append_after_torn_tail_keeps_records_aligned(tmp_path):
+    path = str(tmp_path / "history.bin")
+    store = history_store.HistoryStore(path)
+    store.append(12, "DKA", [3.1] * 6, model_label="DALAM", timestamp=100.0)
+
+    # app mati di tengah menulis record kedua
+    with open(path, "ab") as f:
+        f.write(b"\x07" * (history_store.RECORD_DTYPE.itemsize // 2))
+
+    reopened = history_store.HistoryStore(path)
+    assert len(reopened) == 1
+    reopened.append(12, "BKI", [2.5] * 6, model_label="DALAM", timestamp=200.0)
+
+    loaded = history_store.HistoryStore(path)
+    assert len(loaded) == 2
+    assert list(loaded.records["bus"]) == [12, 12]
+    assert list(loaded.records["position"]) == [history_store.position_code("DKA"),
+                                                history_store.position_code("BKI")]
+    assert np.allclose(loaded.records["depths"][1], 2.5)
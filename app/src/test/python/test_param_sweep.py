@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import param_sweep
+import tire_depth
+from test_fleet_eval import _scans
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def test_shipped_parameters_score_like_process_file():
+    # label = hasil aplikasi sendiri, jadi parameter yang dipakai harus skor sempurna
+    items = []
+    for scan in _scans():
+        ref = json.loads(tire_depth.process_file(scan, early_exit=False))
+        items.append({
+            "log": scan,
+            "depths": [d["depth"] for d in ref["data"]],
+            "aus": ref["model_used"] == "HARDCODED_AUS",
+        })
+    corpus = param_sweep.load_corpus(items)
+    assert corpus["aus"].sum() == 3
+
+    grid = {
+        "cutoff_hz": [tire_depth.FILTER_CUTOFF_HZ],
+        "voltage_thresh": [tire_depth.AUS_VOLTAGE_THRESH],
+        "count_thresh": [tire_depth.AUS_COUNT_THRESH],
+        "min_pixels": [tire_depth.MIN_VALLEY_PIXELS],
+    }
+    (row,) = param_sweep.sweep(corpus, grid, workers=1)
+    assert row["aus_accuracy"] == 1.0
+    assert row["depth_mae_mm"] == pytest.approx(0.0, abs=1e-3)
+
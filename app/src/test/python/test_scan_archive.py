@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import scan_archive
+import scanner_sim
+import tire_depth
+from test_fleet_eval import _drop, _scans
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def _duplicate(capture, pixels, offset_mV=0.37):
+    """Kirim ulang baris Pixel[p] (nilai sedikit berbeda) untuk setiap (sensor, p)"""
+    out = []
+    sid = None
+    for line in capture:
+        out.append(line)
+        if line.startswith("--- SENSOR"):
+            sid = int(line.split()[2])
+        elif sid is not None and (sid, int(line[6:10])) in pixels:
+            value = float(line.split(":")[1].split()[0]) + offset_mV
+            out.append("{}: {:.2f} mV".format(line.split(":")[0], value))
+    return out
+
+
+def test_replay_equals_process_file(tmp_path):
+    normal = scanner_sim.synthetic_capture(seed=2)
+    scans = _scans() + [
+        _duplicate(normal, {(3, 500), (3, 501), (6, 280)}),
+        _duplicate(_drop(normal, {(1, p) for p in range(600, 640)}), {(1, 641)}),
+        # lompatan > 327 mV antar pixel diterima (delta int32)
+        normal[:400] + ["Pixel[ 399]: 3299.99 mV", "Pixel[ 400]: 0.01 mV"] + normal[400:],
+    ]
+    path = str(tmp_path / "scans.bin")
+    for n, scan in enumerate(scans):
+        assert json.loads(scan_archive.archive_scan(path, scan, 7, "DKA", timestamp=n))["record"] == n
+
+    for n, scan in enumerate(scans):
+        replay = json.loads(scan_archive.replay_scan(path, n))
+        assert replay == json.loads(tire_depth.process_file(scan))
+    assert replay["success"]
+    quality = json.loads(scan_archive.replay_scan(path, 6))["quality"]
+    assert [q["duplicates"] for q in quality] == [0, 0, 2, 0, 0, 1]
+
+
+def test_frame_round_trip_is_exact():
+    scan = _duplicate(_drop(scanner_sim.synthetic_capture(seed=5), {(2, 300), (2, 301)}), {(4, 900)})
+    values, counts = tire_depth.parse_ccd_frame(scan)
+    decoded = scan_archive.decode_scan(scan_archive.encode_scan(values, counts, 3, "BKI", 12.5))
+    assert (decoded["counts"] == counts).all()
+    received = counts > 0
+    assert (decoded["values"][received] == values[received]).all()
+    assert (decoded["values"][~received] != decoded["values"][~received]).all()
+    assert (decoded["bus"], decoded["position"], decoded["timestamp"]) == (3, "BKI", 12.5)
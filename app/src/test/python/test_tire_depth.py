@@ -0,0 +1,387 @@
+import json
+
+import numpy as np
+import pytest
+
+import ccd_core
+import scanner_sim
+import tire_depth
+from test_fleet_eval import _drop
+from test_scan_archive import _duplicate
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(tire_depth, "debug_log", lambda message: None)
+
+
+def _feed_in_chunks(builder, lines, sizes=(1, 7, 33, 120)):
+    pos = 0
+    k = 0
+    while pos < len(lines):
+        size = sizes[k % len(sizes)]
+        builder.feed(lines[pos:pos + size])
+        pos += size
+        k += 1
+    return builder
+
+
+def _live_capture():
+    capture = scanner_sim.synthetic_capture(seed=3)
+    capture = _drop(capture, {(2, p) for p in range(280, 290)} | {(3, 600), (3, 601), (5, 1080)})
+    return _duplicate(capture, {(1, 450), (4, 700)})
+
+
+# ============================================================================
+# EARLY EXIT AUS (user-026)
+# ============================================================================
+
+def test_aus_early_exit_skips_sensors_2_to_5():
+    capture = scanner_sim.synthetic_capture(seed=4, worn=True)
+    graph = tire_depth.ScanGraph(capture)
+    fast = json.loads(tire_depth.process_file(capture, graph=graph))
+    full = json.loads(tire_depth.process_file(capture, early_exit=False))
+
+    assert fast["model_used"] == full["model_used"] == "HARDCODED_AUS"
+    assert fast["skipped_stages"] == {"filter": [2, 3, 4, 5], "valley": [2, 3, 4, 5]}
+    assert full["skipped_stages"] == {}
+    assert graph.computed["filter"] == 2
+    assert not any(graph.is_cached("filter", sid) for sid in range(2, 6))
+
+    # kedalaman identik; valley sensor 2-5 tidak dihitung pada mode default
+    for key in ("min_depth", "avg_depth", "condition_status"):
+        assert fast[key] == full[key]
+    assert [(d["sensor"], d["depth"]) for d in fast["smallest_4"]] == \
+        [(d["sensor"], d["depth"]) for d in full["smallest_4"]]
+    for d_fast, d_full in zip(fast["data"], full["data"]):
+        assert d_fast["depth"] == d_full["depth"]
+        if d_fast["sensor"] in (1, 6):
+            assert d_fast["valley"] == d_full["valley"]
+        else:
+            assert d_fast["valley"] is None and d_fast["valley_pixel"] is None
+            assert d_full["valley"] is not None
+
+
+# ============================================================================
+# SCAN GRAPH & PREDICT_FILE (user-027)
+# ============================================================================
+
+@pytest.mark.parametrize("as_list", [False, True])
+def test_predict_file_runs_multi_sensor_path_for_list_input(as_list):
+    capture = scanner_sim.synthetic_capture(seed=2)
+    raw = capture if as_list else "\n".join(capture)
+    result = json.loads(tire_depth.predict_file(raw))
+    assert result["success"]
+    assert result["model_used"] == "DALAM"
+    assert result == json.loads(tire_depth.process_file(capture))
+
+
+def test_scan_graph_filters_each_sensor_once():
+    capture = scanner_sim.synthetic_capture(seed=2)
+    graph = tire_depth.ScanGraph(capture)
+    first = tire_depth.process_file(capture, graph=graph, waveform_points=64)
+    # choose_model, detect_valleys, quality dan waveform memakai filter yang sama
+    assert graph.computed["parse"] == 1
+    assert graph.computed["filter"] == 6
+    assert graph.computed["valley"] == 6
+    assert graph.computed["classify"] == 1
+
+    assert tire_depth.process_file(capture, graph=graph, waveform_points=64) == first
+    assert graph.computed["filter"] == 6 and graph.computed["predict"] == 6
+
+
+# ============================================================================
+# SCAN ULANG SENSOR GAGAL (user-030)
+# ============================================================================
+
+def _sensor_lines(capture, sensor_ids):
+    """Potongan capture yang hanya berisi sensor di sensor_ids"""
+    out = []
+    sid = None
+    for line in capture:
+        if line.startswith("--- SENSOR"):
+            sid = int(line.split()[2])
+        if sid in sensor_ids:
+            out.append(line)
+    return out
+
+
+def test_rescan_of_failed_sensors_equals_combined_capture():
+    combined = scanner_sim.synthetic_capture(seed=5)
+    failed = {(sid, p) for sid in (3, 5) for p in range(300, 1080, 2)}
+    previous = tire_depth.ScanGraph(_drop(combined, failed))
+    first = json.loads(tire_depth.process_file(None, graph=previous))
+    assert first["rescan_sensors"] == [3, 5]
+
+    merged = tire_depth.merge_rescan(previous, _sensor_lines(combined, (3, 5)))
+    assert merged.merged_sensors == [3, 5]
+    result = json.loads(tire_depth.process_file(None, graph=merged))
+    assert result == json.loads(tire_depth.process_file(combined))
+    assert result["rescan_sensors"] == []
+
+    # hanya sensor yang di-scan ulang yang difilter lagi
+    assert merged.computed["filter"] == 2
+    assert merged.computed["valley"] == 2
+    for sid in (1, 2, 4, 6):
+        assert merged.filtered(sid) is previous.filtered(sid)
+
+    via_entrypoint = json.loads(tire_depth.process_rescan(
+        _drop(combined, failed), _sensor_lines(combined, (3, 5))))
+    assert via_entrypoint.pop("merged_sensors") == [3, 5]
+    assert via_entrypoint == result
+
+
+# ============================================================================
+# FRAME BERINDEX PIXEL (user-031)
+# ============================================================================
+
+def test_dropped_and_duplicated_lines_do_not_shift_pixels():
+    capture = scanner_sim.synthetic_capture(seed=1)
+    clean, clean_counts = tire_depth.parse_ccd_frame(capture)
+    dropped = {(2, 400), (2, 401), (2, 402), (4, 700)}
+    duplicated = {(2, 350), (4, 699), (4, 1000)}
+    values, counts = tire_depth.parse_ccd_frame(_duplicate(_drop(capture, dropped), duplicated))
+
+    lost = [(sid - 1, p - tire_depth.PIXEL_MIN) for sid, p in dropped]
+    twice = [(sid - 1, p - tire_depth.PIXEL_MIN) for sid, p in duplicated]
+    for row, col in lost:
+        assert np.isnan(values[row, col]) and counts[row, col] == 0
+    for row, col in twice:
+        # duplikat: nilai terakhir menang, tercatat dua kali
+        assert values[row, col] == pytest.approx(clean[row, col] + 0.37, abs=1e-9)
+        assert counts[row, col] == 2
+    untouched = (clean_counts > 0) & ~np.isnan(values)
+    for row, col in twice:
+        untouched[row, col] = False
+    assert np.array_equal(values[untouched], clean[untouched])
+
+
+def test_repair_gaps_interpolates_interior_only():
+    values = np.array([[np.nan, 1.0, np.nan, np.nan, 4.0, np.nan, 8.0, np.nan],
+                       [np.nan] * 8])
+    filled = tire_depth.repair_gaps(values)
+    assert filled[0, 1:7].tolist() == [1.0, 2.0, 3.0, 4.0, 6.0, 8.0]
+    assert np.isnan(filled[0, 0]) and np.isnan(filled[0, 7])
+    assert np.isnan(filled[1]).all()
+
+    # valid eksplisit: nilai di pixel tidak valid diabaikan
+    valid = ~np.isnan(values)
+    valid[0, 4] = False
+    repaired = tire_depth.repair_gaps(np.nan_to_num(values), valid)
+    assert repaired[0, 1:7] == pytest.approx([1.0, 2.4, 3.8, 5.2, 6.6, 8.0], rel=0, abs=1e-12)
+
+
+def test_pixel_count_counts_received_pixels():
+    capture = scanner_sim.synthetic_capture(seed=1)
+    gaps = {(3, p) for p in range(500, 540)} | {(3, tire_depth.PIXEL_MIN)}
+    scan = _duplicate(_drop(capture, gaps), {(3, 800)})
+    graph = tire_depth.ScanGraph(scan)
+    result = json.loads(tire_depth.process_file(None, graph=graph))
+
+    width = tire_depth.PIXEL_MAX - tire_depth.PIXEL_MIN + 1
+    assert graph.pixel_count(3) == width - len(gaps)
+    assert result["data"][2]["pixel_count"] == width - len(gaps)
+    # sinyal tetap kontigu dari pixel diterima pertama, celah diinterpolasi
+    assert len(graph.sensors()[3]) == width - 1
+    assert graph.pixel_offset(3) == tire_depth.PIXEL_MIN + 1
+    assert not np.isnan(graph.sensors()[3]).any()
+
+
+# ============================================================================
+# WAVEFORM LTTB (user-036)
+# ============================================================================
+
+def _reference_lttb(y, n_out):
+    """LTTB klasik (Steinarsson 2013), Python murni; batas bucket bilangan bulat eksak"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return list(range(n))
+    buckets = n_out - 2
+    edge = [i * (n - 2) // buckets + 1 for i in range(buckets + 1)] + [n]
+    selected = [0]
+    a = 0
+    for i in range(buckets):
+        lo, hi = edge[i], edge[i + 1]
+        next_lo, next_hi = hi, edge[i + 2]
+        avg_x = sum(range(next_lo, next_hi)) / (next_hi - next_lo)
+        avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize("n, n_out", [(10, 9), (32, 24), (47, 41), (100, 3), (101, 10), (801, 64), (801, 800), (1000, 999)])
+def test_lttb_indices_match_reference(n, n_out):
+    y = np.random.default_rng(n + n_out).normal(size=n).cumsum().tolist()
+    assert tire_depth.lttb_indices(y, n_out).tolist() == _reference_lttb(y, n_out)
+    assert tire_depth.lttb_indices(y, n).tolist() == list(range(n))
+
+
+@pytest.mark.parametrize("n, n_out", [(801, 64), (500, 499)])
+def test_lttb_keep_replaces_its_bucket_choice(n, n_out):
+    y = np.random.default_rng(n).normal(size=n).cumsum()
+    reference = _reference_lttb(y.tolist(), n_out)
+    for keep in (1, 37, int(np.argmin(y[1:-1])) + 1, n - 2):
+        picked = tire_depth.lttb_indices(y, n_out, keep=keep).tolist()
+        assert keep in picked
+        assert len(picked) == n_out and picked == sorted(set(picked))
+        changed = [i for i, (p, r) in enumerate(zip(picked, reference)) if p != r]
+        assert changed == [] if keep in reference else len(changed) == 1
+
+
+# ============================================================================
+# PENUMPUKAN MULTI-PASS (user-039)
+# ============================================================================
+
+WIDTH = tire_depth.PIXEL_MAX - tire_depth.PIXEL_MIN + 1
+
+
+def _passes(n_passes, sigma, seed=0, spans=None):
+    """(values, counts) per pass: profil sama + noise gaussian, span per pass opsional"""
+    rng = np.random.default_rng(seed)
+    base = 2000.0 - 600.0 * np.exp(-((np.arange(WIDTH) - 400.0) / 60.0) ** 2)
+    passes = []
+    for k in range(n_passes):
+        values = base + rng.normal(0.0, sigma, (6, WIDTH))
+        counts = np.ones((6, WIDTH), dtype=np.uint16)
+        if spans is not None:
+            lo, hi = spans[k]
+            counts[:, :lo] = 0
+            counts[:, hi:] = 0
+            values[counts == 0] = np.nan
+        passes.append((values, counts))
+    return passes
+
+
+@pytest.mark.parametrize("method", ["median", "trimmed"])
+def test_stack_passes_combines_per_pixel(method):
+    passes = _passes(5, 15.0, spans=[(0, WIDTH), (0, 500), (100, WIDTH), (200, 700), (300, 301)])
+    graph = tire_depth.stack_passes(passes, method=method)
+    values = np.stack([v for v, _ in passes])
+
+    expected = np.full((6, WIDTH), np.nan)
+    for row in range(6):
+        for col in range(WIDTH):
+            column = np.sort(values[:, row, col][~np.isnan(values[:, row, col])])
+            if method == "median":
+                expected[row, col] = np.median(column)
+            else:
+                k = int(len(column) * tire_depth.STACK_TRIM_FRACTION)
+                expected[row, col] = column[k:len(column) - k].mean()
+    for sid in range(1, 7):
+        assert graph.sensors()[sid] == pytest.approx(expected[sid - 1], rel=0, abs=1e-9)
+        # jumlah sampel per pixel digabung dari semua pass
+        assert graph.pixels()[sid].tolist() == np.stack([c for _, c in passes])[:, sid - 1].sum(axis=0).tolist()
+    assert graph.stack_info["sensors"][0]["passes"] == 3
+
+
+def test_stack_passes_spans_union_of_misaligned_passes():
+    passes = _passes(2, 5.0, seed=1, spans=[(50, 400), (300, 760)])
+    graph = tire_depth.stack_passes(passes)
+    sensor = graph.sensors()[2]
+    assert graph.pixel_offset(2) == tire_depth.PIXEL_MIN + 50
+    assert len(sensor) == graph.pixel_count(2) == 710
+    # pixel yang hanya ada di satu pass = nilai pass itu
+    assert sensor[0] == passes[0][0][1, 50]
+    assert sensor[-1] == passes[1][0][1, 759]
+    assert sensor[300] == (passes[0][0][1, 350] + passes[1][0][1, 350]) / 2.0
+
+
+@pytest.mark.parametrize("method, efficiency", [
+    ("median", np.sqrt(np.pi / 2.0)),
+    ("trimmed", 1.0338),
+])
+def test_stack_passes_estimates_noise_and_passes_needed(method, efficiency):
+    sigma, target = 20.0, 8.0
+    graph = tire_depth.stack_passes(_passes(9, sigma, seed=2), method=method, target_noise_mV=target)
+    truth = _passes(1, 0.0)[0][0]
+    for info in graph.stack_info["sensors"]:
+        # perkiraan noise tumpukan cocok dengan noise sebenarnya
+        actual = np.std(graph.sensors()[info["sensor"]] - truth[info["sensor"] - 1])
+        assert info["stacked_noise_mV"] == pytest.approx(actual, rel=0.1)
+        assert info["passes"] == 9
+        assert info["pass_noise_mV"] == pytest.approx(sigma, rel=0.05)
+        assert info["stacked_noise_mV"] == pytest.approx(info["pass_noise_mV"] * efficiency / 3.0, rel=1e-3)
+        needed = int(np.ceil((info["pass_noise_mV"] * efficiency / target) ** 2))
+        assert abs(info["passes_needed"] - needed) <= 1
+        assert info["passes_needed"] == pytest.approx((sigma * efficiency / target) ** 2, rel=0.15)
+
+
+def test_process_stacked_reports_stacking():
+    passes = [scanner_sim.synthetic_capture(seed=seed) for seed in (6, 7, 8)]
+    result = json.loads(tire_depth.process_stacked(passes))
+    assert result["success"]
+    assert result["stacking"]["passes"] == 3
+    assert json.loads(tire_depth.process_stacked([passes[0]]))["data"] == \
+        json.loads(tire_depth.process_file(passes[0]))["data"]
+
+
+# ============================================================================
+# HASIL PROGRESIF (user-041)
+# ============================================================================
+
+PROCESS_FILE_KEYS = {"success", "model_used", "total_pixels", "data", "smallest_4", "min_depth",
+                     "avg_depth", "condition_status", "condition_detail"}
+
+
+@pytest.mark.parametrize("seed, worn", [(2, False), (4, True)])
+def test_progressive_final_stage_equals_process_file(seed, worn):
+    capture = scanner_sim.synthetic_capture(seed=seed, worn=worn)
+    coarse, final = list(tire_depth.progressive_results(capture, budget_ms=1e6, waveform_points=32))
+    assert coarse["provisional"] and not final["provisional"]
+    assert coarse["model_used"] == final["model_used"]
+    assert [s["stage"] for s in final["stages"]] == ["parse", "coarse", "refine"]
+    for key in ("provisional", "stages", "budget_ms"):
+        del final[key]
+    assert final == json.loads(tire_depth.process_file(capture, waveform_points=32))
+
+
+def test_zero_budget_still_returns_well_formed_provisional_result():
+    capture = scanner_sim.synthetic_capture(seed=2)
+    delivered = []
+    final = tire_depth.process_file_progressive(capture, budget_ms=0, on_result=delivered.append)
+    assert len(delivered) == 2 and delivered[-1] == final
+
+    coarse = json.loads(delivered[0])
+    assert PROCESS_FILE_KEYS <= set(coarse)
+    assert coarse["provisional"] and coarse["budget_ms"] == 0
+    # deadline sudah lewat: hanya sensor pertama dalam urutan yang diproses
+    assert coarse["sensors_processed"] == [tire_depth.PROGRESSIVE_SENSOR_ORDER[0]]
+    assert not coarse["classification_complete"]
+    assert [d["sensor"] for d in coarse["data"]] == list(range(1, 7))
+    assert set(coarse["data"][0]) == set(json.loads(final)["data"][0])
+    assert [d["sensor"] for d in coarse["data"] if d["depth"] is not None] == [1]
+    assert coarse["min_depth"] == coarse["avg_depth"] == coarse["data"][0]["depth"]
+    assert coarse["condition_status"] == tire_depth.interpret_condition(coarse["min_depth"])[0]
+    assert all(not stage["within_budget"] for stage in coarse["stages"])
+
+    assert not json.loads(final)["provisional"]
+
+
+# ============================================================================
+# LIVE PREVIEW (user-045)
+# ============================================================================
+
+def test_live_forward_pass_equals_batch_forward_pass():
+    preview = _feed_in_chunks(tire_depth.LivePreview(every_lines=40), _live_capture()).flush()
+    sensors = preview.graph().sensors()
+    for sid in range(1, 7):
+        batch = ccd_core.lowpass(sensors[sid], tire_depth.b, tire_depth.a, ccd_core.INIT_EDGE)
+        assert preview.tracks[sid].f == batch.tolist()
+
+
+def test_final_preview_valleys_match_process_file():
+    capture = _live_capture()
+    preview = _feed_in_chunks(tire_depth.LivePreview(every_lines=40), capture)
+    live = preview.preview(flush=True)
+    ref = json.loads(tire_depth.process_file(capture, early_exit=False))
+    assert live["model_used"] == ref["model_used"]
+    for sensor, expected in zip(live["sensors"], ref["data"]):
+        assert sensor["valley"] == pytest.approx(expected["valley"], rel=0, abs=5e-12)
+        assert sensor["depth"] == pytest.approx(expected["depth"], rel=0, abs=1e-9)